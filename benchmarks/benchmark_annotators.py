@@ -0,0 +1,83 @@
+import sys
+import os
+import glob
+import time
+import argparse
+import pandas as pd
+
+sys.path.append("../")
+sys.path.append("../../oats")
+from utils.annotation import annotate_texts, DictionaryAnnotator
+
+
+
+
+# Compares the in-process dictionary annotator against NOBLE Coder on a fixture corpus of phenotype descriptions.
+# The fixture corpus is every distinct text in the reshaped sample files by default. For each ontology this reports
+# how many (text, term) pairs each annotator found, and the precision, recall, and F1 of the dictionary annotator
+# when the NOBLE Coder output is treated as correct. It also reports how many texts per second each one handles.
+# NOBLE Coder is skipped if the jar file isn't found, in which case only the dictionary annotator is timed.
+
+
+
+
+def read_fixture_texts(paths):
+    texts = []
+    for path in paths:
+        df = pd.read_csv(path, usecols=["text_unprocessed"])
+        texts.extend(df["text_unprocessed"].dropna().values)
+    return(list(dict.fromkeys(texts)))
+
+
+def agreement(reference, predicted):
+    reference_pairs = {(index,term) for index,terms in reference.items() for term in terms}
+    predicted_pairs = {(index,term) for index,terms in predicted.items() for term in terms}
+    both = len(reference_pairs & predicted_pairs)
+    precision = both/len(predicted_pairs) if len(predicted_pairs) > 0 else 0.000
+    recall = both/len(reference_pairs) if len(reference_pairs) > 0 else 0.000
+    f1 = 2*precision*recall/(precision+recall) if precision+recall > 0 else 0.000
+    return(len(reference_pairs), len(predicted_pairs), precision, recall, f1)
+
+
+
+
+if __name__ == "__main__":
+
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--fixtures", nargs="+", default=sorted(glob.glob("../reshaped/samples/*_descriptions.csv")))
+    parser.add_argument("--jar", default="../lib/NobleCoder-1.0.jar")
+    parser.add_argument("--ontology-dir", default="../ontologies")
+    parser.add_argument("--ontologies", nargs="+", default=["pato","po","go"])
+    parser.add_argument("--repeat", type=int, default=10, help="times to annotate the corpus when measuring dictionary throughput")
+    args = parser.parse_args()
+
+    texts = read_fixture_texts(args.fixtures)
+    index_to_text = dict(enumerate(texts))
+    print("fixture corpus has {} distinct texts".format(len(texts)))
+
+    start = time.perf_counter()
+    obo_paths = {ontology:os.path.join(args.ontology_dir, "{}.obo".format(ontology)) for ontology in args.ontologies}
+    annotator = DictionaryAnnotator(obo_paths)
+    print("compiled dictionary annotator in {:.2f} seconds".format(time.perf_counter()-start))
+
+    start = time.perf_counter()
+    for _ in range(args.repeat):
+        for text in texts:
+            annotator.annotate_text(text)
+    dictionary_time = (time.perf_counter()-start)/args.repeat
+    dictionary_annotations = annotator.annotate(index_to_text, args.ontologies)
+    print("dictionary annotator: {:.1f} texts per second".format(len(texts)/dictionary_time))
+
+    if not os.path.exists(args.jar):
+        print("no NOBLE Coder jar at {}, skipping the agreement report".format(args.jar))
+        sys.exit(0)
+
+    start = time.perf_counter()
+    noble_coder_annotations = annotate_texts(index_to_text, args.jar, args.ontologies, precise=1, workers=len(args.ontologies))
+    noble_coder_time = time.perf_counter()-start
+    print("noble coder: {:.1f} texts per second".format(len(texts)/noble_coder_time))
+
+    print("{:>10} {:>12} {:>12} {:>10} {:>10} {:>10}".format("ontology", "nc_pairs", "dict_pairs", "precision", "recall", "f1"))
+    for ontology in args.ontologies:
+        row = agreement(noble_coder_annotations[ontology], dictionary_annotations[ontology])
+        print("{:>10} {:>12} {:>12} {:>10.3f} {:>10.3f} {:>10.3f}".format(ontology, *row))
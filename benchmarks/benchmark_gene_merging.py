@@ -0,0 +1,132 @@
+import sys
+import os
+import time
+import argparse
+import tracemalloc
+import pandas as pd
+import numpy as np
+import networkx as nx
+from itertools import chain
+
+sys.path.append("../")
+from utils.identity import resolve_gene_ids, build_edges
+
+
+
+
+# Compares the networkx connected components approach that combining.py used to assign gene IDs against the
+# union-find approach in utils/identity.py. The reshaped files are read from the data directory if they are
+# there, otherwise from the samples directory. Larger sizes are made by stacking copies of those rows, where
+# each copy gets its own suffix on every identifier so that the copies form new components instead of just
+# joining the existing ones. Both approaches have to give the same gene ID for every row at every size.
+# The per-row edge generation is also compared against building the edges over whole columns.
+
+
+
+
+paths = [
+    "oellrich_walls_phene_descriptions.csv", 
+    "oellrich_walls_phenotype_descriptions.csv", 
+    "oellrich_walls_annotations.csv",
+    "sgn_phenotype_descriptions.csv", 
+    "maizegdb_phenotype_descriptions.csv", 
+    "maizegdb_curated_go_annotations.csv",
+    "tair_phenotype_descriptions.csv",
+    "tair_curated_go_annotations.csv", 
+    "tair_curated_po_annotations.csv",
+    "planteome_curated_annotations.csv"
+]
+
+
+
+
+def read_reshaped_files(directory):
+    dfs = [pd.read_csv(os.path.join(directory,path), usecols=["species_code","unique_gene_identifiers"]) for path in paths]
+    df = pd.concat(dfs, ignore_index=True)
+    return(df)
+
+
+def scale_rows(df, factor):
+    copies = []
+    for copy in range(factor):
+        copy_df = df.copy()
+        if copy > 0:
+            copy_df["unique_gene_identifiers"] = copy_df["unique_gene_identifiers"].map(lambda x: "|".join("{}_{}".format(name,copy) for name in x.split("|")))
+        copies.append(copy_df)
+    df = pd.concat(copies, ignore_index=True).reset_index()
+    df.rename({"index":"old_id"}, axis="columns", inplace=True)
+    return(df)
+
+
+# The per-row edge generation that combining.py used before the edges were built over whole columns.
+def generate_edges(df):
+    row_edges = lambda row: [(str(row["old_id"]),"{}[SEP]{}".format(row["species_code"],name)) for name in row["unique_gene_identifiers"].lower().split("|")]
+    edges = df.apply(row_edges, axis=1)
+    return(list(chain.from_iterable(edges.values)))
+
+
+def generate_edges_columnar(df):
+    return(build_edges(df["old_id"].values, df["species_code"].values, df["unique_gene_identifiers"].values))
+
+
+def gene_ids_using_networkx(df, edges):
+    g = nx.Graph()
+    g.add_edges_from(edges)
+    node_to_component = {}
+    component_index = 0
+    for node_set in nx.connected_components(g):
+        for node in node_set:
+            node_to_component[node] = component_index
+        component_index = component_index+1
+    return(np.array([node_to_component[str(i)] for i in range(len(df))]))
+
+
+def gene_ids_using_union_find(df, edges):
+    edge_rows = np.array([int(edge[0]) for edge in edges], dtype=np.int64)
+    edge_keys = [edge[1] for edge in edges]
+    return(resolve_gene_ids(len(df), edge_rows, edge_keys))
+
+
+# Tracing allocations slows down the code being traced, so the time and the peak memory come from separate runs.
+def measure(function, *args, memory=True):
+    start = time.perf_counter()
+    result = function(*args)
+    elapsed = time.perf_counter()-start
+    peak = 0
+    if memory:
+        tracemalloc.start()
+        function(*args)
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+    return(result, elapsed, peak)
+
+
+
+
+if __name__ == "__main__":
+
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--scales", type=int, nargs="+", default=[1,10,100])
+    parser.add_argument("--skip-networkx-above", type=int, default=None, help="don't run networkx for scales larger than this")
+    args = parser.parse_args()
+
+    data_directory = "../reshaped/data"
+    if not all(os.path.exists(os.path.join(data_directory,path)) for path in paths):
+        data_directory = "../reshaped/samples"
+    base_df = read_reshaped_files(data_directory)
+    print("read {} rows from {}".format(len(base_df), data_directory))
+
+    print("{:>6} {:>10} {:>10} {:>12} {:>12} {:>12} {:>12} {:>12} {:>12}".format("scale", "rows", "edges", "apply_s", "columnar_s", "networkx_s", "networkx_mb", "unionfind_s", "unionfind_mb"))
+    for scale in args.scales:
+        df = scale_rows(base_df, scale)
+        edges, apply_time, _ = measure(generate_edges, df, memory=False)
+        (edge_rows, edge_codes, edge_keys), columnar_time, _ = measure(generate_edges_columnar, df, memory=False)
+        assert [edge[1] for edge in edges] == list(edge_keys[edge_codes]), "edges differ between apply and columnar at scale {}".format(scale)
+        uf_ids, uf_time, uf_peak = measure(gene_ids_using_union_find, df, edges)
+        if args.skip_networkx_above is None or scale <= args.skip_networkx_above:
+            nx_ids, nx_time, nx_peak = measure(gene_ids_using_networkx, df, edges)
+            assert np.array_equal(nx_ids, uf_ids), "gene IDs differ between networkx and union-find at scale {}".format(scale)
+            nx_time, nx_peak = "{:.3f}".format(nx_time), "{:.1f}".format(nx_peak/1E6)
+        else:
+            nx_time, nx_peak = "skipped", "skipped"
+        print("{:>6} {:>10} {:>10} {:>12.3f} {:>12.3f} {:>12} {:>12} {:>12.3f} {:>12.1f}".format(scale, len(df), len(edges), apply_time, columnar_time, nx_time, nx_peak, uf_time, uf_peak/1E6))
@@ -0,0 +1,76 @@
+import sys
+import os
+import time
+import hashlib
+import argparse
+import tempfile
+import tracemalloc
+
+sys.path.append("../")
+from utils.json_export import FIELDS, ENCODERS, orjson, get_encoder, write_json, JsonLinesWriter
+from synthetic_data import synthetic_records
+
+
+
+
+# Compares the encoders that the json export can use, on synthetic records from synthetic_data.py shaped like the
+# rows of the combined genes_texts_annotations dataset. For each encoder and each layout (indented json, compact
+# json, and json lines) the records are written to a temporary file, and this reports the megabytes written per
+# second and the peak memory used while writing. The files written by each encoder are also checked to be exactly the same.
+
+
+
+
+def write_layout(records, path, layout, encoder):
+    if layout == "jsonl":
+        with JsonLinesWriter(path, encoder=encoder) as writer:
+            for record in records:
+                writer.write(record)
+    else:
+        with open(path, "w") as f:
+            write_json(records, f, compact=(layout == "compact"), encoder=encoder)
+
+
+# The time and the peak memory are measured in separate runs, because tracing the allocations slows things down.
+def measure(records, path, layout, encoder):
+    start = time.perf_counter()
+    write_layout(records, path, layout, encoder)
+    elapsed = time.perf_counter()-start
+    tracemalloc.start()
+    write_layout(records, path, layout, encoder)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    with open(path, "rb") as f:
+        digest = hashlib.sha1(f.read()).hexdigest()
+    return(elapsed, peak, os.path.getsize(path), digest)
+
+
+
+
+if __name__ == "__main__":
+
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--records", type=int, nargs="+", default=[10000,100000])
+    parser.add_argument("--layouts", nargs="+", choices=["indented","compact","jsonl"], default=["indented","compact","jsonl"])
+    parser.add_argument("--backends", nargs="+", choices=list(ENCODERS), default=list(ENCODERS))
+    args = parser.parse_args()
+
+    backends = [backend for backend in args.backends if backend != "orjson" or orjson is not None]
+    if len(backends) < len(args.backends):
+        print("orjson isn't installed, skipping it")
+
+    directory = tempfile.mkdtemp(prefix="benchmark_json_")
+    print("{:>10} {:>10} {:>10} {:>10} {:>10} {:>10} {:>10}".format("records", "layout", "backend", "size_mb", "seconds", "mb_per_s", "peak_mb"))
+    for num_records in args.records:
+        records = [{field:record[field] for field in FIELDS} for record in synthetic_records(num_records)]
+        for layout in args.layouts:
+            digests = {}
+            for backend in backends:
+                path = os.path.join(directory, "{}_{}_{}.json".format(num_records, layout, backend))
+                elapsed, peak, size, digests[backend] = measure(records, path, layout, get_encoder(backend))
+                print("{:>10} {:>10} {:>10} {:>10.1f} {:>10.3f} {:>10.1f} {:>10.1f}".format(num_records, layout, backend, size/1E6, elapsed, size/1E6/elapsed, peak/1E6))
+                os.remove(path)
+                if os.path.exists("{}.index".format(path)):
+                    os.remove("{}.index".format(path))
+            assert len(set(digests.values())) == 1, "output differs between backends for {} records as {}".format(num_records, layout)
+    os.rmdir(directory)
@@ -0,0 +1,164 @@
+import sys
+import os
+import re
+import time
+import argparse
+import pandas as pd
+import numpy as np
+
+sys.path.append("../")
+from utils.reshaping import join_columns, subtract_lists, find_gene_models
+
+
+
+
+# Compares three ways of building the identifier columns of the reshaped files: the per-row DataFrame.apply() and
+# Series.map() calls that the reshaping scripts used before, the loops over lists of plain strings in
+# utils/reshaping.py, and the same operations done with pandas string methods on whole columns, splitting the
+# lists with str.split(), putting every item on its own row with explode(), and joining them back into one list
+# for each row with groupby(). The unique and other gene identifier columns of the reshaped files are used as the
+# inputs, read from the data directory if they are there, otherwise from the samples directory, and larger sizes
+# are made by stacking copies of those rows. All three approaches have to give the same values at every size.
+#   join: Joining the unique and other identifiers into one list, like the "join" rule does.
+#   subtract: Removing the unique identifiers from the other identifiers, like the "subtract" rule does.
+#   gene_models: Finding the identifiers that look like Arabidopsis gene models, like the "gene_models" rule does.
+
+
+
+
+paths = [
+    "oellrich_walls_phene_descriptions.csv",
+    "oellrich_walls_phenotype_descriptions.csv",
+    "oellrich_walls_annotations.csv",
+    "sgn_phenotype_descriptions.csv",
+    "maizegdb_phenotype_descriptions.csv",
+    "maizegdb_curated_go_annotations.csv",
+    "tair_phenotype_descriptions.csv",
+    "tair_curated_go_annotations.csv",
+    "tair_curated_po_annotations.csv",
+    "planteome_curated_annotations.csv"
+]
+
+GENE_MODEL_PATTERNS = ["at[0-9mc]g[0-9]{5}"]
+
+
+
+
+def read_reshaped_files(directory):
+    dfs = [pd.read_csv(os.path.join(directory,path), usecols=["unique_gene_identifiers","other_gene_identifiers"]) for path in paths]
+    return(pd.concat(dfs, ignore_index=True))
+
+
+# Returns a list of the values as strings, with missing values as empty strings.
+def as_strings(values):
+    return(pd.Series(values).fillna("").astype(str).tolist())
+
+
+def scale_rows(df, size):
+    copies = int(np.ceil(size/len(df)))
+    return(pd.concat([df]*copies, ignore_index=True).iloc[:size])
+
+
+
+
+# What concatenate_with_delim() and subtract_string_lists() did for each row when they were called with apply().
+def concatenate_with_delim(delim, elements):
+    tokens = [token.strip() for element in elements for token in element.split(delim)]
+    return(delim.join(dict.fromkeys(token for token in tokens if token != "")))
+
+
+def subtract_string_lists(delim, string_list_1, string_list_2):
+    other_items = set(string_list_2.split(delim))
+    return(delim.join(item for item in string_list_1.split(delim) if item not in other_items))
+
+
+def join_using_apply(df, columns, delim="|"):
+    df = df.fillna("")
+    return(df.apply(lambda row: concatenate_with_delim(delim, [row[column] for column in columns]), axis=1).values)
+
+
+def subtract_using_apply(df, column, other_column, delim="|"):
+    df = df.fillna("")
+    return(df.apply(lambda row: subtract_string_lists(delim, row[column], row[other_column]), axis=1).values)
+
+
+def gene_models_using_map(values, patterns, delim="|"):
+    gene_model_pattern = re.compile("|".join("(?:{})".format(p) for p in patterns))
+    is_gene_model = lambda s: bool(gene_model_pattern.match(s.lower()))
+    return(pd.Series(as_strings(values)).map(lambda x: delim.join([s for s in x.split(delim) if is_gene_model(s)])).values)
+
+
+
+
+# The same operations with pandas string methods, explode(), and groupby() over whole columns.
+def _join_groups(items, num_rows, delim):
+    return(items.groupby(level=0, sort=True).agg(delim.join).reindex(range(num_rows), fill_value="").values)
+
+
+def join_using_explode(df, columns, delim="|"):
+    items = pd.concat([pd.Series(as_strings(df[column].values)).str.split(delim) for column in columns]).explode().str.strip()
+    items = items[items != ""]
+    items = items.iloc[np.argsort(items.index.values, kind="stable")]
+    items = items[~pd.MultiIndex.from_arrays([items.index.values, items.values]).duplicated()]
+    return(_join_groups(items, len(df), delim))
+
+
+def subtract_using_explode(df, column, other_column, delim="|"):
+    items = pd.Series(as_strings(df[column].values)).str.split(delim).explode()
+    other_items = pd.Series(as_strings(df[other_column].values)).str.split(delim).explode()
+    keep = ~pd.MultiIndex.from_arrays([items.index.values, items.values]).isin(pd.MultiIndex.from_arrays([other_items.index.values, other_items.values]))
+    return(_join_groups(items[keep], len(df), delim))
+
+
+def gene_models_using_explode(values, patterns, delim="|"):
+    pattern = "|".join("(?:{})".format(p) for p in patterns)
+    items = pd.Series(as_strings(values)).str.split(delim).explode()
+    return(_join_groups(items[items.str.lower().str.match(pattern)], len(values), delim))
+
+
+
+
+def timed(function, *args):
+    start = time.perf_counter()
+    result = function(*args)
+    return(time.perf_counter()-start, list(result))
+
+
+
+
+if __name__ == "__main__":
+
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10000,100000,1000000])
+    parser.add_argument("--data-dir", default="../reshaped/data")
+    parser.add_argument("--samples-dir", default="../reshaped/samples")
+    args = parser.parse_args()
+
+    directory = args.data_dir if all(os.path.exists(os.path.join(args.data_dir,path)) for path in paths) else args.samples_dir
+    df = read_reshaped_files(directory)
+    print("read {} rows from {}".format(len(df), directory))
+
+    columns = ["unique_gene_identifiers", "other_gene_identifiers"]
+    operations = {
+        "join":[
+            lambda df: join_using_apply(df, columns),
+            lambda df: join_columns(df, columns).values,
+            lambda df: join_using_explode(df, columns)],
+        "subtract":[
+            lambda df: subtract_using_apply(df, columns[1], columns[0]),
+            lambda df: subtract_lists(df[columns[1]].values, df[columns[0]].values),
+            lambda df: subtract_using_explode(df, columns[1], columns[0])],
+        "gene_models":[
+            lambda df: gene_models_using_map(df[columns[0]].values, GENE_MODEL_PATTERNS),
+            lambda df: find_gene_models(df[columns[0]].values, GENE_MODEL_PATTERNS),
+            lambda df: gene_models_using_explode(df[columns[0]].values, GENE_MODEL_PATTERNS)]}
+
+    print("{:>10} {:<12} {:>10} {:>10} {:>10} {:>14}".format("rows", "operation", "apply_s", "loops_s", "explode_s", "apply/loops"))
+    for size in args.sizes:
+        scaled_df = scale_rows(df, size)
+        for name,(old, loops, exploded) in operations.items():
+            old_seconds, old_values = timed(old, scaled_df)
+            loops_seconds, loops_values = timed(loops, scaled_df)
+            explode_seconds, explode_values = timed(exploded, scaled_df)
+            assert old_values == loops_values == explode_values, "{} gives different values at {} rows".format(name, size)
+            print("{:>10} {:<12} {:>10.2f} {:>10.2f} {:>10.2f} {:>14.1f}".format(size, name, old_seconds, loops_seconds, explode_seconds, old_seconds/loops_seconds))
@@ -0,0 +1,116 @@
+import sys
+import os
+import json
+import shutil
+import argparse
+
+sys.path.append("../")
+from pipeline import STAGES
+from utils.stages import run_stages
+from synthetic_data import write_synthetic_data
+
+
+
+
+# Runs the combining, to_json, and groupings stages on synthetic data at several scales, and reports the time and
+# memory each of them takes at each scale. For each scale a directory is made under the work directory with the
+# same layout as the repository, with the synthetic files from synthetic_data.py, a copy of the scripts, and links
+# to utils and lib. The stages are run there by the same runner that pipeline.py uses, so the measurements are the
+# ones from its run report, including the steps inside each stage. The scripts look for the oats package two
+# directories above the scripts directory, so a link to it is made in the work directory. Texts are annotated with
+# the dictionary annotator by default, using the ontology files written with the synthetic data, so that NOBLE
+# Coder isn't needed. Every run starts without any caches, so these are the times for a full rebuild.
+#
+# The results are saved as json, and can be compared against the results from an earlier run with --baseline,
+# which lists every stage that got slower or used more memory by more than the tolerance, and exits with an error
+# if there are any, so that it can be used to catch regressions.
+
+
+
+
+BENCHMARKED_STAGES = ["combining", "to_json", "save_groupings_to_files"]
+
+
+# Makes the directory for one scale, with everything the stages need to run in it.
+def prepare_root(root, scale, seed, repository, oats_dir):
+    if os.path.exists(root):
+        shutil.rmtree(root)
+    counts = write_synthetic_data(root, scale=scale, seed=seed)
+    shutil.copytree(os.path.join(repository, "scripts"), os.path.join(root, "scripts"), ignore=shutil.ignore_patterns("__pycache__"))
+    for name in ["utils", "lib"]:
+        if os.path.exists(os.path.join(repository, name)):
+            os.symlink(os.path.join(repository, name), os.path.join(root, name))
+    for directory in ["final/data", "final/samples", "reshaped/samples", "cache"]:
+        os.makedirs(os.path.join(root, directory), exist_ok=True)
+    oats_link = os.path.join(os.path.dirname(root), "oats")
+    if not os.path.lexists(oats_link) and os.path.exists(oats_dir):
+        os.symlink(oats_dir, oats_link)
+    return(counts)
+
+
+# Returns a list of the stages that got slower or used more memory than in the baseline by more than the tolerance.
+def compare(results, baseline, tolerance):
+    regressions = []
+    for scale,reports in results.items():
+        for name,report in reports.items():
+            before = baseline.get(scale, {}).get(name)
+            if before is None or report.get("status") != "ok" or before.get("status") != "ok":
+                continue
+            for key in ["wall_seconds", "peak_rss_mb"]:
+                if report[key] > before[key]*tolerance:
+                    regressions.append("{}x {}: {} went from {:.1f} to {:.1f}".format(scale, name, key, before[key], report[key]))
+    return(regressions)
+
+
+
+
+if __name__ == "__main__":
+
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--scales", type=int, nargs="+", default=[1,10,100])
+    parser.add_argument("--stages", nargs="+", choices=BENCHMARKED_STAGES, default=BENCHMARKED_STAGES)
+    parser.add_argument("--work-dir", default="work", help="directory for the synthetic data and copies of the scripts")
+    parser.add_argument("--oats-dir", default="../../oats")
+    parser.add_argument("--annotator", choices=["noble_coder","dictionary"], default="dictionary")
+    parser.add_argument("--workers", type=int, default=1, help="passed on to combining.py")
+    parser.add_argument("--jobs", type=int, default=1, help="number of stages to run at the same time, 1 so they don't compete")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", default="scaling_results.json")
+    parser.add_argument("--baseline", default=None, help="results from an earlier run to compare against")
+    parser.add_argument("--tolerance", type=float, default=1.2, help="how many times slower or larger counts as a regression")
+    args = parser.parse_args()
+
+    repository = os.path.abspath("..")
+    work_dir = os.path.abspath(args.work_dir)
+    extra_args = {"combining":["--annotator", args.annotator, "--ontology-dir", "../ontologies", "--workers", str(args.workers)]}
+    stages = [dict(stage, args=stage.get("args", [])+extra_args.get(stage["name"], [])) for stage in STAGES if stage["name"] in args.stages]
+
+    results = {}
+    for scale in args.scales:
+        root = os.path.join(work_dir, "scale_{}x".format(scale))
+        counts = prepare_root(root, scale, args.seed, repository, os.path.abspath(args.oats_dir))
+        print("scale {}x, {} reshaped rows".format(scale, sum(count for path,count in counts.items() if path.startswith("reshaped"))))
+        run_stages(stages, root, jobs=args.jobs, log_dir="logs")
+        with open(os.path.join(root, "logs", "run_report.json")) as f:
+            run_report = json.load(f)
+        results[str(scale)] = {report["name"]:report for report in run_report["stages"]}
+
+    print("{:>6} {:<26} {:>9} {:>10} {:>10} {:>10} {:>12} {:>12}".format("scale", "stage", "status", "wall_s", "cpu_s", "rss_mb", "rows_in", "rows_out"))
+    for scale,reports in results.items():
+        for name,report in reports.items():
+            if report.get("status") != "ok":
+                print("{:>6} {:<26} {:>9}".format(scale, name, report.get("status")))
+                continue
+            print("{:>6} {:<26} {:>9} {:>10.1f} {:>10.1f} {:>10.0f} {:>12} {:>12}".format(scale, name, report["status"],
+                report["wall_seconds"], report["cpu_seconds"], report["peak_rss_mb"], report["rows_in"], report["rows_out"]))
+    with open(args.output, "w") as f:
+        json.dump(results, f, indent=4)
+    print("saved the results to {}".format(args.output))
+
+    if args.baseline is not None:
+        with open(args.baseline) as f:
+            regressions = compare(results, json.load(f), args.tolerance)
+        for regression in regressions:
+            print("regression: {}".format(regression))
+        if len(regressions) > 0:
+            sys.exit(1)
@@ -0,0 +1,449 @@
+import sys
+import os
+import io
+import re
+import json
+import shutil
+import tempfile
+import argparse
+import importlib.util
+import pandas as pd
+import numpy as np
+import networkx as nx
+from itertools import chain
+from collections import defaultdict
+from nltk.tokenize import sent_tokenize, word_tokenize
+from gensim.parsing.preprocessing import preprocess_string
+
+sys.path.append("../")
+from utils.identity import IdentifierIndex, build_edges
+from utils.aggregation import aggregate_identifiers
+from utils.tokenization import tokenize_texts
+from utils.json_export import to_records, iter_records, write_json
+from utils.reshaping import join_columns, subtract_lists, find_gene_models, add_prefix
+
+sys.path.append("../../oats")
+try:
+    from oats.nlp.preprocess import concatenate_with_delim, subtract_string_lists
+    from oats.nlp.small import add_prefix_safely
+except ImportError:
+    concatenate_with_delim = None
+
+
+
+
+# Checks that the optimized code in utils gives the same outputs as the code that combining.py and to_json.py
+# used before it, which is copied below as it was. Each part is checked on its own, so that a difference is
+# reported for the part that caused it instead of only showing up in the final files.
+#   reshaping: Joining, subtracting, and prefixing lists of identifiers, and finding gene models, have to give the
+#       same values as the functions from oats that the reshaping scripts applied to each row.
+#   merging: The rows have to be split into exactly the same genes as the networkx connected components did.
+#   aggregation: The combined identifier columns for each gene have to be the same as the ones from groupby().
+#   tokenization: The sentence, word, and stem versions of every text have to be the same.
+#   combined: The combined file that combining.py writes has to have the same rows as the old code, except for
+#       the annotations it adds. The script itself is run on a copy of the fixture files, in a temporary directory
+#       with the same layout as the repository, using the dictionary annotator with empty ontology files.
+#   json: The full json file has to be byte for byte the same as the one json.dump() wrote.
+# The fixture inputs are the files in reshaped/samples for the first four, and the combined file in final/samples
+# for the json. Outputs are compared row by row within each gene, and genes are matched between the two outputs by
+# a key made from the species and the identifiers of every row in the gene rather than by _gene_id, because the
+# gene IDs from the persistent identifier index aren't numbered the same way as the old connected components.
+# Two normalizations are applied before comparing: missing values and empty strings are treated as the same, and
+# the order of the rows within a gene doesn't matter. The reshaping, aggregation, and combined checks need oats for
+# the old functions, and are skipped if it isn't found.
+
+
+
+
+# The top of the repository, where combining.py is run from for the combined check.
+REPOSITORY = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+PATHS = [
+    "oellrich_walls_phene_descriptions.csv",
+    "oellrich_walls_phenotype_descriptions.csv",
+    "oellrich_walls_annotations.csv",
+    "sgn_phenotype_descriptions.csv",
+    "maizegdb_phenotype_descriptions.csv",
+    "maizegdb_curated_go_annotations.csv",
+    "tair_phenotype_descriptions.csv",
+    "tair_curated_go_annotations.csv",
+    "tair_curated_po_annotations.csv",
+    "planteome_curated_annotations.csv"
+]
+
+CATEGORICAL_COLUMNS = ["species_name", "species_code", "reference_name", "reference_link", "reference_file"]
+
+FINAL_COLUMN_ORDER = [
+    "_gene_id",
+    "species_name",
+    "species_code",
+    "unique_gene_identifiers",
+    "other_gene_identifiers",
+    "gene_models",
+    "annotations",
+    "text_unprocessed",
+    "text_tokenized_sents",
+    "text_tokenized_words",
+    "text_tokenized_stems",
+    "reference_name",
+    "reference_link",
+    "reference_file"
+]
+
+COLS_TO_RETAIN_FROM_OLD_DF = ["_gene_id", "species_name", "species_code", "text_unprocessed", "annotations", "reference_name", "reference_link", "reference_file"]
+
+
+
+
+# The old versions, copied from combining.py and to_json.py.
+
+
+def legacy_gene_ids(df, case_sensitive=False):
+    df = df.reset_index()
+    df.rename({"index":"old_id"},axis="columns",inplace=True)
+    def generate_edges(row,case_sensitive):
+        if case_sensitive:
+            names = row["unique_gene_identifiers"].split("|")
+        else:
+            names = row["unique_gene_identifiers"].lower().split("|")
+        edges = [(str(row["old_id"]),"{}[SEP]{}".format(row["species_code"],name)) for name in names]
+        return(edges)
+    g = nx.Graph()
+    edges = df.apply(generate_edges, case_sensitive=case_sensitive, axis=1)
+    edges = list(chain.from_iterable(edges.values))
+    g.add_edges_from(edges)
+    node_to_component = {}
+    component_index = 0
+    for node_set in nx.connected_components(g):
+        for node in node_set:
+            node_to_component[node] = component_index
+        component_index = component_index+1
+    return(df["old_id"].map(lambda x: str(x)).map(node_to_component).values)
+
+
+def legacy_aggregate(df):
+    agg_df = df.groupby("_gene_id").agg({
+        "unique_gene_identifiers": lambda x: concatenate_with_delim("|",x),
+        "other_gene_identifiers": lambda x: concatenate_with_delim("|",x),
+        "gene_models": lambda x: concatenate_with_delim("|",x)
+    })
+    def remove_duplicate_names(row):
+        gene_names = row["unique_gene_identifiers"].split("|")
+        gene_synonyms = row["other_gene_identifiers"].split("|")
+        updated_gene_synonyms = [x for x in gene_synonyms if x not in gene_names]
+        gene_synonyms_str = concatenate_with_delim("|", updated_gene_synonyms)
+        return(gene_synonyms_str)
+    def reorder_unique_gene_identifers(row):
+        unique_identifiers = row["unique_gene_identifiers"].split("|")
+        gene_models = row["gene_models"].split("|")
+        reordered_unique_identifiers = [x for x in unique_identifiers if x not in gene_models]
+        reordered_unique_identifiers.extend(gene_models)
+        reordered_unique_identifiers_str = concatenate_with_delim("|", reordered_unique_identifiers)
+        return(reordered_unique_identifiers_str)
+    agg_df["other_gene_identifiers"] = agg_df.apply(lambda x: remove_duplicate_names(x), axis=1)
+    agg_df["unique_gene_identifiers"] = agg_df.apply(lambda x: reorder_unique_gene_identifers(x), axis=1)
+    return(agg_df)
+
+
+def legacy_reshape(df, patterns):
+    combine_gene_columns = lambda row, columns: concatenate_with_delim("|", [row[column] for column in columns])
+    combine_text_columns = lambda row, columns: concatenate_with_delim("; ", [row[column] for column in columns])
+    gene_model_patterns = [re.compile(pattern) for pattern in patterns]
+    is_gene_model = lambda s: any([bool(pattern.match(s.lower())) for pattern in gene_model_patterns])
+    return({
+        "joined identifiers":df.apply(lambda x: combine_gene_columns(x, ["unique_gene_identifiers", "other_gene_identifiers", "gene_models"]), axis=1).values,
+        "joined texts":df.apply(lambda x: combine_text_columns(x, ["text_unprocessed", "reference_name"]), axis=1).values,
+        "subtracted identifiers":df.apply(lambda row: subtract_string_lists("|", row["other_gene_identifiers"],row["unique_gene_identifiers"]), axis=1).values,
+        "gene models":df["unique_gene_identifiers"].map(lambda x: "|".join([s for s in x.split("|") if is_gene_model(s)])).values,
+        "prefixed identifiers":df["gene_models"].apply(add_prefix_safely, prefix="ncbi=").values})
+
+
+def legacy_tokenize(texts):
+    SENT_DELIMITER = "[SENT]"
+    def preprocess_sentences_full(text, sentence_delimiter):
+        sentences = text.split(sentence_delimiter)
+        sentences = [" ".join(preprocess_string(s)) for s in sentences]
+        reformatted_text = " {} ".format(sentence_delimiter).join(sentences)
+        reformatted_text = reformatted_text.strip()
+        return(reformatted_text)
+    def preprocess_sentences_partial(text, sentence_delimiter):
+        sentences = text.split(sentence_delimiter)
+        sentences = [" ".join(word_tokenize(s)) for s in sentences]
+        reformatted_text = " {} ".format(sentence_delimiter).join(sentences)
+        reformatted_text = reformatted_text.strip()
+        return(reformatted_text)
+    sents = texts.map(lambda x: x.replace(";","."), na_action="ignore")
+    sents = sents.map(sent_tokenize, na_action="ignore")
+    f = lambda sents: " ".join(["[SENT] {}".format(s) for s in sents])
+    sents = sents.map(f, na_action="ignore")
+    stems = sents.map(lambda x: preprocess_sentences_full(x, SENT_DELIMITER), na_action="ignore")
+    words = sents.map(lambda x: preprocess_sentences_partial(x, SENT_DELIMITER), na_action="ignore")
+    return(sents, words, stems)
+
+
+def legacy_combine(df):
+    df = df.copy()
+    df["_gene_id"] = legacy_gene_ids(df)
+    agg_df = legacy_aggregate(df)
+    new_df = df[COLS_TO_RETAIN_FROM_OLD_DF].merge(right=agg_df, on="_gene_id", how="left")
+    new_df["text_tokenized_sents"], new_df["text_tokenized_words"], new_df["text_tokenized_stems"] = legacy_tokenize(new_df["text_unprocessed"])
+    df = new_df[FINAL_COLUMN_ORDER]
+    df.sort_values(by="_gene_id", ascending=True, inplace=True, ignore_index=True)
+    df.drop_duplicates(keep="first", inplace=True, ignore_index=True)
+    return(df)
+
+
+def legacy_to_json(df):
+    infinite_defaultdict = lambda: defaultdict(infinite_defaultdict)
+    split_on_bar_without_empty_strings = lambda x: [y.strip() for y in x.split("|") if y.strip() != ""]
+    json_data = []
+    for row in df.itertuples():
+        d = infinite_defaultdict()
+        d["_gene_id"] = row._1
+        d["species_code"] = row.species_code
+        d["species_name"] = row.species_name
+        d["unique_gene_identifiers"] = split_on_bar_without_empty_strings(row.unique_gene_identifiers)
+        d["other_gene_identifiers"] = split_on_bar_without_empty_strings(row.other_gene_identifiers)
+        d["gene_models"] = split_on_bar_without_empty_strings(row.gene_models)
+        d["text_unprocessed"] = row.text_unprocessed
+        d["text_tokenized_sents"] = row.text_tokenized_sents
+        d["text_tokenized_words"] = row.text_tokenized_words
+        d["text_tokenized_stems"] = row.text_tokenized_stems
+        d["annotations"] = split_on_bar_without_empty_strings(row.annotations)
+        d["annotations_nc"] = split_on_bar_without_empty_strings(row.annotations_nc)
+        d["reference_name"] = row.reference_name
+        d["reference_file"] = row.reference_file
+        d["reference_link"] = row.reference_link
+        json_data.append(d)
+    return(json_data)
+
+
+
+
+# The current versions, doing the same things in the same order as combining.py and to_json.py.
+
+
+def new_reshape(df, patterns):
+    return({
+        "joined identifiers":join_columns(df, ["unique_gene_identifiers", "other_gene_identifiers", "gene_models"]).values,
+        "joined texts":join_columns(df, ["text_unprocessed", "reference_name"], "; ").values,
+        "subtracted identifiers":subtract_lists(df["other_gene_identifiers"].values, df["unique_gene_identifiers"].values),
+        "gene models":find_gene_models(df["unique_gene_identifiers"].values, patterns),
+        "prefixed identifiers":add_prefix(df["gene_models"].values, "ncbi=")})
+
+
+def new_gene_ids(df, case_sensitive=False):
+    edge_rows, edge_codes, edge_keys = build_edges(np.arange(len(df)), df["species_code"].values, df["unique_gene_identifiers"].values, case_sensitive=case_sensitive)
+    return(IdentifierIndex().assign_codes(len(df), edge_rows, edge_codes, edge_keys))
+
+
+def new_aggregate(df):
+    return(aggregate_identifiers(df["_gene_id"].values, df["unique_gene_identifiers"].values, df["other_gene_identifiers"].values, df["gene_models"].values))
+
+
+def new_tokenize(texts):
+    present = texts.dropna()
+    sents, words, stems = tokenize_texts(present.values)
+    columns = [pd.Series(values, index=present.index, dtype=object).reindex(texts.index) for values in (sents, words, stems)]
+    return(tuple(columns))
+
+
+# Runs main() from combining.py on the reshaped files in the directory, and returns the combined file it writes.
+# The files are copied into a temporary directory with the layout the script expects, which is removed after.
+def new_combine(directory):
+    root = tempfile.mkdtemp(prefix="check_equivalence_")
+    working_directory = os.getcwd()
+    try:
+        for path in ["reshaped/data", "final/data", "final/samples", "cache", "ontologies", "scripts"]:
+            os.makedirs(os.path.join(root, path))
+        for path in PATHS:
+            shutil.copy(os.path.join(directory, path), os.path.join(root, "reshaped/data", path))
+        for ontology in ["pato", "po", "go"]:
+            open(os.path.join(root, "ontologies", "{}.obo".format(ontology)), "w").close()
+        spec = importlib.util.spec_from_file_location("combining", os.path.join(REPOSITORY, "scripts", "combining.py"))
+        combining = importlib.util.module_from_spec(spec)
+        spec.loader.exec_module(combining)
+        os.chdir(os.path.join(root, "scripts"))
+        combining.main(["--annotator", "dictionary", "--ontology-dir", "../ontologies"])
+        return(pd.read_csv(os.path.join(root, "final/data/genes_texts_annotations.csv"), dtype=str))
+    finally:
+        os.chdir(working_directory)
+        shutil.rmtree(root, ignore_errors=True)
+
+
+
+
+# Returns a key for the gene on each row that doesn't depend on how the genes were numbered, made from the species
+# and the sorted, lowercased unique identifiers of every row with that gene ID.
+def component_keys(df):
+    names = df["unique_gene_identifiers"].fillna("").astype(str).str.lower().str.split("|")
+    exploded = pd.DataFrame({"_gene_id":df["_gene_id"].values, "species_code":df["species_code"].astype(str).values, "name":names.values}).explode("name")
+    exploded = exploded[exploded["name"].str.strip() != ""]
+    keys = exploded.groupby("_gene_id").apply(lambda x: "{}:{}".format(x["species_code"].iloc[0], "|".join(sorted(set(x["name"].str.strip())))))
+    return(df["_gene_id"].map(keys).fillna("").values)
+
+
+def _normalize(value):
+    if isinstance(value, float) and np.isnan(value):
+        return("")
+    return(str(value))
+
+
+# Compares two dataframes row by row within each gene, matching the genes by their component keys, and returns a
+# list of the differences. Each difference is a dictionary with the component key, what kind of difference it is,
+# and for rows that differ, the first column that's different and its values in each output.
+def diff_by_component(legacy_df, new_df, columns):
+    groups = []
+    for df in (legacy_df, new_df):
+        rows = defaultdict(list)
+        values = [[_normalize(value) for value in df[column].values] for column in columns]
+        for key,row in zip(component_keys(df), zip(*values)):
+            rows[key].append(row)
+        groups.append({key:sorted(value) for key,value in rows.items()})
+    legacy_groups, new_groups = groups
+    mismatches = []
+    for key in sorted(set(legacy_groups) | set(new_groups)):
+        if key not in new_groups:
+            mismatches.append({"component":key, "kind":"only in legacy output", "rows":len(legacy_groups[key])})
+        elif key not in legacy_groups:
+            mismatches.append({"component":key, "kind":"only in new output", "rows":len(new_groups[key])})
+        elif len(legacy_groups[key]) != len(new_groups[key]):
+            mismatches.append({"component":key, "kind":"different number of rows", "legacy":len(legacy_groups[key]), "new":len(new_groups[key])})
+        else:
+            for legacy_row,new_row in zip(legacy_groups[key], new_groups[key]):
+                if legacy_row != new_row:
+                    column = next(i for i in range(len(columns)) if legacy_row[i] != new_row[i])
+                    mismatches.append({"component":key, "kind":"different values", "column":columns[column], "legacy":legacy_row[column], "new":new_row[column]})
+                    break
+    return(mismatches)
+
+
+
+
+def read_fixture(directory, categorical):
+    dtype = {column:"category" for column in CATEGORICAL_COLUMNS} if categorical else None
+    dfs = [pd.read_csv(os.path.join(directory, path), dtype=dtype) for path in PATHS]
+    if categorical:
+        for column in CATEGORICAL_COLUMNS:
+            categories = pd.api.types.union_categoricals([df[column] for df in dfs]).categories
+            for df in dfs:
+                df[column] = df[column].cat.set_categories(categories)
+    return(pd.concat(dfs, ignore_index=True))
+
+
+# The gene model patterns from all of the reshaping scripts.
+GENE_MODEL_PATTERNS = ["grmzm.+", "zm[0-9]+d[0-9]+", "solyc[0-9]+g[0-9]+", "at[0-9]{1}g[0-9]+", "medtr[0-9]{1}g[0-9]+", "os[0-9]+g[0-9]+", "loc_os[0-9]+g[0-9]+"]
+
+
+def check_reshaping(legacy_input):
+    df = legacy_input.fillna("").astype(str)
+    legacy_outputs = legacy_reshape(df, GENE_MODEL_PATTERNS)
+    new_outputs = new_reshape(df, GENE_MODEL_PATTERNS)
+    mismatches = []
+    for name in legacy_outputs:
+        for i,(legacy_value,new_value) in enumerate(zip(legacy_outputs[name], new_outputs[name])):
+            if legacy_value != new_value:
+                mismatches.append({"component":"row {}".format(i), "kind":"different values", "column":name, "legacy":legacy_value, "new":new_value})
+    return(mismatches)
+
+
+def check_merging(legacy_input, new_input):
+    legacy_ids = legacy_gene_ids(legacy_input)
+    new_ids = new_gene_ids(new_input)
+    rows = pd.Series(np.arange(len(legacy_input)))
+    legacy_first = rows.groupby(legacy_ids).transform("min").values
+    new_first = rows.groupby(new_ids).transform("min").values
+    return([{"component":"row {}".format(i), "kind":"grouped with different rows", "identifiers":legacy_input["unique_gene_identifiers"].iloc[i],
+        "legacy":int(legacy_first[i]), "new":int(new_first[i])} for i in np.flatnonzero(legacy_first != new_first)])
+
+
+def check_aggregation(legacy_input, new_input):
+    gene_ids = new_gene_ids(new_input)
+    legacy_agg = legacy_aggregate(legacy_input.assign(_gene_id=gene_ids)).reset_index()
+    new_agg = new_aggregate(new_input.assign(_gene_id=gene_ids)).reset_index()
+    legacy_agg["species_code"] = legacy_agg["_gene_id"].map(pd.Series(new_input["species_code"].astype(str).values, index=gene_ids).groupby(level=0).first())
+    new_agg["species_code"] = new_agg["_gene_id"].map(pd.Series(new_input["species_code"].astype(str).values, index=gene_ids).groupby(level=0).first())
+    return(diff_by_component(legacy_agg, new_agg, ["unique_gene_identifiers","other_gene_identifiers","gene_models"]))
+
+
+def check_tokenization(legacy_input, new_input):
+    texts = pd.Series(pd.unique(legacy_input["text_unprocessed"].dropna()))
+    legacy_outputs = legacy_tokenize(texts)
+    new_outputs = new_tokenize(texts)
+    mismatches = []
+    for name,legacy_values,new_values in zip(["text_tokenized_sents","text_tokenized_words","text_tokenized_stems"], legacy_outputs, new_outputs):
+        for text,legacy_value,new_value in zip(texts, legacy_values, new_values):
+            if legacy_value != new_value:
+                mismatches.append({"component":text[:60], "kind":"different values", "column":name, "legacy":legacy_value, "new":new_value})
+    return(mismatches)
+
+
+# The old code also dropped the genes without any text after annotating them, which is done here as well.
+def check_combined(legacy_input, directory):
+    legacy_df = legacy_combine(legacy_input)
+    legacy_df = legacy_df[legacy_df["_gene_id"].isin(legacy_df[legacy_df["text_unprocessed"].notnull()]["_gene_id"].values)]
+    new_df = new_combine(directory)
+    return(diff_by_component(legacy_df, new_df, [column for column in FINAL_COLUMN_ORDER if column != "_gene_id"]))
+
+
+def check_json(path):
+    legacy_text = json.dumps(legacy_to_json(pd.read_csv(path).fillna("")), indent=4)
+    f = io.StringIO()
+    write_json(iter_records(path), f)
+    new_text = f.getvalue()
+    if legacy_text == new_text:
+        return([])
+    legacy_records = pd.DataFrame(json.loads(legacy_text))
+    new_records = pd.DataFrame(json.loads(new_text))
+    columns = [column for column in legacy_records.columns if column != "_gene_id"]
+    for df in (legacy_records, new_records):
+        for column in columns:
+            df[column] = df[column].map(lambda x: "|".join(x) if isinstance(x, list) else x)
+    mismatches = diff_by_component(legacy_records, new_records, columns)
+    if len(mismatches) == 0:
+        mismatches.append({"component":"whole file", "kind":"same records but the files aren't byte for byte the same"})
+    return(mismatches)
+
+
+
+
+if __name__ == "__main__":
+
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--checks", nargs="+", choices=["reshaping","merging","aggregation","tokenization","combined","json"], default=["reshaping","merging","aggregation","tokenization","combined","json"])
+    parser.add_argument("--reshaped-dir", default="../reshaped/samples", help="directory with the reshaped files to use as inputs")
+    parser.add_argument("--combined-path", default="../final/samples/genes_texts_annotations.csv", help="combined csv file to use as the input for the json check")
+    parser.add_argument("--max-shown", type=int, default=10, help="number of mismatches to print for each check")
+    parser.add_argument("--report", default=None, help="file to save every mismatch to as json")
+    args = parser.parse_args()
+
+    legacy_input = read_fixture(args.reshaped_dir, categorical=False)
+    new_input = read_fixture(args.reshaped_dir, categorical=True)
+    print("read {} rows from {}".format(len(legacy_input), args.reshaped_dir))
+
+    checks = {
+        "reshaping":lambda: check_reshaping(legacy_input),
+        "merging":lambda: check_merging(legacy_input, new_input),
+        "aggregation":lambda: check_aggregation(legacy_input, new_input),
+        "tokenization":lambda: check_tokenization(legacy_input, new_input),
+        "combined":lambda: check_combined(legacy_input, args.reshaped_dir),
+        "json":lambda: check_json(args.combined_path)}
+    needs_oats = ["reshaping", "aggregation", "combined"]
+
+    report = {}
+    for name in args.checks:
+        if name in needs_oats and concatenate_with_delim is None:
+            print("{:<14} skipped, oats isn't installed".format(name))
+            report[name] = None
+            continue
+        mismatches = checks[name]()
+        report[name] = mismatches
+        print("{:<14} {}".format(name, "ok" if len(mismatches) == 0 else "{} mismatches".format(len(mismatches))))
+        for mismatch in mismatches[:args.max_shown]:
+            print("    {}".format(mismatch))
+
+    if args.report is not None:
+        with open(args.report, "w") as f:
+            json.dump(report, f, indent=4)
+    if any(mismatches is not None and len(mismatches) > 0 for mismatches in report.values()):
+        sys.exit(1)
@@ -0,0 +1,379 @@
+import os
+import random
+import argparse
+import pandas as pd
+
+
+
+
+# Writes a synthetic copy of everything the combining, to_json, and groupings stages read, so that those stages
+# can be run and timed without the files from the databases and papers, which aren't in the repository. The files
+# are written under a root directory with the same layout as the repository, so the scripts can be run from a copy
+# of the scripts directory inside it. The reshaped files have the same columns as the ones the reshaping scripts
+# write, and the same kinds of values, like delimited lists of identifiers where some are gene models and some are
+# names, case differences between sources, and phenotype descriptions that are repeated across rows. Every source
+# draws its genes from one pool of genes for each species, so the same genes show up in several sources under
+# different combinations of their identifiers, and the identifiers have to be merged the way they are for the real
+# data. The groupings files from PlantCyc, KEGG, and Lloyd and Meinke use the same genes. The texts are built from
+# the names of the terms in small ontology files that are written as well, so the dictionary annotator finds terms
+# in them. The scale multiplies both the number of rows and the number of genes. Records shaped like the rows of the
+# combined dataset can also be made directly from the same genes and texts, for benchmarks that only need those.
+
+
+
+
+SPECIES = {
+    "ath":{"name":"Arabidopsis thaliana", "genes":4000},
+    "zma":{"name":"Zea mays ssp mays", "genes":2000},
+    "sly":{"name":"Solanum lycopersicum", "genes":600},
+    "osa":{"name":"Oryza sativa", "genes":600},
+    "gmx":{"name":"Glycine max", "genes":300},
+    "mtr":{"name":"Medicago truncatula", "genes":300},
+}
+
+
+# The terms that the texts are built from, and that the ontology files are written with, with a synonym for some.
+TERMS = [
+    ("PATO:0000569", "decreased height", "dwarf"),
+    ("PATO:0000570", "increased height", "tall"),
+    ("PATO:0000574", "decreased length", "short"),
+    ("PATO:0000573", "increased length", "long"),
+    ("PATO:0000587", "decreased size", "small"),
+    ("PATO:0000586", "increased size", "large"),
+    ("PATO:0000323", "white", None),
+    ("PATO:0000370", "pale green", None),
+    ("PATO:0000460", "abnormal", None),
+    ("PATO:0001236", "process quality", None),
+    ("PATO:0000502", "delayed", "late"),
+    ("PATO:0000694", "premature", "early"),
+    ("PO:0025034", "leaf", "leaves"),
+    ("PO:0009009", "plant embryo", "embryo"),
+    ("PO:0009010", "seed", "seeds"),
+    ("PO:0009047", "stem", "stems"),
+    ("PO:0009005", "root", "roots"),
+    ("PO:0009046", "flower", "flowers"),
+    ("PO:0009089", "endosperm", None),
+    ("PO:0020039", "leaf lamina", "leaf blade"),
+    ("PO:0009006", "shoot system", "shoot"),
+    ("PO:0000003", "whole plant", "plants"),
+    ("GO:0009908", "flower development", None),
+    ("GO:0048364", "root development", None),
+    ("GO:0009739", "response to gibberellin", None),
+    ("GO:0015979", "photosynthesis", None),
+    ("GO:0009416", "response to light stimulus", "response to light"),
+    ("GO:0010029", "regulation of seed germination", None),
+    ("GO:0009790", "embryo development", None),
+    ("GO:0006950", "response to stress", None),
+]
+
+ONTOLOGY_NAMES = {"PATO":"pato", "PO":"po", "GO":"go"}
+
+QUALITIES = [term for term in TERMS if term[0].startswith("PATO")]
+ENTITIES = [term for term in TERMS if term[0].startswith("PO")]
+PROCESSES = [term for term in TERMS if term[0].startswith("GO")]
+
+TEMPLATES = [
+    "{quality} {entity}",
+    "{entity} are {quality}",
+    "{quality} {entity}; {quality2} {entity2}",
+    "Plants show {quality} {entity} and {quality2} {entity2}.",
+    "Mutant {entity} are {quality} compared to wild type.",
+    "{quality} {entity}, with defects in {process}.",
+    "Lethal at the {entity} stage; {quality} {entity2}.",
+    "{process} is {quality}. {entity} are {quality2}.",
+]
+
+SYLLABLES = ["ab", "cr", "de", "fl", "gl", "in", "lo", "ma", "na", "or", "ph", "ro", "st", "ve", "wa", "zy"]
+WORDS = ["narrow", "sheath", "dwarf", "glossy", "albino", "floury", "opaque", "tassel", "seed", "leaf", "root",
+    "kinase", "synthase", "reductase", "binding", "protein", "factor", "like", "domain", "receptor"]
+
+SOURCES = [
+    {"path":"oellrich_walls_phene_descriptions.csv", "species":["ath","zma","sly","osa","gmx","mtr"], "rows":2700, "kind":"text",
+        "species_names":"full", "reference_name":"Oellrich, Walls et al., 2015",
+        "reference_link":"https://plantmethods.biomedcentral.com/articles/10.1186/s13007-015-0053-y", "reference_file":"13007_2015_53_MOESM1_ESM.csv"},
+    {"path":"oellrich_walls_phenotype_descriptions.csv", "species":["ath","zma","sly","osa","gmx","mtr"], "rows":1200, "kind":"text",
+        "species_names":"full", "reference_name":"Oellrich, Walls et al., 2015",
+        "reference_link":"https://plantmethods.biomedcentral.com/articles/10.1186/s13007-015-0053-y", "reference_file":"13007_2015_53_MOESM1_ESM.csv"},
+    {"path":"oellrich_walls_annotations.csv", "species":["ath","zma","sly","osa","gmx","mtr"], "rows":2700, "kind":"annotations", "ontologies":["GO","PO","PATO"],
+        "species_names":"full", "reference_name":"Oellrich, Walls et al., 2015",
+        "reference_link":"https://plantmethods.biomedcentral.com/articles/10.1186/s13007-015-0053-y", "reference_file":"13007_2015_53_MOESM1_ESM.csv"},
+    {"path":"sgn_phenotype_descriptions.csv", "species":["sly"], "rows":500, "kind":"text",
+        "species_names":{"sly":"tomato"}, "reference_name":"SGN", "reference_link":"https://solgenomics.net/", "reference_file":"sgn_tomato_phenotyped_loci.txt"},
+    {"path":"maizegdb_phenotype_descriptions.csv", "species":["zma"], "rows":3600, "kind":"text",
+        "species_names":{"zma":"maize"}, "reference_name":"MaizeGDB", "reference_link":"https://www.maizegdb.org/", "reference_file":"pheno_genes.txt"},
+    {"path":"maizegdb_curated_go_annotations.csv", "species":["zma"], "rows":3000, "kind":"annotations", "ontologies":["GO"],
+        "species_names":{"zma":"maize"}, "reference_name":"MaizeGDB", "reference_link":"https://www.maizegdb.org/", "reference_file":"maize_v3.gold.gaf"},
+    {"path":"tair_phenotype_descriptions.csv", "species":["ath"], "rows":3600, "kind":"text", "upper":True,
+        "species_names":{"ath":"Arabidopsis"}, "reference_name":"TAIR", "reference_link":"https://www.arabidopsis.org/", "reference_file":"Locus_Germplasm_Phenotype_20190930.txt"},
+    {"path":"tair_curated_go_annotations.csv", "species":["ath"], "rows":6000, "kind":"annotations", "ontologies":["GO"], "upper":True,
+        "species_names":{"ath":"Arabidopsis"}, "reference_name":"TAIR", "reference_link":"https://www.arabidopsis.org/", "reference_file":"ATH_GO_GOSLIM.txt"},
+    {"path":"tair_curated_po_annotations.csv", "species":["ath"], "rows":4000, "kind":"annotations", "ontologies":["PO"], "upper":True,
+        "species_names":{"ath":"Arabidopsis"}, "reference_name":"TAIR", "reference_link":"https://www.arabidopsis.org/", "reference_file":"po_anatomy_gene_arabidopsis_tair.assoc"},
+    {"path":"planteome_curated_annotations.csv", "species":["ath","zma","sly","osa"], "rows":5000, "kind":"annotations", "ontologies":["GO","PO"],
+        "species_names":{"ath":"arabidopsis", "zma":"maize", "sly":"tomato", "osa":"rice"}, "reference_name":"Planteome", "reference_link":"https://planteome.org/", "reference_file":"biological_process.txt"},
+]
+
+COLUMNS = [
+    "species_name",
+    "species_code",
+    "unique_gene_identifiers",
+    "other_gene_identifiers",
+    "gene_models",
+    "text_unprocessed",
+    "annotations",
+    "reference_name",
+    "reference_link",
+    "reference_file"]
+
+PLANTCYC_FILES = {
+    "ath":"aracyc_pathways.20180702",
+    "zma":"corncyc_pathways.20180702",
+    "mtr":"mtruncatulacyc_pathways.20180702",
+    "osa":"oryzacyc_pathways.20180702",
+    "gmx":"soycyc_pathways.20180702",
+    "sly":"tomatocyc_pathways.20180702"}
+
+LLOYD_MEINKE_CLASSES = [("R","Reproductive"), ("S","Seed"), ("T","Tissue-specific"), ("V","Vegetative"), ("M","Morphological")]
+LLOYD_MEINKE_SUBSETS = [("GAM","Gametophyte defective"), ("EMB","Embryo defective"), ("SRL","Seedling lethal"),
+    ("FLT","Flowering time"), ("SSC","Seedling size and color"), ("LEF","Leaf morphology"), ("ROT","Root"), ("STM","Stem")]
+
+
+
+
+# Returns a gene model identifier in the style used for the species, which is different for every i.
+def gene_model(species_code, i):
+    chromosomes = {"ath":5, "zma":10, "sly":12, "osa":12, "gmx":20, "mtr":8}[species_code]
+    chromosome, number = i%chromosomes+1, 10*(i//chromosomes+1)
+    formats = {
+        "ath":"AT{}G{:05d}".format(chromosome, number),
+        "zma":"GRMZM2G{:06d}".format(10*(i+1)),
+        "sly":"Solyc{:02d}g{:06d}".format(chromosome, number),
+        "osa":"LOC_Os{:02d}g{:05d}".format(chromosome, number),
+        "gmx":"Glyma.{:02d}G{:06d}".format(chromosome, number),
+        "mtr":"Medtr{}g{:06d}".format(chromosome, number)}
+    return(formats[species_code])
+
+
+# Returns the pool of genes for each species, where each gene has a gene model, a symbol, a longer name, and a
+# few aliases. The symbols end with the number of the gene within its species, so no two genes share a symbol or
+# an alias, and rows are only merged when they're for the same gene. Otherwise the genes that happen to share a
+# symbol are chained together into a few huge genes, which grow faster than the scale and make the larger scales
+# measure those genes instead of the stages.
+def make_genes(rng, scale):
+    genes = {}
+    for species_code,species in SPECIES.items():
+        genes[species_code] = []
+        for i in range(species["genes"]*scale):
+            symbol = "".join(rng.choice(SYLLABLES) for _ in range(rng.randint(1,2)))+str(i+1)
+            name = "{} {}{}".format(rng.choice(WORDS), rng.choice(WORDS), rng.randint(1,9))
+            aliases = ["{}{}".format(symbol.upper(), rng.choice(["", "-1", "-2", "A"])) for _ in range(rng.randint(0,3))]
+            genes[species_code].append({"model":gene_model(species_code, i), "symbol":symbol, "name":name, "aliases":aliases})
+    return(genes)
+
+
+def make_text(rng):
+    quality, quality2 = rng.choice(QUALITIES), rng.choice(QUALITIES)
+    entity, entity2 = rng.choice(ENTITIES), rng.choice(ENTITIES)
+    process = rng.choice(PROCESSES)
+    pick = lambda term: term[2] if term[2] is not None and rng.random() < 0.5 else term[1]
+    text = rng.choice(TEMPLATES).format(quality=pick(quality), quality2=pick(quality2), entity=pick(entity), entity2=pick(entity2), process=pick(process))
+    return(text[0].upper()+text[1:])
+
+
+def make_annotations(rng, ontologies):
+    terms = [term[0] for term in TERMS if term[0].split(":")[0] in ontologies]
+    return("|".join(rng.sample(terms, rng.randint(1,min(4,len(terms))))))
+
+
+# Returns the rows of one reshaped file. Genes are picked with a skew towards some genes, so that some genes have
+# many rows and most have only a few. The skew is relative to the size of the pool, and the long tail wraps around
+# it instead of piling up on the last gene, so the most rows any one gene has stays about the same at every scale.
+# Each row has some of the identifiers of its gene, so rows for the same gene in different sources are often only
+# connected through a third row that has both of their identifiers.
+def make_source_rows(rng, source, genes, scale):
+    rows = []
+    num_texts = max(1, source["rows"]*scale//3)
+    texts = [make_text(rng) for _ in range(num_texts)] if source["kind"] == "text" else []
+    for _ in range(source["rows"]*scale):
+        species_code = rng.choice(source["species"])
+        pool = genes[species_code]
+        gene = pool[int((rng.paretovariate(1.2)-1)*len(pool)/20)%len(pool) if rng.random() < 0.5 else rng.randrange(len(pool))]
+        symbol = gene["symbol"].upper() if source.get("upper") else gene["symbol"]
+        choice = rng.random()
+        if choice < 0.4:
+            unique = [symbol, gene["model"]]
+        elif choice < 0.7:
+            unique = [gene["model"]]
+        elif choice < 0.9:
+            unique = [symbol]
+        else:
+            unique = [symbol]+gene["aliases"][:1]+[gene["model"]]
+        other = [gene["name"]]+gene["aliases"][1:]
+        models = [gene["model"]] if gene["model"] in unique else []
+        names = source["species_names"]
+        rows.append({
+            "species_name":SPECIES[species_code]["name"] if names == "full" else names[species_code],
+            "species_code":species_code,
+            "unique_gene_identifiers":"|".join(unique),
+            "other_gene_identifiers":"|".join(other),
+            "gene_models":"|".join(models),
+            "text_unprocessed":rng.choice(texts) if source["kind"] == "text" else "",
+            "annotations":make_annotations(rng, source["ontologies"]) if source["kind"] == "annotations" else "",
+            "reference_name":source["reference_name"],
+            "reference_link":source["reference_link"],
+            "reference_file":source["reference_file"]})
+    return(pd.DataFrame(rows, columns=COLUMNS))
+
+
+
+
+def write_ontologies(directory):
+    os.makedirs(directory, exist_ok=True)
+    for prefix,ontology in ONTOLOGY_NAMES.items():
+        with open(os.path.join(directory, "{}.obo".format(ontology)), "w") as f:
+            f.write("format-version: 1.2\nontology: {}\n\n".format(ontology))
+            for term_id,name,synonym in TERMS:
+                if term_id.startswith("{}:".format(prefix)):
+                    f.write("[Term]\nid: {}\nname: {}\n".format(term_id, name))
+                    if synonym is not None:
+                        f.write('synonym: "{}" EXACT []\n'.format(synonym))
+                    f.write("\n")
+
+
+# Writes the pathway files in the format of the PlantCyc pathway dumps, one tab-separated file for each species.
+def write_plantcyc(rng, directory, genes, scale):
+    os.makedirs(directory, exist_ok=True)
+    num_rows = 0
+    for species_code,filename in PLANTCYC_FILES.items():
+        lines = ["Pathway-id\tPathway-name\tReaction-id\tEC\tProtein-id\tProtein-name\tGene-id\tGene-name"]
+        for p in range(20*scale):
+            pathway_id, pathway_name = "PWY-{}".format(1000+p), "{} biosynthesis {}".format(rng.choice(WORDS), p)
+            for gene in rng.sample(genes[species_code], min(len(genes[species_code]), rng.randint(3,15))):
+                ec = "EC-{}.{}.{}.{}".format(rng.randint(1,6), rng.randint(1,9), rng.randint(1,9), rng.randint(1,200))
+                lines.append("\t".join([pathway_id, pathway_name, "RXN-{}".format(rng.randint(1,99999)), ec,
+                    "{}-MONOMER".format(gene["model"]), gene["name"], gene["model"], gene["symbol"].upper()]))
+        with open(os.path.join(directory, filename), "w") as f:
+            f.write("\n".join(lines)+"\n")
+        num_rows += len(lines)-1
+    return(num_rows)
+
+
+# Writes the pathway files in the flat file format that the KEGG REST API returns for each pathway, one file for
+# each pathway in a directory for each species.
+def write_kegg(rng, directory, genes, scale, species_codes, human_directory):
+    num_genes = 0
+    for species_code in species_codes+["hsa"]:
+        species_directory = os.path.join(directory if species_code != "hsa" else human_directory, "{}_pathway_files_from_api".format(species_code))
+        os.makedirs(species_directory, exist_ok=True)
+        pool = genes.get(species_code, [{"model":"{}".format(1000+i), "symbol":"HSA{}".format(i), "name":"human gene {}".format(i), "aliases":[]} for i in range(200)])
+        species_name = SPECIES[species_code]["name"] if species_code in SPECIES else "Homo sapiens (human)"
+        for p in range(15*scale):
+            number = "{:05d}".format(10*(p+1))
+            lines = [
+                "ENTRY       {}{}                    Pathway".format(species_code, number),
+                "NAME        {} {} - {}".format(rng.choice(WORDS).capitalize(), rng.choice(["metabolism","biosynthesis","signaling"]), species_name),
+                "CLASS       Metabolism; {} metabolism".format(rng.choice(WORDS).capitalize()),
+                "PATHWAY_MAP {}{}  {} pathway".format(species_code, number, rng.choice(WORDS).capitalize()),
+                "ORGANISM    {} [GN:{}]".format(species_name, species_code)]
+            for g,gene in enumerate(rng.sample(pool, min(len(pool), rng.randint(3,25)))):
+                entry = "{}  {}; {} [KO:K{:05d}]".format(gene["model"], gene["symbol"], gene["name"], rng.randint(1,20000))
+                if rng.random() < 0.5:
+                    entry = "{} [EC:{}.{}.{}.{}]".format(entry, rng.randint(1,6), rng.randint(1,9), rng.randint(1,9), rng.randint(1,200))
+                lines.append("{}{}".format("GENE        " if g == 0 else "            ", entry))
+                num_genes += 1
+            lines.extend(["KO_PATHWAY  ko{}".format(number), "///"])
+            with open(os.path.join(species_directory, "path_{}{}.txt".format(species_code, number)), "w") as f:
+                f.write("\n".join(lines)+"\n")
+    return(num_genes)
+
+
+# Writes the two cleaned supplemental tables from Lloyd and Meinke, 2012, which only have Arabidopsis genes.
+# The groupings script reads the class and subset columns of the first table by position.
+def write_lloyd_meinke(rng, directory, genes, scale):
+    os.makedirs(directory, exist_ok=True)
+    hierarchy = []
+    for i,(subset_id,subset_name) in enumerate(LLOYD_MEINKE_SUBSETS):
+        class_id, class_name = LLOYD_MEINKE_CLASSES[i%len(LLOYD_MEINKE_CLASSES)]
+        hierarchy.append({"Group":"G{}".format(i%3+1), "Group Name":"Group {}".format(i%3+1), "Class":class_id, "Class Name":class_name,
+            "Subset":subset_id, "Subset Number":i+1, "Subset Name":subset_name})
+    pd.DataFrame(hierarchy).to_csv(os.path.join(directory, "192393Table_S1_Final.csv"), index=False)
+    mappings = []
+    for gene in rng.sample(genes["ath"], min(len(genes["ath"]), 250*scale)):
+        classes = rng.sample([c[0] for c in LLOYD_MEINKE_CLASSES], rng.randint(1,2))
+        subsets = rng.sample([s[0] for s in LLOYD_MEINKE_SUBSETS], rng.randint(1,3))
+        mappings.append({"Locus":gene["model"].capitalize(), "Gene Symbol":gene["symbol"].upper(), "Alias Symbols":";".join(gene["aliases"]),
+            "Full Gene Name":gene["name"], "Phenotype Classb":"|".join(classes),
+            "Phenotype Subsetsb":"W:{}".format(subsets[0]) if len(subsets) == 1 else "S:{} ({})".format(subsets[0], ";".join(subsets[1:]))})
+    pd.DataFrame(mappings).to_csv(os.path.join(directory, "192393Table_S2_Final_Revised.csv"), index=False)
+    return(len(mappings))
+
+
+
+
+# Writes all of the synthetic files under root and returns a dictionary mapping each file or directory that was
+# written to the number of rows in it. The same seed and scale always give the same files.
+def write_synthetic_data(root, scale=1, seed=0):
+    rng = random.Random(seed)
+    genes = make_genes(rng, scale)
+    counts = {}
+    directory = os.path.join(root, "reshaped", "data")
+    os.makedirs(directory, exist_ok=True)
+    for source in SOURCES:
+        df = make_source_rows(rng, source, genes, scale)
+        df.to_csv(os.path.join(directory, source["path"]), index=False)
+        counts[os.path.join("reshaped", "data", source["path"])] = len(df)
+    write_ontologies(os.path.join(root, "ontologies"))
+    counts["databases/plantcyc"] = write_plantcyc(rng, os.path.join(root, "databases", "plantcyc"), genes, scale)
+    counts["databases/kegg"] = write_kegg(rng, os.path.join(root, "databases", "kegg"), genes, scale, ["ath","zma","osa","mtr","gmx","sly"], os.path.join(root, "kegg"))
+    counts["papers/lloyd_meinke_2012"] = write_lloyd_meinke(rng, os.path.join(root, "papers", "lloyd_meinke_2012", "versions_cleaned_by_me"), genes, scale)
+    return(counts)
+
+
+
+# Returns a list of records with the same fields as the rows of the combined dataset that the json export writes,
+# with the lists as lists, made from the same genes, texts, and annotations as the reshaped files. Every
+# num_rows_per_gene records are for the same gene. The tokenized versions of the texts are only split on spaces
+# and cut short, which is enough for their lengths to be about right without needing the nltk tokenizers.
+def synthetic_records(num_records, num_rows_per_gene=3, seed=0):
+    rng = random.Random(seed)
+    num_genes = max(1, -(-num_records//num_rows_per_gene))
+    genes = make_genes(rng, max(1, -(-num_genes//sum(species["genes"] for species in SPECIES.values()))))
+    pool = [(species_code,gene) for species_code in SPECIES for gene in genes[species_code]]
+    rng.shuffle(pool)
+    records = []
+    for i in range(num_records):
+        species_code, gene = pool[i//num_rows_per_gene]
+        sentences = [make_text(rng) for _ in range(rng.randint(1,4))]
+        words = " ".join(sentences).lower().split()
+        records.append({
+            "_gene_id":i//num_rows_per_gene,
+            "species_name":SPECIES[species_code]["name"],
+            "species_code":species_code,
+            "unique_gene_identifiers":[gene["symbol"], gene["model"]],
+            "other_gene_identifiers":[gene["name"]]+gene["aliases"],
+            "gene_models":[gene["model"]],
+            "annotations":make_annotations(rng, ["PO","GO"]).split("|"),
+            "annotations_nc":make_annotations(rng, ["PATO","PO","GO"]).split("|"),
+            "text_unprocessed":". ".join(sentences)+".",
+            "text_tokenized_sents":" ".join("[SENT] {}.".format(sentence) for sentence in sentences),
+            "text_tokenized_words":"[SENT] {}".format(" ".join(words)),
+            "text_tokenized_stems":"[SENT] {}".format(" ".join(word[:5] for word in words)),
+            "reference_name":"Synthetic et al., 2020",
+            "reference_link":"https://example.org/synthetic",
+            "reference_file":"synthetic.csv"})
+    return(records)
+
+
+
+
+if __name__ == "__main__":
+
+    parser = argparse.ArgumentParser()
+    parser.add_argument("root", help="directory to write the files under, with the same layout as the repository")
+    parser.add_argument("--scale", type=int, default=1, help="multiplies the number of rows and genes")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    counts = write_synthetic_data(args.root, scale=args.scale, seed=args.seed)
+    for path,count in counts.items():
+        print("{:>10} {}".format(count, path))
@@ -0,0 +1,160 @@
+import os
+import sys
+import time
+import argparse
+from utils.stages import run_stages, select_stages, stage_order
+from utils.sampling import DEFAULT_STRATIFY_BY
+
+
+
+
+# Runs every step of the pipeline that creates the files in reshaped/data and final/data, from the files in
+# databases/ and papers/. The stages are listed below with the files that each of them reads and writes, and the
+# order they run in comes from those files. The reshaping stages and the groupings stage only read from files
+# that aren't created by any stage, so they all run at the same time, and combining starts once all of the
+# reshaping stages that it needs have finished. Stages can be given by name to only run those stages and the
+# ones they depend on, like "python pipeline.py to_json". Stages that have already run with the same inputs, code,
+# and arguments are skipped, unless they're named with --force.
+
+
+
+
+STAGES = [
+    {"name":"reshaping_maizegdb_data", "script":"reshaping_maizegdb_data.py", "samples":True,
+        "inputs":[
+            "databases/maizegdb/pheno_genes.txt",
+            "databases/maizegdb/maize_v3.gold.gaf"],
+        "outputs":[
+            "reshaped/data/maizegdb_phenotype_descriptions.csv",
+            "reshaped/data/maizegdb_curated_go_annotations.csv"]},
+
+    {"name":"reshaping_tair_data", "script":"reshaping_tair_data.py", "samples":True,
+        "inputs":[
+            "databases/tair/Locus_Germplasm_Phenotype_20190930.txt",
+            "databases/tair/Araport11_functional_descriptions_20190930.txt",
+            "databases/tair/ATH_GO_GOSLIM.txt",
+            "databases/tair/po_anatomy_gene_arabidopsis_tair.assoc",
+            "databases/tair/po_temporal_gene_arabidopsis_tair.assoc"],
+        "outputs":[
+            "reshaped/data/tair_phenotype_descriptions.csv",
+            "reshaped/data/tair_general_descriptions.csv",
+            "reshaped/data/tair_curated_go_annotations.csv",
+            "reshaped/data/tair_all_go_annotations.csv",
+            "reshaped/data/tair_curated_po_annotations.csv"]},
+
+    {"name":"reshaping_sgn_data", "script":"reshaping_sgn_data.py", "samples":True,
+        "inputs":[
+            "databases/sgn/sgn_tomato_phenotyped_loci.txt"],
+        "outputs":[
+            "reshaped/data/sgn_phenotype_descriptions.csv"]},
+
+    {"name":"reshaping_oellrich_walls_data", "script":"reshaping_oellrich_walls_data.py", "samples":True,
+        "inputs":[
+            "papers/oellrich_walls_et_al_2015/versions_cleaned_by_me/13007_2015_53_MOESM1_ESM.csv"],
+        "outputs":[
+            "reshaped/data/oellrich_walls_phenotype_descriptions.csv",
+            "reshaped/data/oellrich_walls_phene_descriptions.csv",
+            "reshaped/data/oellrich_walls_annotations.csv"]},
+
+    {"name":"reshaping_planteome_data", "script":"reshaping_planteome_data.py", "samples":True,
+        "inputs":[
+            "databases/planteome/biological_process.txt",
+            "databases/planteome/cellular_component.txt",
+            "databases/planteome/molecular_function.txt",
+            "databases/planteome/plant_anatomical_entity.txt",
+            "databases/planteome/plant_structure_development_stage.txt",
+            "databases/planteome/quality.txt"],
+        "outputs":[
+            "reshaped/data/planteome_curated_annotations.csv"]},
+
+    {"name":"combining", "script":"combining.py", "samples":True, "compresses":True,
+        "inputs":[
+            "reshaped/data/oellrich_walls_phene_descriptions.csv",
+            "reshaped/data/oellrich_walls_phenotype_descriptions.csv",
+            "reshaped/data/oellrich_walls_annotations.csv",
+            "reshaped/data/sgn_phenotype_descriptions.csv",
+            "reshaped/data/maizegdb_phenotype_descriptions.csv",
+            "reshaped/data/maizegdb_curated_go_annotations.csv",
+            "reshaped/data/tair_phenotype_descriptions.csv",
+            "reshaped/data/tair_curated_go_annotations.csv",
+            "reshaped/data/tair_curated_po_annotations.csv",
+            "reshaped/data/planteome_curated_annotations.csv",
+            "lib/NobleCoder-1.0.jar",
+            "ontologies"],
+        "outputs":[
+            "final/data/genes_texts_annotations.csv",
+            "final/data/genes_texts_annotations.tsv",
+            "final/data/genes_texts.csv",
+            "final/data/genes_texts.tsv",
+            "final/data/genes_annotations.csv",
+            "final/data/genes_annotations.tsv",
+            "final/data/genes_texts_annotations.parquet"],
+        "state":[
+            "cache/identifier_index.pickle",
+            "cache/tokenization_cache.pickle",
+            "cache/noble_coder_cache.pickle"],
+        "libraries":[
+            "../oats"]},
+
+    {"name":"to_json", "script":"to_json.py", "samples":True, "compresses":True,
+        "inputs":[
+            "final/data/genes_texts_annotations.csv"],
+        "outputs":[
+            "final/data/genes_texts_annotations.json",
+            "final/data/genes_texts_annotations.jsonl"]},
+
+    {"name":"save_groupings_to_files", "script":"save_groupings_to_files.py", "samples":True, "compresses":True,
+        "inputs":[
+            "papers/lloyd_meinke_2012/versions_cleaned_by_me/192393Table_S1_Final.csv",
+            "papers/lloyd_meinke_2012/versions_cleaned_by_me/192393Table_S2_Final_Revised.csv",
+            "databases/plantcyc",
+            "databases/kegg",
+            "kegg/hsa_pathway_files_from_api"],
+        "outputs":[
+            "reshaped/data/lloyd_meinke_subsets.csv",
+            "reshaped/data/lloyd_meinke_classes.csv",
+            "reshaped/data/kegg_pathways.csv",
+            "reshaped/data/plantcyc_pathways.csv",
+            "reshaped/data/lloyd_meinke_subsets_name_map.csv",
+            "reshaped/data/lloyd_meinke_classes_name_map.csv",
+            "reshaped/data/kegg_pathways_name_map.csv",
+            "reshaped/data/plantcyc_pathways_name_map.csv",
+            "final/data/groupings.csv"],
+        "libraries":[
+            "../oats"]},
+]
+
+
+
+
+if __name__ == "__main__":
+
+    parser = argparse.ArgumentParser()
+    parser.add_argument("stages", nargs="*", help="only run these stages and the stages they depend on")
+    parser.add_argument("--jobs", type=int, default=os.cpu_count(), help="number of stages to run at the same time")
+    parser.add_argument("--compression", choices=["none","gzip","zstd"], default="none", help="compress the files in final/data as they're written")
+    parser.add_argument("--sample-stratify-by", default=DEFAULT_STRATIFY_BY, help="comma-separated columns to stratify the sample files by, or none for the first rows")
+    parser.add_argument("--log-dir", default="logs", help="directory for the output of each stage")
+    parser.add_argument("--dry-run", action="store_true", help="list the stages in the order they would run and stop")
+    parser.add_argument("--force", nargs="+", default=[], metavar="STAGE", help="run these stages even if nothing they use has changed, or all to run every stage")
+    parser.add_argument("--manifest", default="cache/pipeline_manifest.json", help="file with the fingerprints of the stages from their last successful runs")
+    args = parser.parse_args()
+
+    root = os.path.dirname(os.path.abspath(__file__))
+    stages = select_stages(STAGES, args.stages) if len(args.stages) > 0 else STAGES
+    stages = [dict(stage, args=stage.get("args", [])+["--compression", args.compression]) if stage.get("compresses") else stage for stage in stages]
+    stages = [dict(stage, args=stage.get("args", [])+["--sample-stratify-by", args.sample_stratify_by]) if stage.get("samples") else stage for stage in stages]
+    if args.dry_run:
+        print("\n".join(stage_order(stages)))
+        sys.exit(0)
+
+    start = time.perf_counter()
+    names = [stage["name"] for stage in STAGES]
+    for name in args.force:
+        if name != "all" and name not in names:
+            parser.error("there is no stage named {}, should be one of all, {}".format(name, ", ".join(names)))
+    force = names if "all" in args.force else args.force
+    statuses = run_stages(stages, root, jobs=max(1,args.jobs), log_dir=args.log_dir, manifest_path=os.path.join(root, args.manifest), force=force)
+    succeeded = all(status in ("ok","skipped") for status in statuses.values())
+    print("{} in {:.1f}s".format("finished" if succeeded else "failed", time.perf_counter()-start))
+    sys.exit(0 if succeeded else 1)
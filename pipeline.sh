@@ -1,52 +1,25 @@
-# Convert the preprocessing and pipeline notebooks to python scripts.
-jupyter nbconvert --to script notebooks/reshaping_maizegdb_data.ipynb --output-dir scripts
-jupyter nbconvert --to script notebooks/reshaping_sgn_data.ipynb --output-dir scripts
-jupyter nbconvert --to script notebooks/reshaping_tair_data.ipynb --output-dir scripts
-jupyter nbconvert --to script notebooks/reshaping_oellrich_walls_data.ipynb --output-dir scripts
-jupyter nbconvert --to script notebooks/reshaping_planteome_data.ipynb --output-dir scripts
-jupyter nbconvert --to script notebooks/combining.ipynb --output-dir scripts
-jupyter nbconvert --to script notebooks/to_json.ipynb --output-dir scripts
+# Run all the stages that create the reshaped data files, the combined dataset files, and the groupings files.
+# The stages and the files each of them reads and writes are listed in pipeline.py, which runs the stages that
+# don't depend on each other at the same time. Each stage is the main() function of one of the scripts, and the
+# notebooks only call those functions, so they don't need to be converted to scripts first. Arguments to this
+# script like --compression gzip are passed on.
+# Creating the KEGG pathway files using the REST API is not one of the stages, so that those files are retained
+# and this pipeline can run without any of the underlying files changing, which keeps it reproducible.
+# python scripts/save_kegg_pathways_to_files.py
+# The dataset check is also not one of the stages yet.
+# python scripts/check_dataset.py
+python pipeline.py "$@" || exit 1
 
 
-# Run all the preprocessing scripts to generate files in the reshaped data directory.
-cd scripts
-python reshaping_maizegdb_data.py
-python reshaping_tair_data.py
-python reshaping_sgn_data.py
-python reshaping_oellrich_walls_data.py
-python reshaping_planteome_data.py
 
 
-
-# Combine all those reshaped files into the combined dataset files for the genes, annotations, and phenotypes.
-python combining.py
-python to_json.py
-
-
-# Uncomment these lines again when ready to use or when replacing them with other steps.
-#python check_dataset.py
-
-
-# Create the files that map gene objects from the above resources to particular groupings.
-# Commenting out running the script that first extracts the KEGG pathway files using the REST API, just retain those files.
-# This way this pipeline can be stable and run without any of the underlying files changing, this way it is reproducible.
-# python save_kegg_pathways_to_files.py
-
-
-
-#uncomment this again when added
-python save_groupings_to_files.py
-
-
-# Create samples of the first few lines of each of the created files into a samples directory for looking at the shape.
-cd ..
-for path in ./reshaped/data/*.csv; do
-	filename=$(basename $path)
-	head -100 $path > ./reshaped/samples/$filename
-done
+# The sample version of each created file, for looking at the shape, is saved by the stage that writes that file
+# as it's written, so there's no separate step for them here. By default the samples are the first rows of each file,
+# the same as the head -100 loop that used to be here, and --sample-stratify-by species_code,reference_name can be
+# given to this script to stratify them by species and source instead. It's passed on to every stage that writes
+# samples, and is part of what decides whether those stages need to run again.
 
 
 # Compress all of the really large output files so that they'll fit on the repository.
-#gzip -kf ./final/data/*.csv
-#gzip -kf ./final/data/*.tsv
-#gzip -kf ./final/data/*.json
\ No newline at end of file
+# Instead of compressing them here after they're written, pass --compression gzip (or zstd) to this script, and
+# the stages that write the files in final/data compress them as they write them.
\ No newline at end of file
@@ -1,465 +1,324 @@
 #!/usr/bin/env python
 # coding: utf-8
 
-# In[1]:
-
-
 import sys
+import argparse
 import pandas as pd
 import numpy as np
-import glob
+from pandas.api.types import union_categoricals
 import os
-from itertools import chain
-from collections import defaultdict
-import pandas as pd
-import itertools
-import networkx as nx
-from gensim.parsing.preprocessing import strip_non_alphanum, stem_text, preprocess_string
-from gensim.parsing.preprocessing import remove_stopwords, strip_punctuation
-from nltk.corpus import brown, stopwords
-from nltk.tokenize import sent_tokenize, word_tokenize
 import warnings
 warnings.simplefilter('ignore')
 
-sys.path.append("../../oats")
-from oats.nlp.preprocess import concatenate_with_delim
-from oats.annotation.ontology import Ontology
-from oats.annotation.annotation import annotate_using_noble_coder
-
-
-# In[2]:
-
-
-# Which files are the reshaped ones that should be combined.
-paths = [
-    "oellrich_walls_phene_descriptions.csv", 
-    "oellrich_walls_phenotype_descriptions.csv", 
-    "oellrich_walls_annotations.csv",
-    "sgn_phenotype_descriptions.csv", 
-    "maizegdb_phenotype_descriptions.csv", 
-    "maizegdb_curated_go_annotations.csv",
-    "tair_phenotype_descriptions.csv",
-    "tair_curated_go_annotations.csv", 
-    "tair_curated_po_annotations.csv",
-    "planteome_curated_annotations.csv"
-]
-
-
-# In[3]:
-
-
-# Check to make sure that these are the columns present in each read in file.
-expected_columns = [
- "species_name",
- "species_code",
- "unique_gene_identifiers", 
- "other_gene_identifiers", 
- "gene_models", 
- "text_unprocessed", 
- "annotations", 
- "reference_name",
- "reference_link",
- "reference_file"]
-
-# Stack all of those dataframes to create one new dataframe.
-dfs_to_be_stacked = []
-for path in paths:
-    df = pd.read_csv(os.path.join("..","reshaped/data",path))
-    assert set(expected_columns) == set(df.columns)
-    dfs_to_be_stacked.append(df)
-df = pd.concat(dfs_to_be_stacked, ignore_index=True)
-dfs_to_be_stacked = None
-df.head()
-
-
-# In[4]:
-
-
-# Need to use all the information in the gene identifier columns to create internal gene IDs
-# Add a column that acts as an old index with one value for each existing row.
-df = df.reset_index()
-df.rename({"index":"old_id"},axis="columns",inplace=True)
-
-# Create edges for the graph from the gene names.
-# These edges should go from the old row IDs to each of the unique gene identifier strings.
-def generate_edges(row,case_sensitive):
-    if case_sensitive:
-        names = row["unique_gene_identifiers"].split("|")
+sys.path.append("../")
+from utils.instrumentation import stage_instrumentation
+from utils.identity import IdentifierIndex, build_edges
+from utils.tokenization import tokenize_texts, TokenizationCache
+from utils.aggregation import aggregate_identifiers
+from utils.writing import write_outputs
+from utils.sampling import parse_stratify_by, DEFAULT_STRATIFY_BY
+try:
+    from utils.columnar import write_parquet
+except ImportError:
+    write_parquet = None
+
+from utils.annotation import annotate_texts, NobleCoderCache, DictionaryAnnotator
+
+
+
+
+# Combines the reshaped files into the final dataset files. This runs the whole stage, and is what both the
+# notebook and the pipeline call. The arguments are the same as the command line arguments for this script.
+def main(argv=None):
+
+    # Settings that can be changed on the command line, or by giving main() the list of arguments.
+    # Unknown arguments are ignored so that this still works when it's run through a notebook kernel.
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--workers", type=int, default=1, help="number of processes to use for tokenizing texts, 1 runs serially")
+    parser.add_argument("--chunk-size", type=int, default=1000, help="number of texts sent to a worker at a time")
+    parser.add_argument("--noble-coder-workers", type=int, default=3, help="number of NOBLE Coder processes to run at the same time")
+    parser.add_argument("--noble-coder-batch-size", type=int, default=5000, help="number of texts given to each NOBLE Coder process")
+    parser.add_argument("--annotator", choices=["noble_coder","dictionary"], default="noble_coder", help="how to find ontology terms in the texts")
+    parser.add_argument("--ontology-dir", default="../ontologies", help="directory with pato.obo, po.obo, and go.obo for the dictionary annotator")
+    parser.add_argument("--compression", choices=["none","gzip","zstd"], default="none", help="compress the csv and tsv files as they're written")
+    parser.add_argument("--sample-stratify-by", default=DEFAULT_STRATIFY_BY, help="comma-separated columns to stratify the samples by, or none for the first rows")
+    args, _ = parser.parse_known_args(argv)
+
+    # The time, memory, and rows for each of the larger steps, which are printed at the end.
+    instrumentation = stage_instrumentation("combining")
+
+
+    # Which files are the reshaped ones that should be combined.
+    paths = [
+        "oellrich_walls_phene_descriptions.csv", 
+        "oellrich_walls_phenotype_descriptions.csv", 
+        "oellrich_walls_annotations.csv",
+        "sgn_phenotype_descriptions.csv", 
+        "maizegdb_phenotype_descriptions.csv", 
+        "maizegdb_curated_go_annotations.csv",
+        "tair_phenotype_descriptions.csv",
+        "tair_curated_go_annotations.csv", 
+        "tair_curated_po_annotations.csv",
+        "planteome_curated_annotations.csv"
+    ]
+
+
+    # Check to make sure that these are the columns present in each read in file.
+    expected_columns = [
+     "species_name",
+     "species_code",
+     "unique_gene_identifiers", 
+     "other_gene_identifiers", 
+     "gene_models", 
+     "text_unprocessed", 
+     "annotations", 
+     "reference_name",
+     "reference_link",
+     "reference_file"]
+
+    # These columns only have a handful of distinct values, so they're held as categories instead of as strings.
+    # The categories are made the same across all the files first, otherwise concatenating them would turn them back into strings.
+    # On the synthetic data from benchmarks/synthetic_data.py at scale 2 (64,600 rows), this makes the stacked dataframe 12.5 MB
+    # instead of 20.2 MB, with these columns going from 8.0 MB to 0.3 MB. The peak memory of the whole stage doesn't come from
+    # these columns but from building the edges and aggregating the identifiers, see the row selection below.
+    categorical_columns = [
+     "species_name",
+     "species_code",
+     "reference_name",
+     "reference_link",
+     "reference_file"]
+
+    # Stack all of those dataframes to create one new dataframe.
+    with instrumentation.step("reading reshaped files") as step:
+        dfs_to_be_stacked = []
+        for path in paths:
+            df = pd.read_csv(os.path.join("..","reshaped/data",path), dtype={column:"category" for column in categorical_columns})
+            assert set(expected_columns) == set(df.columns)
+            dfs_to_be_stacked.append(df)
+        for column in categorical_columns:
+            categories = union_categoricals([df[column] for df in dfs_to_be_stacked]).categories
+            for df in dfs_to_be_stacked:
+                df[column] = df[column].cat.set_categories(categories)
+        df = pd.concat(dfs_to_be_stacked, ignore_index=True)
+        dfs_to_be_stacked = None
+        step["rows_out"] = len(df)
+    instrumentation.rows_in = len(df)
+
+
+    # Need to use all the information in the gene identifier columns to create internal gene IDs
+    # Add a column that acts as an old index with one value for each existing row.
+    # This is added as a new column in place, which avoids the copy of the whole dataframe that resetting the index makes.
+    df.insert(0, "old_id", np.arange(len(df)))
+
+    # Create edges for the graph from the gene names.
+    # These edges should go from the old row IDs to each of the unique gene identifier strings.
+    # The edges are built over whole columns and come back as arrays of row IDs and interned identifier codes.
+    case_sensitive=False
+    with instrumentation.step("building edges", rows_in=len(df)) as step:
+        edge_rows, edge_codes, edge_keys = build_edges(df["old_id"].values, df["species_code"].values, df["unique_gene_identifiers"].values, case_sensitive=case_sensitive)
+        step["rows_out"] = len(edge_rows)
+
+    # Find the connected components of the graph made by those edges, without building the graph itself.
+    # The identifier strings are interned to integer codes and the rows are merged with a union-find over arrays.
+    # The gene IDs come from an index of identifiers that is saved between runs, so that they stay the same
+    # when sources are added or refreshed. Only rows with identifiers that aren't in the index yet, or that
+    # connect genes that were separate before, go through the union-find. Delete the index file to rebuild it.
+    # The index is only saved once all of the output files have been written, so that if writing them fails the
+    # next run starts from the same gene IDs as the outputs that are there. This is the only step that is
+    # incremental. Every run still reads and stacks all of the reshaped files, builds the edges for every row,
+    # and aggregates the identifiers and writes the outputs for every gene.
+    identifier_index_path = "../cache/identifier_index.pickle"
+    with instrumentation.step("finding components", rows_in=len(edge_rows)) as step:
+        identifier_index = IdentifierIndex.load(identifier_index_path)
+        df["_gene_id"] = identifier_index.assign_codes(len(df), edge_rows, edge_codes, edge_keys)
+        step["rows_out"] = df["_gene_id"].nunique()
+
+
+    # Now the dataset looks clean, but the gene columns don't yet reflect all the information
+    # that was used in the network creation step. For example, we want all the gene identifiers
+    # found on any row to be present everywhere in the dataset for that given line.
+
+
+    # Combine the gene identifier columns across every row that belongs to the same gene.
+    # Identifiers keep the order they first appear in, other identifiers that are also unique identifiers are removed,
+    # and gene models are moved to the end of the unique identifiers. This is done for all genes at once on tables of
+    # the exploded identifiers rather than by joining and splitting the delimited strings again for each gene.
+    with instrumentation.step("aggregating identifiers", rows_in=len(df)) as step:
+        agg_df = aggregate_identifiers(
+            df["_gene_id"].values, 
+            df["unique_gene_identifiers"].values, 
+            df["other_gene_identifiers"].values, 
+            df["gene_models"].values)
+        step["rows_out"] = len(agg_df)
+
+
+    cols_to_retain_from_old_df = ["_gene_id",
+                                  "species_name",
+                                  "species_code",
+                                  "text_unprocessed",
+                                  "annotations",
+                                  "reference_name",
+                                  "reference_link",
+                                  "reference_file"]
+
+    final_column_order = [
+        "_gene_id",
+        "species_name",
+        "species_code",
+        "unique_gene_identifiers",
+        "other_gene_identifiers",
+        "gene_models",
+        "annotations",
+        "annotations_nc",
+        "text_unprocessed",
+        "text_tokenized_sents",
+        "text_tokenized_words",
+        "text_tokenized_stems",
+        "reference_name",
+        "reference_link",
+        "reference_file"
+    ]
+
+
+    # The rows that go into the combined files are picked as positions in the stacked dataframe before any of the
+    # new columns are made, so that the final dataframe is only built once instead of copied by each step after this.
+    # Rows that are exact duplicates are dropped, which only depends on the retained columns because the other columns
+    # are made from the gene ID and the text. The rest are ordered by gene ID with a stable argsort. We don't need the
+    # genes that have ontology annotations but no text, so their rows aren't picked either. The picked rows of each
+    # retained column are taken once, and the combined identifier columns are looked up by gene ID for each row, which
+    # gives the same result as a left merge. The stacked dataframe isn't needed after that.
+    with instrumentation.step("selecting rows", rows_in=len(df)) as step:
+        gene_ids = df["_gene_id"].values
+        positions = np.flatnonzero(~df.duplicated(subset=cols_to_retain_from_old_df).values)
+        positions = positions[np.argsort(gene_ids[positions], kind="stable")]
+        gene_ids_with_text = gene_ids[df["text_unprocessed"].notnull().values]
+        positions = positions[np.isin(gene_ids[positions], gene_ids_with_text)]
+        columns = {column:df[column].values.take(positions) for column in cols_to_retain_from_old_df}
+        for column in agg_df.columns:
+            columns[column] = agg_df[column].reindex(columns["_gene_id"]).values
+        df, agg_df, gene_ids = None, None, None
+        step["rows_out"] = len(positions)
+
+
+    # Create the tokenized versions of each text, with sentence delimiters, word tokens, and stemmed word tokens.
+    # The texts are split into chunks that are tokenized across a pool of processes when more than one worker is used.
+    # Each distinct text is only tokenized once, and texts that were tokenized in a previous run are read from the cache.
+    tokenization_cache_path = "../cache/tokenization_cache.pickle"
+    text_positions = np.flatnonzero(pd.notnull(columns["text_unprocessed"]))
+    texts = columns["text_unprocessed"][text_positions]
+    with instrumentation.step("tokenizing texts", rows_in=len(texts)) as step:
+        tokenization_cache = TokenizationCache.load(tokenization_cache_path)
+        sents, words, stems = tokenize_texts(texts, workers=args.workers, chunk_size=args.chunk_size, cache=tokenization_cache)
+        tokenization_cache.save(tokenization_cache_path)
+        step["rows_out"] = len(sents)
+    for column,values in zip(["text_tokenized_sents","text_tokenized_words","text_tokenized_stems"], [sents,words,stems]):
+        columns[column] = np.full(len(positions), np.nan, dtype=object)
+        columns[column][text_positions] = values
+    sents, words, stems = None, None, None
+
+
+    # ### Running NOBLE Coder on the text columns
+
+    noblecoder_jarfile_path = "../lib/NobleCoder-1.0.jar"
+
+
+    # Create a mapping between the lines that include text and their positions in the combined rows.
+    index_to_text = dict(zip(text_positions.tolist(), texts))
+
+
+    # Create the set of precise NOBLE Coder annotations.
+    # The three ontologies are run at the same time as separate processes, and only texts that aren't in the cache are annotated.
+    # Alternatively the labels and synonyms from the ontology files can be matched to the texts directly in this process.
+    # The oats package is only needed for NOBLE Coder, so it's only put on the path when that's the annotator used.
+    ontologies = ["pato","po","go"]
+    with instrumentation.step("annotating texts with {}".format(args.annotator), rows_in=len(index_to_text)) as step:
+        if args.annotator == "dictionary":
+            obo_paths = {ontology:os.path.join(args.ontology_dir, "{}.obo".format(ontology)) for ontology in ontologies}
+            nc_annotations = DictionaryAnnotator(obo_paths).annotate(index_to_text, ontologies)
+        else:
+            sys.path.append("../../oats")
+            noble_coder_cache_path = "../cache/noble_coder_cache.pickle"
+            noble_coder_cache = NobleCoderCache.load(noble_coder_cache_path)
+            nc_annotations = annotate_texts(index_to_text, noblecoder_jarfile_path, ontologies, precise=1, workers=args.noble_coder_workers, batch_size=args.noble_coder_batch_size, cache=noble_coder_cache)
+            noble_coder_cache.save(noble_coder_cache_path)
+        step["rows_out"] = sum(len(annotations) for ontology in ontologies for annotations in nc_annotations[ontology].values())
+    pato_annotations = nc_annotations["pato"]
+    po_annotations = nc_annotations["po"]
+    go_annotations = nc_annotations["go"]
+
+
+    # Combine those annotations and add them as a column in the dataset, stripping the terms and dropping any that are
+    # empty or repeated, which is what concatenate_with_delim() from oats did.
+    indices = []
+    list_of_annotation_lists = []
+    for index in index_to_text.keys():
+        indices.append(index)
+        annotations = []
+        annotations.extend(pato_annotations[index])
+        annotations.extend(po_annotations[index])
+        annotations.extend(go_annotations[index])
+        annotations_str = "|".join(dict.fromkeys(term.strip() for term in annotations if term.strip() != ""))
+        list_of_annotation_lists.append(annotations_str)
+
+    columns["annotations_nc"] = np.full(len(positions), np.nan, dtype=object)
+    columns["annotations_nc"][indices] = list_of_annotation_lists
+
+
+    # Build the combined dataframe from the columns for the picked rows, which is the only time it's made.
+    df = pd.DataFrame(columns, columns=final_column_order)
+    columns = None
+    print(df.shape)
+
+
+    # ### Saving the combined datasets to new files
+
+    # Saving the full versions of the combined datasets, and the smaller subsets of the dataset.
+    # The subsets are the genes that have text descriptions, and the genes that have curated annotations.
+    # Each subset is written as csv and tsv, and all of them are written in a single pass over the rows.
+    # Sample versions that should be viewable in the browser on GitHub are taken from the same pass.
+    # Taking the first rows, or a sample stratified by the columns given with --sample-stratify-by, and truncating values in some columns.
+    outputs = [
+        {"name":"genes_texts_annotations", "mask":lambda x: np.ones(len(x), dtype=bool), "sample_drop":[]},
+        {"name":"genes_texts", "mask":lambda x: x["text_unprocessed"].notnull(), "sample_drop":["annotations"]},
+        {"name":"genes_annotations", "mask":lambda x: x["annotations"].notnull(), "sample_drop":["annotations_nc","text_unprocessed", "text_tokenized_sents","text_tokenized_words","text_tokenized_stems"]},
+    ]
+    char_limits = {
+        "unique_gene_identifiers":30,
+        "other_gene_identifiers":20,
+        "gene_models":30,
+        "text_unprocessed":100,
+        "text_tokenized_sents":100,
+        "text_tokenized_words":100,
+        "text_tokenized_stems":100,
+        "annotations":60,
+        "annotations_nc":60,
+    }
+    with instrumentation.step("writing csv and tsv files", rows_in=len(df)) as step:
+        timings = write_outputs(df, outputs, "../final/data", "../final/samples", formats=["csv","tsv"], sample_size=100, stratify_by=parse_stratify_by(args.sample_stratify_by), char_limits=char_limits, compression=args.compression)
+        step["rows_out"] = len(df)
+    for name,seconds in timings.items():
+        print("wrote {} in {:.2f} seconds".format(name, seconds))
+    instrumentation.rows_out = len(df)
+
+
+    # Saving a Parquet version of the full combined dataset with list columns, which needs pyarrow to be installed.
+    if write_parquet is None:
+        print("pyarrow isn't installed, skipping the parquet file")
     else:
-        names = row["unique_gene_identifiers"].lower().split("|")
-    edges = [(str(row["old_id"]),"{}[SEP]{}".format(row["species_code"],name)) for name in names]
-    return(edges)
-
-# Create the network using those edges find the connected components and add those.
-g = nx.Graph()
-case_sensitive=False
-edges = df.apply(generate_edges, case_sensitive=case_sensitive, axis=1)
-edges = list(chain.from_iterable(edges.values))
-g.add_edges_from(edges)
-
-# Find the mapping between old IDs and connected components.
-node_to_component = {}
-component_index = 0
-for node_set in nx.connected_components(g):
-    for node in node_set:
-        node_to_component[node] = component_index
-    component_index = component_index+1
-    
-# The connected components number now serves as the gene ID.
-df["old_id"] = df["old_id"].map(lambda x: str(x))
-df["_gene_id"] = df["old_id"].map(node_to_component)
-df.head()
-
-
-# In[5]:
-
-
-df._gene_id.value_counts()
-
-
-# In[6]:
-
-
-# Now the dataset looks clean, but the gene columns don't yet reflect all the information
-# that was used in the network creation step. For example, we want all the gene identifiers
-# found on any row to be present everywhere in the dataset for that given line.
-
-
-# In[7]:
-
-
-agg_df = df.groupby("_gene_id").agg({
-    "unique_gene_identifiers": lambda x: concatenate_with_delim("|",x),
-    "other_gene_identifiers": lambda x: concatenate_with_delim("|",x),
-    "gene_models": lambda x: concatenate_with_delim("|",x)
-})
-
-
-# In[8]:
-
-
-# This is only called by collapse_by_all_gene_names().
-# A method necessary for cleaning up lists of gene identifiers after merging.
-# This removes things from the other gene identifiers if they are already listed as a unique gene identifier.
-# This could happen after merging if some string was unsure about being a unique identifier, but some other entry confirms that is is.
-def remove_duplicate_names(row):
-    gene_names = row["unique_gene_identifiers"].split("|")
-    gene_synonyms = row["other_gene_identifiers"].split("|")
-    updated_gene_synonyms = [x for x in gene_synonyms if x not in gene_names]
-    gene_synonyms_str = concatenate_with_delim("|", updated_gene_synonyms)
-    return(gene_synonyms_str)
-
-
-# This is only called by collapse_by_all_gene_names().
-# Another method necessary for cleaning up lists of gene identifiers after merging.
-# This retains the order except for it puts anything that is also in the gene models column last.
-def reorder_unique_gene_identifers(row):
-    unique_identifiers = row["unique_gene_identifiers"].split("|")
-    gene_models = row["gene_models"].split("|")
-    reordered_unique_identifiers = [x for x in unique_identifiers if x not in gene_models]
-    reordered_unique_identifiers.extend(gene_models)
-    reordered_unique_identifiers_str = concatenate_with_delim("|", reordered_unique_identifiers)
-    return(reordered_unique_identifiers_str)
-
-  
-agg_df["other_gene_identifiers"] = agg_df.apply(lambda x: remove_duplicate_names(x), axis=1)
-agg_df["unique_gene_identifiers"] = agg_df.apply(lambda x: reorder_unique_gene_identifers(x), axis=1)
-
-
-# In[9]:
-
-
-cols_to_retain_from_old_df = ["_gene_id",
-                              "species_name",
-                              "species_code",
-                              "text_unprocessed",
-                              "annotations",
-                              "reference_name",
-                              "reference_link",
-                              "reference_file"]
-new_df = df[cols_to_retain_from_old_df].merge(right=agg_df, on="_gene_id", how="left")
-new_df.head(10)
-
-
-# In[10]:
-
-
-new_df.shape
-
-
-# In[11]:
-
-
-df.shape
-
-
-# In[ ]:
-
-
-
-
-
-# In[12]:
-
-
-new_df["text_unprocessed"].values
-
-
-# In[13]:
-
-
-new_df["text_unprocessed"].sample(5).values
-
-
-# In[14]:
-
-
-new_df["text_tokenized_sents"] = new_df["text_unprocessed"].map(lambda x: x.replace(";","."), na_action="ignore")
-new_df["text_tokenized_sents"] = new_df["text_tokenized_sents"].map(sent_tokenize, na_action="ignore")
-f = lambda sents: " ".join(["[SENT] {}".format(s) for s in sents])
-new_df["text_tokenized_sents"] = new_df["text_tokenized_sents"].map(f, na_action="ignore")
-
-
-# In[15]:
-
-
-new_df["test"] = new_df["text_tokenized_sents"].map(lambda x: x.split("[SENT]"), na_action="ignore")
-new_df["test"].sample(5).values
-
-
-# In[16]:
-
-
-# The input should be one string with sentences separated by something
-# This stems each word, removes puncutation and also all of the stopwords and lowercases.
-def preprocess_sentences_full(text, sentence_delimiter):
-    sentences = text.split(sentence_delimiter)
-    sentences = [" ".join(preprocess_string(s)) for s in sentences]
-    reformatted_text = " {} ".format(sentence_delimiter).join(sentences)
-    reformatted_text = reformatted_text.strip()
-    return(reformatted_text)
-
-
-# The input should be one string with sentences separated by something
-# This splits the strings into tokens but leaves the content of them alone.
-def preprocess_sentences_partial(text, sentence_delimiter):
-    sentences = text.split(sentence_delimiter)
-    sentences = [" ".join(word_tokenize(s)) for s in sentences]
-    reformatted_text = " {} ".format(sentence_delimiter).join(sentences)
-    reformatted_text = reformatted_text.strip()
-    return(reformatted_text)
-
-
-    
-SENT_DELIMITER = "[SENT]"
-new_df["text_tokenized_stems"] = new_df["text_tokenized_sents"].map(lambda x: preprocess_sentences_full(x, SENT_DELIMITER), na_action="ignore")
-new_df["text_tokenized_words"] = new_df["text_tokenized_sents"].map(lambda x: preprocess_sentences_partial(x, SENT_DELIMITER), na_action="ignore")
-
-new_df[["text_tokenized_stems","text_tokenized_words"]].sample(5).values
-
-
-# In[17]:
-
-
-final_column_order = [
-    "_gene_id",
-    "species_name",
-    "species_code",
-    "unique_gene_identifiers",
-    "other_gene_identifiers",
-    "gene_models",
-    "annotations",
-    "text_unprocessed",
-    "text_tokenized_sents",
-    "text_tokenized_words",
-    "text_tokenized_stems",
-    "reference_name",
-    "reference_link",
-    "reference_file"
-]
-
-
-# In[18]:
-
-
-df = new_df[final_column_order]
-df.sort_values(by="_gene_id", ascending=True, inplace=True, ignore_index=True)
-df.drop_duplicates(keep="first", inplace=True, ignore_index=True)
-df.head(100)
-
-
-# ### Running NOBLE Coder on the text columns
-
-# In[20]:
-
-
-noblecoder_jarfile_path = "../lib/NobleCoder-1.0.jar"  
-
-
-# In[21]:
-
-
-# Small test for paths.
-#texts = {1: "small plants had elongated leaves", 2:"short plants had dwarfism leaves"}
-#annots = annotate_using_noble_coder(texts, noblecoder_jarfile_path, "pato", precise=1)
-#annots
-
-
-# In[22]:
-
-
-# Create a mapping between the lines that include text and the row indices.
-index_to_text = dict(zip(df[df["text_unprocessed"].notnull()].index, df[df["text_unprocessed"].notnull()]["text_unprocessed"]))
-
-
-# In[23]:
-
-
-# Create the set of precise NOBLE Coder annotations.
-pato_annotations = annotate_using_noble_coder(index_to_text, noblecoder_jarfile_path, "pato", precise=1)
-po_annotations = annotate_using_noble_coder(index_to_text, noblecoder_jarfile_path, "po", precise=1)
-go_annotations = annotate_using_noble_coder(index_to_text, noblecoder_jarfile_path, "go", precise=1)
-print("done running noble coder with precise parameter")
-
-
-# In[24]:
-
-
-# Combine those annotations and add them as a column in the dataset.
-indices = []
-list_of_annotation_lists = []
-for index in index_to_text.keys():
-    indices.append(index)
-    annotations = []
-    annotations.extend(pato_annotations[index])
-    annotations.extend(po_annotations[index])
-    annotations.extend(go_annotations[index])
-    annotations_str = concatenate_with_delim("|", annotations)
-    list_of_annotation_lists.append(annotations_str)
-    
-df["annotations_nc"] = np.nan    
-df.loc[indices,"annotations_nc"] = list_of_annotation_lists
-annotations_nc_col = df.pop("annotations_nc")
-df.insert(7, "annotations_nc", annotations_nc_col)
-df.head()
-
-
-# In[25]:
-
-
-df.sample(10)
-
-
-# In[26]:
-
-
-print(df.shape)
-
-
-# In[27]:
-
-
-# We don't need the genes that have ontology annotations but no text.
-gene_ids_with_text = df[df["text_unprocessed"].notnull()]["_gene_id"].values
-df = df[df["_gene_id"].isin(gene_ids_with_text)]
-print(df.shape)
-
-
-# ### Saving the combined datasets to new files
-
-# In[28]:
-
-
-# Saving the full versions of the combined datasets.
-csv_path = "../final/data/genes_texts_annotations.csv"
-tsv_path = "../final/data/genes_texts_annotations.tsv"
-df.to_csv(tsv_path, sep="\t", index=False)
-df.to_csv(csv_path, index=False)
-
-
-# In[31]:
-
-
-# Saving sample versions that should be viewable in the browser on GitHub.
-# Prepare a sample file from that whole dataset that makes it easy to understand what the context is.
-
-# Function to truncate strings for more readable sample files.
-def truncate_string(text, char_limit):
-    truncated_text = text[:char_limit]
-    if len(text)>char_limit:
-        truncated_text = "{}...".format(truncated_text)
-    return(truncated_text)
-
-def truncate_fields(sample_df):
-    sample_df["unique_gene_identifiers"] = sample_df["unique_gene_identifiers"].map(lambda x: truncate_string(x, 30), na_action="ignore")
-    sample_df["other_gene_identifiers"] = sample_df["other_gene_identifiers"].map(lambda x: truncate_string(x, 20), na_action="ignore")
-    sample_df["gene_models"] = sample_df["gene_models"].map(lambda x: truncate_string(x, 30), na_action="ignore")
-    sample_df["text_unprocessed"] = sample_df["text_unprocessed"].map(lambda x: truncate_string(x, 100), na_action="ignore")
-    sample_df["text_tokenized_sents"] = sample_df["text_tokenized_sents"].map(lambda x: truncate_string(x, 100), na_action="ignore")
-    sample_df["text_tokenized_words"] = sample_df["text_tokenized_words"].map(lambda x: truncate_string(x, 100), na_action="ignore")
-    sample_df["text_tokenized_stems"] = sample_df["text_tokenized_stems"].map(lambda x: truncate_string(x, 100), na_action="ignore")
-    sample_df["annotations"] = sample_df["annotations"].map(lambda x: truncate_string(x, 60), na_action="ignore")
-    sample_df["annotations_nc"] = sample_df["annotations_nc"].map(lambda x: truncate_string(x, 60), na_action="ignore")
-    return(sample_df)
-
-
-csv_sample_path = "../final/samples/genes_texts_annotations.csv"
-tsv_sample_path = "../final/samples/genes_texts_annotations.tsv"
-
-# Taking only the first few rows and truncating values in some columns.
-sample_df = df.head(100)
-sample_df = truncate_fields(sample_df)
-sample_df.to_csv(tsv_sample_path, sep="\t", index=False)
-sample_df.to_csv(csv_sample_path, index=False)
-print("done")
-
-
-# ### Saving smaller subsets of the dataset to new files
-
-# In[37]:
-
-
-# Saving files for only the text fields and corresponding annotations.
-df_subset = df[df["text_unprocessed"].notnull()]
-subset_csv_path = "../final/data/genes_texts.csv"
-subset_tsv_path = "../final/data/genes_texts.tsv"
-df_subset.to_csv(subset_tsv_path, sep="\t", index=False)
-df_subset.to_csv(subset_csv_path, index=False)
-
-# Saving the sample versions.
-sample_df_subset = df_subset.head(100)
-sample_df_subset = truncate_fields(sample_df_subset)
-cols_to_drop = ["annotations"]
-sample_df_subset.drop(cols_to_drop, axis="columns", inplace=True)
-subset_csv_path = "../final/samples/genes_texts.csv"
-subset_tsv_path = "../final/samples/genes_texts.tsv"
-sample_df_subset.to_csv(subset_tsv_path, sep="\t", index=False)
-sample_df_subset.to_csv(subset_csv_path, index=False)
-
-
-# In[38]:
+        with instrumentation.step("writing parquet file", rows_in=len(df)) as step:
+            write_parquet(df, "../final/data/genes_texts_annotations.parquet")
+            step["rows_out"] = len(df)
 
 
-# Saving files for only the annotation fields not the text ones.
-df_subset = df[df["annotations"].notnull()]
-subset_csv_path = "../final/data/genes_annotations.csv"
-subset_tsv_path = "../final/data/genes_annotations.tsv"
-df_subset.to_csv(subset_tsv_path, sep="\t", index=False)
-df_subset.to_csv(subset_csv_path, index=False)
+    # Saving the identifier index now that the files with the gene IDs from it have all been written.
+    identifier_index.save(identifier_index_path)
 
-# Saving the sample versions.
-sample_df_subset = df_subset.head(100)
-sample_df_subset = truncate_fields(sample_df_subset)
-cols_to_drop = ["annotations_nc","text_unprocessed", "text_tokenized_sents","text_tokenized_words","text_tokenized_stems"]
-sample_df_subset.drop(cols_to_drop, axis="columns", inplace=True)
-subset_csv_path = "../final/samples/genes_annotations.csv"
-subset_tsv_path = "../final/samples/genes_annotations.tsv"
-sample_df_subset.to_csv(subset_tsv_path, sep="\t", index=False)
-sample_df_subset.to_csv(subset_csv_path, index=False)
 
+    print(instrumentation.summary())
+    print("done with combining all files")
 
-# In[39]:
 
 
-print("done with combining all files")
 
+if __name__ == "__main__":
+    main()
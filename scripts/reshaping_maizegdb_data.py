@@ -29,197 +29,157 @@
 # * **reference_link**: The link to the reference resource if applicable.
 # * **reference_file**: The specific name of the file from which this data comes if applicable.
 
-# In[1]:
-
-
-import matplotlib.pyplot as plt
-import matplotlib as mpl
-import seaborn as sns
 import sys
+import argparse
 import os
 import warnings
 import pandas as pd
-import numpy as np
-import itertools
-import re
-import matplotlib.pyplot as plt
-import nltk
-nltk.download('punkt')
-from nltk.tokenize import word_tokenize
-from nltk.tokenize import sent_tokenize
-
-sys.path.append("../utils")
-from constants import NCBI_TAG, UNIPROT_TAG, EVIDENCE_CODES
-
-sys.path.append("../../oats")
-from oats.nlp.preprocess import concatenate_with_delim, subtract_string_lists, replace_delimiter, concatenate_texts
-from oats.nlp.small import remove_punctuation, remove_enclosing_brackets, add_prefix_safely
+
+sys.path.append("../")
+from utils.constants import NCBI_TAG, UNIPROT_TAG
+from utils.profiling import ProfilingReport
+from utils.instrumentation import stage_instrumentation
+from utils.sampling import parse_stratify_by, DEFAULT_STRATIFY_BY
+from utils.writing import write_csv
+from utils.reshaping import reshape
 
 OUTPUT_DIR = "../reshaped/data"
-mpl.rcParams["figure.dpi"] = 200
+SAMPLE_DIR = "../reshaped/samples"
 warnings.simplefilter('ignore')
 pd.set_option('display.max_rows', 500)
 pd.set_option('display.max_columns', 500)
 pd.set_option('display.width', 1000)
 
 
-# In[2]:
-
-
-# Columns that should be in the final reshaped files.
-reshaped_columns = [
- "species_name",
- "species_code",
- "unique_gene_identifiers", 
- "other_gene_identifiers", 
- "gene_models", 
- "text_unprocessed", 
- "annotations", 
- "reference_name",
- "reference_link",
- "reference_file"]
-
-# Creating and testing a lambda for finding gene model strings.
-gene_model_pattern_1 = re.compile("grmzm.+")
-gene_model_pattern_2 = re.compile("zm[0-9]+d[0-9]+")
-is_gene_model = lambda s: bool(gene_model_pattern_1.match(s.lower() or gene_model_pattern_2.match(s.lower())))
-
-
-# ### File with genes and phenotype descriptions (pheno_genes.txt)
-# Note that fillna is being used here to replace missing values with an empty string. This is done so that the missing string will be quantified when checking for the number of occurences of unique values from different columns, see the analysis below. However this is not necessary as a preprocessing step because when the data is read in and appended to a dataset object later, any missing values or empty strings will be handled at that step.
-
-# In[3]:
-
-
-filename = "../databases/maizegdb/pheno_genes.txt"
-usecols = ["phenotype_name", "phenotype_description", "locus_name", "alleles", "locus_synonyms", "v3_gene_model", "v4_gene_model", "uniprot_id", "ncbi_gene"]
-df = pd.read_table(filename, usecols=usecols)
-df.fillna("", inplace=True)
-print(df[["phenotype_name","phenotype_description"]].head(10))
-print(df.shape)
-
-
-# In[4]:
-
-
-df
 
 
-# Text information about the phenotypes are contained in both the phenotype name and phenotype description for these data. The can be concatenated and retained together in a new description column that contains all this information, or just the phenotype description could be retained, depending on which data should be used downstream for making similarity comparisons. This is different than for most of the other sources of text used. The next cell looks at how many unique values there are in this data for each column.
+# Patterns for finding gene model strings. Only the first of these was ever applied by the lambda that was used
+# before, because of where its parenthesis was, so only that one is used to keep the reshaped files the same.
+GENE_MODEL_PATTERNS = ["grmzm.+"]
 
-# In[5]:
 
+# How the reshaped columns are built from the columns of pheno_genes.txt. The phenotype name and description are
+# both kept in the text, and the UniProt and NCBI identifiers are prefixed to say which database they're from.
+PHENO_GENES_SPEC = {
+    "prefixes":{"uniprot_id":UNIPROT_TAG, "ncbi_gene":NCBI_TAG},
+    "columns":{
+        "species_name":{"value":"maize"},
+        "species_code":{"value":"zma"},
+        "unique_gene_identifiers":{"join":["locus_name", "alleles", "v3_gene_model", "v4_gene_model", "uniprot_id", "ncbi_gene"]},
+        "other_gene_identifiers":{"column":"locus_synonyms", "subtract":"unique_gene_identifiers"},
+        "gene_models":{"join":["v3_gene_model", "v4_gene_model"]},
+        "text_unprocessed":{"join":["phenotype_name", "phenotype_description"], "delim":"; "},
+        "annotations":{"value":""},
+        "reference_name":{"value":"MaizeGDB"},
+        "reference_link":{"value":"https://www.maizegdb.org/"},
+        "reference_file":{"value":"pheno_genes.txt"}}}
 
-# Finding out how many unique values there are for each column.
-unique_values = {col:len(pd.unique(df[col].values)) for col in df.columns}
-for k,v in unique_values.items():
-    print("{:24}{:8}".format(k,v))
 
+# How the reshaped columns are built from the columns of maize_v3.gold.gaf.
+GOLD_GAF_SPEC = {
+    "columns":{
+        "species_name":{"value":"maize"},
+        "species_code":{"value":"zma"},
+        "unique_gene_identifiers":{"join":["db_object_id", "db_object_symbol"]},
+        "other_gene_identifiers":{"join":["db_object_name", "db_object_synonym"]},
+        "gene_models":{"gene_models":"unique_gene_identifiers", "patterns":GENE_MODEL_PATTERNS, "joiner":""},
+        "text_unprocessed":{"value":""},
+        "annotations":{"column":"term_accession"},
+        "reference_name":{"value":"MaizeGDB"},
+        "reference_link":{"value":"https://www.maizegdb.org/"},
+        "reference_file":{"value":"pheno_genes.txt"}}}
 
-# There are a fairly small number of distinct phenotype descriptions (379) compared to the number of lines that are in the complete dataset (3,616). This means that the same descriptions is occuring many times. Look at which descriptions are occuring most often.
 
-# In[6]:
 
 
-# Get a list sorted by number of occurences for each phenotype description.
-description_counts = df["phenotype_description"].value_counts().to_dict()
-sorted_tuples = sorted(description_counts.items(), key = lambda x: x[1], reverse=True)
-for t in sorted_tuples[0:10]:
-    print("{:6}    {:20}".format(t[1],t[0][:70]))
+# Reads the files from MaizeGDB and saves the reshaped files in OUTPUT_DIR. This runs the whole stage, and is
+# what both the notebook and the pipeline call.
+def main(argv=None):
 
+    # Settings that can be changed on the command line, or by giving main() the list of arguments.
+    # Without --profile none of the exploratory statistics or plots are made, only the reshaped files.
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--profile", action="store_true", help="also save a report of statistics and plots about the files read")
+    parser.add_argument("--profile-dir", default="../profiling", help="directory for the profiling report")
+    parser.add_argument("--sample-stratify-by", default=DEFAULT_STRATIFY_BY, help="comma-separated columns to stratify the samples by, or none for the first rows")
+    args, _ = parser.parse_known_args(argv)
+    stratify_by = parse_stratify_by(args.sample_stratify_by)
+    report = ProfilingReport("maizegdb", args.profile_dir) if args.profile else None
+    instrumentation = stage_instrumentation("reshaping_maizegdb_data")
 
-# The only description that occurs far more often than the next is an empty string, where this information is missing entirely. The next cell looks at how many phrases are included in the phenotype description values. Most have a single phrase, some have multiple. These look like they are mainly separated with semicolons.
 
-# In[7]:
+    # ### File with genes and phenotype descriptions (pheno_genes.txt)
+    # Note that fillna is being used here to replace missing values with an empty string. This is done so that the missing string will be quantified when checking for the number of occurences of unique values from different columns, see the analysis below. However this is not necessary as a preprocessing step because when the data is read in and appended to a dataset object later, any missing values or empty strings will be handled at that step.
 
+    filename = "../databases/maizegdb/pheno_genes.txt"
+    usecols = ["phenotype_name", "phenotype_description", "locus_name", "alleles", "locus_synonyms", "v3_gene_model", "v4_gene_model", "uniprot_id", "ncbi_gene"]
+    df = pd.read_table(filename, usecols=usecols)
+    instrumentation.rows_in += len(df)
+    df.fillna("", inplace=True)
+    if report is not None:
+        report.add_head("pheno_genes.txt", df, ["phenotype_name","phenotype_description"])
 
-# Plotting distributions of number of phrases in each description.
-fig, (ax1, ax2) = plt.subplots(1, 2)
-ax1.set_title("Phenotype Descriptions")
-ax2.set_title("Phenotype Descriptions")
-ax1.set_xlabel("Number of phrases")
-ax2.set_xlabel("Number of words")
-x1 = [len(sent_tokenize(x)) for x in df["phenotype_description"].values]
-x2 = [len(word_tokenize(x)) for x in df["phenotype_description"].values]
-ax1.hist(x1, bins=15, range=(0,15), density=False, alpha=0.8, histtype='stepfilled', color="black", edgecolor='none')
-ax2.hist(x2, bins=30, range=(0,150), density=False, alpha=0.8, histtype='stepfilled', color="black", edgecolor='none')
-fig.set_size_inches(15,4)
-fig.tight_layout()
-fig.show()
-plt.close()
 
+    # Text information about the phenotypes are contained in both the phenotype name and phenotype description for these data. The can be concatenated and retained together in a new description column that contains all this information, or just the phenotype description could be retained, depending on which data should be used downstream for making similarity comparisons. This is different than for most of the other sources of text used. The next cell looks at how many unique values there are in this data for each column.
 
-# In[8]:
+    # Finding out how many unique values there are for each column.
+    if report is not None:
+        report.add_unique_counts("Unique values in each column of pheno_genes.txt", df)
 
 
-# Restructuring the dataset to include all the expected column names.
-combine_gene_columns = lambda row, columns: concatenate_with_delim("|", [row[column] for column in columns])
-combine_text_columns = lambda row, columns: concatenate_with_delim("; ", [row[column] for column in columns])
-df["text_unprocessed"] = df.apply(lambda x: combine_text_columns(x, ["phenotype_name", "phenotype_description"]), axis=1)
-df["uniprot_id"] = df["uniprot_id"].apply(add_prefix_safely, prefix=UNIPROT_TAG)
-df["ncbi_gene"] = df["ncbi_gene"].apply(add_prefix_safely, prefix=NCBI_TAG)
-df["unique_gene_identifiers"] = df.apply(lambda x: combine_gene_columns(x, ["locus_name", "alleles", "v3_gene_model", "v4_gene_model", "uniprot_id", "ncbi_gene"]), axis=1)
-df["other_gene_identifiers"] = df["locus_synonyms"]
-df["gene_models"] = df.apply(lambda x: combine_gene_columns(x, ["v3_gene_model", "v4_gene_model"]), axis=1)
-df["species_name"] = "maize"
-df["species_code"] = "zma"
-df["annotations"] = ""
-df["reference_name"] = "MaizeGDB"
-df["reference_link"] = "https://www.maizegdb.org/"
-df["reference_file"] = "pheno_genes.txt"
-df["other_gene_identifiers"] = df.apply(lambda row: subtract_string_lists("|", row["other_gene_identifiers"],row["unique_gene_identifiers"]), axis=1)
-df = df[reshaped_columns]
-df.head()
+    # There are a fairly small number of distinct phenotype descriptions (379) compared to the number of lines that are in the complete dataset (3,616). This means that the same descriptions is occuring many times. Look at which descriptions are occuring most often.
 
+    # Get a list sorted by number of occurences for each phenotype description.
+    if report is not None:
+        report.add_value_counts("Most common phenotype descriptions", df["phenotype_description"].values)
 
-# In[9]:
 
+    # The only description that occurs far more often than the next is an empty string, where this information is missing entirely. The next cell looks at how many phrases are included in the phenotype description values. Most have a single phrase, some have multiple. These look like they are mainly separated with semicolons.
 
-df["text_unprocessed"].values[:1000]
+    # Plotting distributions of number of phrases in each description.
+    if report is not None:
+        report.add_length_histograms("Lengths of phenotype descriptions", [
+            {"title":"Phenotype Descriptions", "texts":df["phenotype_description"].values, "unit":"sentences", "bins":15, "range":(0,15)},
+            {"title":"Phenotype Descriptions", "texts":df["phenotype_description"].values, "unit":"words", "bins":30, "range":(0,150)}])
 
 
-# In[10]:
+    # Restructuring the dataset to include all the expected column names.
+    df = reshape(df, PHENO_GENES_SPEC)
 
 
-# Outputting the dataset of descriptions to a csv file.
-path = os.path.join(OUTPUT_DIR,"maizegdb_phenotype_descriptions.csv")
-df.to_csv(path, index=False)
+    # Outputting the dataset of descriptions to a csv file.
+    path = os.path.join(OUTPUT_DIR,"maizegdb_phenotype_descriptions.csv")
+    instrumentation.rows_out += len(df)
+    write_csv(df, path, SAMPLE_DIR, stratify_by=stratify_by)
 
 
-# ### File with high confidence gene ontology annotations (maize_v3.gold.gaf)
-# This file was generated as part of the [Maize GAMER](https://onlinelibrary.wiley.com/doi/full/10.1002/pld3.52)  publication (Wimalanathan et al., 2018). The annotations include all of the associations between maize genes and ontology terms from GO where the terms have been experimentally confirmed to represent correct functional annotations for those genes.
+    # ### File with high confidence gene ontology annotations (maize_v3.gold.gaf)
+    # This file was generated as part of the [Maize GAMER](https://onlinelibrary.wiley.com/doi/full/10.1002/pld3.52)  publication (Wimalanathan et al., 2018). The annotations include all of the associations between maize genes and ontology terms from GO where the terms have been experimentally confirmed to represent correct functional annotations for those genes.
 
-# In[11]:
+    filename = "../databases/maizegdb/maize_v3.gold.gaf"
+    df = pd.read_table(filename, skiprows=1)
+    instrumentation.rows_in += len(df)
+    df.fillna("", inplace=True)
 
 
-filename = "../databases/maizegdb/maize_v3.gold.gaf"
-df = pd.read_table(filename, skiprows=1)
-df.fillna("", inplace=True)
-df.head()
+    # Restructuring the dataset to include all the expected column names.
+    df = reshape(df, GOLD_GAF_SPEC)
 
 
-# In[13]:
+    # Outputting the dataset of annotations to a csv file.
+    path = os.path.join(OUTPUT_DIR,"maizegdb_curated_go_annotations.csv")
+    instrumentation.rows_out += len(df)
+    write_csv(df, path, SAMPLE_DIR, stratify_by=stratify_by)
 
 
-# Restructuring the dataset to include all the expected column names.
-df["text_unprocessed"] = ""
-df["unique_gene_identifiers"] = df.apply(lambda x: combine_gene_columns(x, ["db_object_id", "db_object_symbol"]), axis=1)
-df["other_gene_identifiers"] = df.apply(lambda x: combine_gene_columns(x, ["db_object_name", "db_object_synonym"]), axis=1)
-df["gene_models"] =  df["unique_gene_identifiers"].map(lambda x: "".join([s for s in x.split("|") if is_gene_model(s)]))
-df["species_name"] = "maize"
-df["species_code"] = "zma"
-df["annotations"] = df["term_accession"]
-df["reference_name"] = "MaizeGDB"
-df["reference_link"] = "https://www.maizegdb.org/"
-df["reference_file"] = "pheno_genes.txt"
-df = df[reshaped_columns]
-df.head()
+    # Saving the profiling report if one was asked for.
+    if report is not None:
+        print("saved profiling report to {}".format(report.save()))
+    print(instrumentation.summary())
 
 
-# In[14]:
 
 
-# Outputting the dataset of annotations to a csv file.
-path = os.path.join(OUTPUT_DIR,"maizegdb_curated_go_annotations.csv")
-df.to_csv(path, index=False)
 
+if __name__ == "__main__":
+    main()
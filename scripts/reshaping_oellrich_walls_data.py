@@ -30,180 +30,164 @@
 # * **reference_link**: The link to the reference resource if applicable.
 # * **reference_file**: The specific name of the file from which this data comes if applicable.
 
-# In[11]:
-
-
-import matplotlib.pyplot as plt
-import matplotlib as mpl
-import seaborn as sns
 import sys
+import argparse
 import os
 import warnings
 import pandas as pd
-import numpy as np
-import itertools
-import re
-import matplotlib.pyplot as plt
-from nltk.tokenize import word_tokenize
-from nltk.tokenize import sent_tokenize
-
-sys.path.append("../utils")
-from constants import ABBREVIATIONS_MAP
 
-sys.path.append("../../oats")
-from oats.nlp.preprocess import concatenate_with_delim, replace_delimiter
-from oats.nlp.small import remove_punctuation, remove_enclosing_brackets
+sys.path.append("../")
+from utils.constants import ABBREVIATIONS_MAP
+from utils.profiling import ProfilingReport
+from utils.instrumentation import stage_instrumentation
+from utils.sampling import parse_stratify_by, DEFAULT_STRATIFY_BY
+from utils.writing import write_csv
+from utils.reshaping import reshape
 
 OUTPUT_DIR = "../reshaped/data"
-mpl.rcParams["figure.dpi"] = 200
+SAMPLE_DIR = "../reshaped/samples"
 warnings.simplefilter('ignore')
 pd.set_option('display.max_rows', 500)
 pd.set_option('display.max_columns', 500)
 pd.set_option('display.width', 1000)
 
 
-# In[12]:
-
-
-# Columns that should be in the final reshaped files.
-reshaped_columns = [
- "species_name",
- "species_code",
- "unique_gene_identifiers", 
- "other_gene_identifiers", 
- "gene_models", 
- "text_unprocessed", 
- "annotations", 
- "reference_name",
- "reference_link",
- "reference_file"]
-
-# Creating a list of lambdas for finding gene model strings.
-gene_model_patterns = []
-gene_model_patterns.append(re.compile("grmzm.+"))
-gene_model_patterns.append(re.compile("zm[0-9]+d[0-9]+"))
-gene_model_patterns.append(re.compile("at[0-9]{1}g[0-9]+"))
-gene_model_patterns.append(re.compile("medtr[0-9]{1}g[0-9]+"))
-gene_model_patterns.append(re.compile("os[0-9]+g[0-9]+"))
-is_gene_model = lambda s: any([bool(pattern.match(s.lower())) for pattern in gene_model_patterns])
-
-
-# ### Phenotypic Text Data (oellrich_walls_dataset_irb_cleaned.txt)
-# This data contains the phenotype descriptions for dominant mutants of genes across six different plant species. The data is read in from a cleaned version that removed some small delimiter errors from the original dataset that is available as a supplemental file from that publication. The data itself is unchanged.
-# 
-# There are several columns that contain information about gene names and accessions. We need to know what type of information is in each in order to know which should be retained in the dataset we are preparing. We are interested in both gene names that should map to a specific accession (like cyp716A12 or Medtr3g021350) as well as gene names that are enzyme descriptions (like Ubiquitin-Specific Protease) that could map to more than one gene in a particular species. Each type of information is valuable, but needs to be differentiated so that when comparing whether two rows are specifying the same gene, this is not confused with specifying two different genes that have the same function. In the case of this dataset, the gene symbol and gene identifier columns contain strings that we want to consider to be unique to a particular gene for a particular species, meaning that we can use those strings to look for these gene objects in other resources such as databases of pathway membership. The strings in the gene name column could be unique (narrow sheath1), but they can also be generic descriptions of enzymes (Ubiquitin-Specific Protease). For this reason, this column is not used in downstream analysis.
-# 
-# This dataset includes both full phenotype descriptions in one field, and atomized statements (which are phene descriptions) in another field. Either or both of these can be used as a source of text annotations on which to calculate similarity between phenotypes, phenes, or assess a hypothesized connected between genes in a network. We will look at quantity and properties of each of these categerogies of descriptions available and save the restructured datasets separately for each type.
-# 
-# This section creates a set of columns that have standardized names and include data in a standardized format that other functions within the package expect. The species column contains strings which are KEGG abbreviations for particular species. The gene names column contains any strings we want to consider to be uniquely mapped to some particular gene.
-# 
-# When saving the dataset using the phenotype descriptions as the text description column, there will be duplicates with respect to the combination of that column and the gene names column. This is because for each phenotype description there can be one or more atomized statement that it is comprised of. However, merging these rows requires also merging the ontology term annotations that each was annotated with, and this requires logic that is applied later. At this step we're only concerned with getting the right information in the right columns, and any datset with that correct can be merged later.
-
-# In[13]:
-
-
-filename = "../papers/oellrich_walls_et_al_2015/versions_cleaned_by_me/13007_2015_53_MOESM1_ESM.csv"
-usecols = ["Species", "gene symbol", "Gene Identifier", "allele (optional)", 
-           "gene name", "phenotype name", "phenotype description", 'atomized statement', 
-           'primary entity1 ID', 'primary entity1 text', 'relation_to (optional)', 
-           'primary entity2 ID (optional)', 'primary entity2 text (optional)', 
-           'quality ID', 'quality text', 'PATO Qualifier ID (optional)', 
-           'PATO Qualifier text (optional)', 'secondary_entity1 ID (optional)', 
-           'secondary_entity1 text (optional)', 'relation_to (optional)', 
-           'secondary entity2 ID (optional)','secondary_entity2 text (opyional)',
-           'developmental stage ID (optional)', 'developmental stage text (optional)', 
-           'condition ID (optional)', 'condition text (optional)', 'Pubmed ID (optional)', 
-           'Dominant, recessive, codominant, semi-dominant (optional)', 
-           'Loss or gain of function (optional)', 'Comment on mode of inheritance (optional)']
-df = pd.read_csv(filename, usecols=usecols)
-df.fillna("", inplace=True)
-print(df.shape)
-print(df[["gene symbol","Gene Identifier","allele (optional)","gene name"]].head(15))
-
-
-# In[14]:
-
-
-# Plotting distributions of number of words in each class of description.
-fig, (ax1, ax2) = plt.subplots(1, 2)
-ax1.set_title("Phenotype Descriptions")
-ax2.set_title("Phene Descriptions")
-ax1.set_xlabel("Number of words")
-ax2.set_xlabel("Number of words")
-x1 = [len(word_tokenize(x)) for x in df["phenotype description"].values]
-x2 = [len(word_tokenize(x)) for x in df["atomized statement"].values]
-ax1.hist(x1, bins=30, range=(0,150), density=False, alpha=0.8, histtype='stepfilled', color="black", edgecolor='none')
-ax2.hist(x2, bins=30, range=(0,150), density=False, alpha=0.8, histtype='stepfilled', color="black", edgecolor='none')
-fig.set_size_inches(15,4)
-fig.tight_layout()
-fig.show()
-plt.close()
-
-
-# In[15]:
-
-
-# Finding the number of unique descriptions in each class of text description.
-print(len(pd.unique(df["phenotype description"])))
-print(len(pd.unique(df["atomized statement"])))
-
-
-# ### Ontology Term Annotations (oellrich_walls_dataset_irb_cleaned.txt)
-# There are several columns in the original dataset which refer to ontology terms, and specify a particular aspect of the EQ statement structure that that particular term refers to. For this dataset we are constructing, we will treat ontology term annotations as a 'bag of terms', and ignore the context of multi-term structured annotations such as EQ statements. Therefore these columns can be combined and any mentioned terms can be combined into a new column (as a bar delimited list). Contex of these terms in their respective ontologies are ignored (more than just leaf terms are retained), because this is handled later when comparing term sets.
-
-# In[16]:
-
-
-# Combining the different components of the EQ statement into a single column.
-combine_columns = lambda row, columns: concatenate_with_delim("|", [row[column] for column in columns])
-df["annotations"] = df.apply(lambda x: combine_columns(x, [
-    "primary entity1 ID",
-    "primary entity2 ID (optional)",
-    "quality ID",
-    "PATO Qualifier ID (optional)",
-    "secondary_entity1 ID (optional)",
-    "secondary entity2 ID (optional)",
-    "developmental stage ID (optional)","condition ID (optional)",
-    ]), axis=1)
-    
-df[["annotations"]].head(15)
-
-
-# In[17]:
-
-
-# Organizing the desired information into a standard set of column headers.
-df["species_code"] = df["Species"].map(ABBREVIATIONS_MAP)
-df["species_name"] = df["Species"]
-df["unique_gene_identifiers"] = df.apply(lambda x: combine_columns(x,["gene symbol", "Gene Identifier"]), axis=1)
-df["other_gene_identifiers"] = df.apply(lambda x: combine_columns(x,["allele (optional)", "gene name"]), axis=1)
-df["gene_models"] = df["unique_gene_identifiers"].map(lambda x: "".join([s for s in x.split("|") if is_gene_model(s)]))
-df["reference_name"] = "Oellrich, Walls et al., 2015"
-df["reference_link"] = "https://plantmethods.biomedcentral.com/articles/10.1186/s13007-015-0053-y"
-df["reference_file"] = "13007_2015_53_MOESM1_ESM.csv"
-df[["species_name","unique_gene_identifiers","other_gene_identifiers","gene_models"]].head(20)
-
-
-# In[18]:
 
 
-# Saving a version that uses the full phenotype descriptions.
-df["text_unprocessed"] = df["phenotype description"]
-df_subset = df[reshaped_columns]
-df_subset["annotations"] = ""
-path = os.path.join(OUTPUT_DIR,"oellrich_walls_phenotype_descriptions.csv")
-df_subset.to_csv(path, index=False)
+# Patterns for finding gene model strings.
+GENE_MODEL_PATTERNS = [
+    "grmzm.+",
+    "zm[0-9]+d[0-9]+",
+    "at[0-9]{1}g[0-9]+",
+    "medtr[0-9]{1}g[0-9]+",
+    "os[0-9]+g[0-9]+"]
+
+
+# How the reshaped columns are built from the columns of the supplemental table. The ontology terms from all the
+# parts of each EQ statement are combined into one list of annotations. The text is left empty here, because each
+# of the files made from this table uses a different column for it.
+SUPPLEMENTAL_TABLE_SPEC = {
+    "columns":{
+        "annotations":{"join":[
+            "primary entity1 ID",
+            "primary entity2 ID (optional)",
+            "quality ID",
+            "PATO Qualifier ID (optional)",
+            "secondary_entity1 ID (optional)",
+            "secondary entity2 ID (optional)",
+            "developmental stage ID (optional)",
+            "condition ID (optional)"]},
+        "species_code":{"map":"Species", "mapping":ABBREVIATIONS_MAP},
+        "species_name":{"column":"Species"},
+        "unique_gene_identifiers":{"join":["gene symbol", "Gene Identifier"]},
+        "other_gene_identifiers":{"join":["allele (optional)", "gene name"]},
+        "gene_models":{"gene_models":"unique_gene_identifiers", "patterns":GENE_MODEL_PATTERNS, "joiner":""},
+        "text_unprocessed":{"value":""},
+        "reference_name":{"value":"Oellrich, Walls et al., 2015"},
+        "reference_link":{"value":"https://plantmethods.biomedcentral.com/articles/10.1186/s13007-015-0053-y"},
+        "reference_file":{"value":"13007_2015_53_MOESM1_ESM.csv"}}}
+
+
+
+
+# Reads the supplemental table from Oellrich, Walls et al. (2015) and saves the reshaped files in OUTPUT_DIR.
+# This runs the whole stage, and is what both the notebook and the pipeline call.
+def main(argv=None):
+
+    # Settings that can be changed on the command line, or by giving main() the list of arguments.
+    # Without --profile none of the exploratory statistics or plots are made, only the reshaped files.
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--profile", action="store_true", help="also save a report of statistics and plots about the files read")
+    parser.add_argument("--profile-dir", default="../profiling", help="directory for the profiling report")
+    parser.add_argument("--sample-stratify-by", default=DEFAULT_STRATIFY_BY, help="comma-separated columns to stratify the samples by, or none for the first rows")
+    args, _ = parser.parse_known_args(argv)
+    stratify_by = parse_stratify_by(args.sample_stratify_by)
+    report = ProfilingReport("oellrich_walls", args.profile_dir) if args.profile else None
+    instrumentation = stage_instrumentation("reshaping_oellrich_walls_data")
+
+
+    # ### Phenotypic Text Data (oellrich_walls_dataset_irb_cleaned.txt)
+    # This data contains the phenotype descriptions for dominant mutants of genes across six different plant species. The data is read in from a cleaned version that removed some small delimiter errors from the original dataset that is available as a supplemental file from that publication. The data itself is unchanged.
+    # 
+    # There are several columns that contain information about gene names and accessions. We need to know what type of information is in each in order to know which should be retained in the dataset we are preparing. We are interested in both gene names that should map to a specific accession (like cyp716A12 or Medtr3g021350) as well as gene names that are enzyme descriptions (like Ubiquitin-Specific Protease) that could map to more than one gene in a particular species. Each type of information is valuable, but needs to be differentiated so that when comparing whether two rows are specifying the same gene, this is not confused with specifying two different genes that have the same function. In the case of this dataset, the gene symbol and gene identifier columns contain strings that we want to consider to be unique to a particular gene for a particular species, meaning that we can use those strings to look for these gene objects in other resources such as databases of pathway membership. The strings in the gene name column could be unique (narrow sheath1), but they can also be generic descriptions of enzymes (Ubiquitin-Specific Protease). For this reason, this column is not used in downstream analysis.
+    # 
+    # This dataset includes both full phenotype descriptions in one field, and atomized statements (which are phene descriptions) in another field. Either or both of these can be used as a source of text annotations on which to calculate similarity between phenotypes, phenes, or assess a hypothesized connected between genes in a network. We will look at quantity and properties of each of these categerogies of descriptions available and save the restructured datasets separately for each type.
+    # 
+    # This section creates a set of columns that have standardized names and include data in a standardized format that other functions within the package expect. The species column contains strings which are KEGG abbreviations for particular species. The gene names column contains any strings we want to consider to be uniquely mapped to some particular gene.
+    # 
+    # When saving the dataset using the phenotype descriptions as the text description column, there will be duplicates with respect to the combination of that column and the gene names column. This is because for each phenotype description there can be one or more atomized statement that it is comprised of. However, merging these rows requires also merging the ontology term annotations that each was annotated with, and this requires logic that is applied later. At this step we're only concerned with getting the right information in the right columns, and any datset with that correct can be merged later.
+
+    filename = "../papers/oellrich_walls_et_al_2015/versions_cleaned_by_me/13007_2015_53_MOESM1_ESM.csv"
+    usecols = ["Species", "gene symbol", "Gene Identifier", "allele (optional)", 
+               "gene name", "phenotype name", "phenotype description", 'atomized statement', 
+               'primary entity1 ID', 'primary entity1 text', 'relation_to (optional)', 
+               'primary entity2 ID (optional)', 'primary entity2 text (optional)', 
+               'quality ID', 'quality text', 'PATO Qualifier ID (optional)', 
+               'PATO Qualifier text (optional)', 'secondary_entity1 ID (optional)', 
+               'secondary_entity1 text (optional)', 'relation_to (optional)', 
+               'secondary entity2 ID (optional)','secondary_entity2 text (opyional)',
+               'developmental stage ID (optional)', 'developmental stage text (optional)', 
+               'condition ID (optional)', 'condition text (optional)', 'Pubmed ID (optional)', 
+               'Dominant, recessive, codominant, semi-dominant (optional)', 
+               'Loss or gain of function (optional)', 'Comment on mode of inheritance (optional)']
+    df = pd.read_csv(filename, usecols=usecols)
+    instrumentation.rows_in += len(df)
+    df.fillna("", inplace=True)
+    if report is not None:
+        report.add_head("13007_2015_53_MOESM1_ESM.csv", df, ["gene symbol","Gene Identifier","allele (optional)","gene name"], num_rows=15)
+
+
+    # Plotting distributions of number of words in each class of description.
+    if report is not None:
+        report.add_length_histograms("Lengths of phenotype and phene descriptions", [
+            {"title":"Phenotype Descriptions", "texts":df["phenotype description"].values, "unit":"words", "bins":30, "range":(0,150)},
+            {"title":"Phene Descriptions", "texts":df["atomized statement"].values, "unit":"words", "bins":30, "range":(0,150)}])
+
+
+    # Finding the number of unique descriptions in each class of text description.
+    if report is not None:
+        report.add_unique_counts("Unique descriptions of each class", df[["phenotype description","atomized statement"]])
+
+
+    # ### Ontology Term Annotations (oellrich_walls_dataset_irb_cleaned.txt)
+    # There are several columns in the original dataset which refer to ontology terms, and specify a particular aspect of the EQ statement structure that that particular term refers to. For this dataset we are constructing, we will treat ontology term annotations as a 'bag of terms', and ignore the context of multi-term structured annotations such as EQ statements. Therefore these columns can be combined and any mentioned terms can be combined into a new column (as a bar delimited list). Contex of these terms in their respective ontologies are ignored (more than just leaf terms are retained), because this is handled later when comparing term sets.
+
+    # Organizing the desired information into a standard set of column headers, with the different components of
+    # the EQ statement combined into a single column.
+    reshaped_df = reshape(df, SUPPLEMENTAL_TABLE_SPEC)
+
+
+    # Saving a version that uses the full phenotype descriptions.
+    df_subset = reshaped_df.copy()
+    df_subset["text_unprocessed"] = df["phenotype description"].values
+    df_subset["annotations"] = ""
+    path = os.path.join(OUTPUT_DIR,"oellrich_walls_phenotype_descriptions.csv")
+    instrumentation.rows_out += len(df_subset)
+    write_csv(df_subset, path, SAMPLE_DIR, stratify_by=stratify_by)
+
+    # Saving a version that uses the individual phene descriptions.
+    df_subset = reshaped_df.copy()
+    df_subset["text_unprocessed"] = df["atomized statement"].values
+    df_subset["annotations"] = ""
+    path = os.path.join(OUTPUT_DIR,"oellrich_walls_phene_descriptions.csv")
+    instrumentation.rows_out += len(df_subset)
+    write_csv(df_subset, path, SAMPLE_DIR, stratify_by=stratify_by)
+
+    # Saving a version that includes only the ontology term annotations.
+    df_subset = reshaped_df
+    path = os.path.join(OUTPUT_DIR,"oellrich_walls_annotations.csv")
+    instrumentation.rows_out += len(df_subset)
+    write_csv(df_subset, path, SAMPLE_DIR, stratify_by=stratify_by)
+
+
+    # Saving the profiling report if one was asked for.
+    if report is not None:
+        print("saved profiling report to {}".format(report.save()))
+    print(instrumentation.summary())
 
-# Saving a version that uses the individual phene descriptions.
-df["text_unprocessed"] = df["atomized statement"]
-df_subset = df[reshaped_columns]
-df_subset["annotations"] = ""
-path = os.path.join(OUTPUT_DIR,"oellrich_walls_phene_descriptions.csv")
-df_subset.to_csv(path, index=False)
 
-# Saving a version that includes only the ontology term annotations.
-df["text_unprocessed"] = ""
-df_subset = df[reshaped_columns]
-path = os.path.join(OUTPUT_DIR,"oellrich_walls_annotations.csv")
-df_subset.to_csv(path, index=False)
 
+
+
+if __name__ == "__main__":
+    main()
@@ -40,8 +40,8 @@ import matplotlib.pyplot as plt
 from nltk.tokenize import word_tokenize
 from nltk.tokenize import sent_tokenize
 
-sys.path.append("../utils")
-from constants import NCBI_TAG, EVIDENCE_CODES
+sys.path.append("../")
+from utils.constants import NCBI_TAG, EVIDENCE_CODES
 
 sys.path.append("../../oats")
 from oats.nlp.small import add_prefix_safely, get_ontology_ids, remove_punctuation, remove_enclosing_brackets
@@ -31,207 +31,161 @@
 # * **reference_link**: The link to the reference resource if applicable.
 # * **reference_file**: The specific name of the file from which this data comes if applicable.
 
-# In[64]:
-
-
 import sys
+import argparse
 import os
-import re
 import warnings
 import pandas as pd
-import numpy as np
-import itertools
-import re
 
-sys.path.append("../utils")
-from constants import EVIDENCE_CODES
+sys.path.append("../")
+from utils.constants import EVIDENCE_CODES
+from utils.profiling import ProfilingReport
+from utils.instrumentation import stage_instrumentation
+from utils.sampling import parse_stratify_by, DEFAULT_STRATIFY_BY
+from utils.writing import write_csv
+from utils.reshaping import reshape
 
 OUTPUT_DIR = "../reshaped/data"
+SAMPLE_DIR = "../reshaped/samples"
 warnings.simplefilter('ignore')
 pd.set_option('display.max_rows', 500)
 pd.set_option('display.max_columns', 500)
 pd.set_option('display.width', 1000)
 
 
-# In[65]:
-
-
-# Creating a list of lambdas for finding gene model strings.
-gene_model_patterns = []
-gene_model_patterns.append(re.compile("grmzm.+"))
-gene_model_patterns.append(re.compile("zm[0-9]+d[0-9]+"))
-gene_model_patterns.append(re.compile("solyc[0-9]+g[0-9]+"))
-gene_model_patterns.append(re.compile("at[0-9]{1}g[0-9]+"))
-gene_model_patterns.append(re.compile("medtr[0-9]{1}g[0-9]+"))
-gene_model_patterns.append(re.compile("os[0-9]+g[0-9]+"))
-gene_model_patterns.append(re.compile("loc_os[0-9]+g[0-9]+"))
-is_gene_model = lambda s: any([bool(pattern.match(s.lower())) for pattern in gene_model_patterns])
-
-
-# In[80]:
-
-
-# Columns that should be in the final reshaped files.
-reshaped_columns = [
- "species_name",
- "species_code",
- "unique_gene_identifiers", 
- "other_gene_identifiers", 
- "gene_models", 
- "text_unprocessed", 
- "annotations", 
- "reference_name",
- "reference_link",
- "reference_file"]
-
-# The files that were obtained through the Planteome browser queries.
-planteome_annotation_filepaths = [
-    "../databases/planteome/biological_process.txt",
-    "../databases/planteome/cellular_component.txt",
-    "../databases/planteome/molecular_function.txt",
-    "../databases/planteome/plant_anatomical_entity.txt",
-    "../databases/planteome/plant_structure_development_stage.txt",
-    "../databases/planteome/quality.txt"
-]
-# The fields that were included for each of those downloaded files.
-columns = [
-    "bioentity",
-    "bioentity_name",
-    "type",
-    "bioentity_label",
-    "annotation_class",
-    "aspect",
-    "annotation_extension_json",
-    "taxon",
-    "evidence_type",
-    "evidence_with",
-    "reference",
-    "assigned_by"
-]
-# Read in all the files and stack rows, because they all have the same formatting and fields.
-dfs = [pd.read_csv(path, sep="\t", names=columns) for path in planteome_annotation_filepaths]
-df = pd.concat(dfs)
-df.head(20)
-
-
-# In[67]:
-
-
-df.tail(20)
-
-
-# In[68]:
-
-
-# How many of each evidence type are there in this combined?
-code_quantities = {c:len([x for x in df["evidence_type"] if EVIDENCE_CODES[x] in c]) for c in list(set(EVIDENCE_CODES.values()))}
-for k,v in code_quantities.items():
-    print("{:25}{:8}".format(k,v))
-
-
-# In[69]:
-
-
-df.shape
-
-
-# In[70]:
-
-
-# Retain just the annotations that we're considering high confidence.
-high_confidence_categories = ["experimental","author_statement","curator_statement"]
-df["high_confidence"] = df["evidence_type"].apply(lambda x: EVIDENCE_CODES[x] in high_confidence_categories)
-df = df[df["high_confidence"]]
-df.shape
-
-
-# In[71]:
-
-
-# Taxon IDs are given in the file but we need to use the naming scheme used across files to make it compatible.
-ncbi_taxon_ids = ["3702","3847","3880","4081","4530","4577"]
-species_code_strings = ["ath","gmx","osa","mtr","sly","zma"]
-species_name_strings = ["Arabidopsis","soybean","rice","Medicago","tomato","maize"]
-mapping = dict(zip(ncbi_taxon_ids,species_code_strings))
-df["species_code"] = df["taxon"].map(lambda x: mapping.get(x[-4:],None))
-mapping = dict(zip(ncbi_taxon_ids,species_name_strings))
-df["species_name"] = df["taxon"].map(lambda x: mapping.get(x[-4:],None))
-df.dropna(subset=["species_code"], axis=0, inplace=True)
-print(pd.unique(df["species_name"]))
-print(pd.unique(df["species_code"]))
-
-
-# In[72]:
-
-
-df.shape
-
-
-# In[73]:
-
-
-df.head(20)
-
-
-# In[74]:
-
-
-# Formatting the gene identifier columns to be the same as the other files.
-df["unique_gene_identifiers"] = df.apply(lambda row: "{}|{}".format(row["bioentity_name"],row["bioentity_label"]), axis=1)
-df["other_gene_identifiers"] = ""
-df.head(20)
-
-
-# In[75]:
-
-
-# Other columns that are needed.
-df["gene_models"] = df["unique_gene_identifiers"].map(lambda x: "".join([s for s in x.split("|") if is_gene_model(s)]))
-df["text_unprocessed"] = ""
-df["annotations"] = df["annotation_class"]
-df["reference_name"] = "Planteome"
-df["reference_link"] = "https://planteome.org/"
-
-
-aspects = ["P", "C", "F", "A", "T", "G"]
-filenames = [
-    "biological_process.txt",
-    "cellular_component.txt",
-    "molecular_function.txt",
-    "plant_anatomical_entity.txt",
-    "quality.txt",
-    "plant_structural_development_stage.txt"]
-
-df["reference_file"] = df["aspect"].map(dict(zip(aspects,filenames)))
-
-
-# In[76]:
-
-
-df["ontology"] = df["annotation_class"].map(lambda x: x.split(":")[0])
-pd.unique(df["ontology"])
-df = df[df["ontology"].isin(["GO","PO","PATO"])]
-df.shape
-
-
-# In[77]:
-
-
-df = df[reshaped_columns]
-df.head(30)
-
-
-# In[78]:
-
-
-# Outputting the dataset of annotations to a csv file.
-path = os.path.join(OUTPUT_DIR,"planteome_curated_annotations.csv")
-df.to_csv(path, index=False)
-df.head(30)
-
-
-# In[79]:
 
 
-df.sample(30)
+# Patterns for finding gene model strings.
+GENE_MODEL_PATTERNS = [
+    "grmzm.+",
+    "zm[0-9]+d[0-9]+",
+    "solyc[0-9]+g[0-9]+",
+    "at[0-9]{1}g[0-9]+",
+    "medtr[0-9]{1}g[0-9]+",
+    "os[0-9]+g[0-9]+",
+    "loc_os[0-9]+g[0-9]+"]
+
+
+# The files that each aspect in the annotation files comes from.
+ASPECT_FILENAMES = {
+    "P":"biological_process.txt",
+    "C":"cellular_component.txt",
+    "F":"molecular_function.txt",
+    "A":"plant_anatomical_entity.txt",
+    "T":"quality.txt",
+    "G":"plant_structural_development_stage.txt"}
+
+
+# How the reshaped columns are built from the columns of the annotation files, after the species code and name
+# are found from the taxon. The name and label of each bioentity are both kept as unique identifiers as they are.
+ANNOTATIONS_SPEC = {
+    "columns":{
+        "species_code":{"column":"species_code"},
+        "species_name":{"column":"species_name"},
+        "unique_gene_identifiers":{"concat":["bioentity_name", "bioentity_label"]},
+        "other_gene_identifiers":{"value":""},
+        "gene_models":{"gene_models":"unique_gene_identifiers", "patterns":GENE_MODEL_PATTERNS, "joiner":""},
+        "text_unprocessed":{"value":""},
+        "annotations":{"column":"annotation_class"},
+        "reference_name":{"value":"Planteome"},
+        "reference_link":{"value":"https://planteome.org/"},
+        "reference_file":{"map":"aspect", "mapping":ASPECT_FILENAMES}}}
+
+
+
+
+# Reads the annotation files from Planteome and saves the reshaped file in OUTPUT_DIR. This runs the whole stage,
+# and is what both the notebook and the pipeline call.
+def main(argv=None):
+
+    # Settings that can be changed on the command line, or by giving main() the list of arguments.
+    # Without --profile none of the exploratory statistics or plots are made, only the reshaped files.
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--profile", action="store_true", help="also save a report of statistics and plots about the files read")
+    parser.add_argument("--profile-dir", default="../profiling", help="directory for the profiling report")
+    parser.add_argument("--sample-stratify-by", default=DEFAULT_STRATIFY_BY, help="comma-separated columns to stratify the samples by, or none for the first rows")
+    args, _ = parser.parse_known_args(argv)
+    stratify_by = parse_stratify_by(args.sample_stratify_by)
+    report = ProfilingReport("planteome", args.profile_dir) if args.profile else None
+    instrumentation = stage_instrumentation("reshaping_planteome_data")
+
+    # The files that were obtained through the Planteome browser queries.
+    planteome_annotation_filepaths = [
+        "../databases/planteome/biological_process.txt",
+        "../databases/planteome/cellular_component.txt",
+        "../databases/planteome/molecular_function.txt",
+        "../databases/planteome/plant_anatomical_entity.txt",
+        "../databases/planteome/plant_structure_development_stage.txt",
+        "../databases/planteome/quality.txt"
+    ]
+    # The fields that were included for each of those downloaded files.
+    columns = [
+        "bioentity",
+        "bioentity_name",
+        "type",
+        "bioentity_label",
+        "annotation_class",
+        "aspect",
+        "annotation_extension_json",
+        "taxon",
+        "evidence_type",
+        "evidence_with",
+        "reference",
+        "assigned_by"
+    ]
+    # Read in all the files and stack rows, because they all have the same formatting and fields.
+    dfs = [pd.read_csv(path, sep="\t", names=columns) for path in planteome_annotation_filepaths]
+    instrumentation.rows_in += sum(len(df) for df in dfs)
+    df = pd.concat(dfs)
+
+
+    # How many of each evidence type are there in this combined?
+    if report is not None:
+        report.add_category_counts("Evidence codes in the combined annotation files", df["evidence_type"].values, EVIDENCE_CODES)
+
+
+    # Retain just the annotations that we're considering high confidence.
+    high_confidence_categories = ["experimental","author_statement","curator_statement"]
+    df["high_confidence"] = df["evidence_type"].apply(lambda x: EVIDENCE_CODES[x] in high_confidence_categories)
+    df = df[df["high_confidence"]]
+
+
+    # Taxon IDs are given in the file but we need to use the naming scheme used across files to make it compatible.
+    ncbi_taxon_ids = ["3702","3847","3880","4081","4530","4577"]
+    species_code_strings = ["ath","gmx","osa","mtr","sly","zma"]
+    species_name_strings = ["Arabidopsis","soybean","rice","Medicago","tomato","maize"]
+    mapping = dict(zip(ncbi_taxon_ids,species_code_strings))
+    df["species_code"] = df["taxon"].map(lambda x: mapping.get(x[-4:],None))
+    mapping = dict(zip(ncbi_taxon_ids,species_name_strings))
+    df["species_name"] = df["taxon"].map(lambda x: mapping.get(x[-4:],None))
+    df.dropna(subset=["species_code"], axis=0, inplace=True)
+    if report is not None:
+        report.add_value_counts("Annotations for each species", df["species_name"].values)
+
+
+    # Only keeping the annotations to terms from GO, PO, and PATO.
+    df["ontology"] = df["annotation_class"].map(lambda x: x.split(":")[0])
+    df = df[df["ontology"].isin(["GO","PO","PATO"])]
+
+
+    # Formatting the gene identifier columns and the other columns to be the same as the other files.
+    df = reshape(df, ANNOTATIONS_SPEC)
+
+
+    # Outputting the dataset of annotations to a csv file.
+    path = os.path.join(OUTPUT_DIR,"planteome_curated_annotations.csv")
+    instrumentation.rows_out += len(df)
+    write_csv(df, path, SAMPLE_DIR, stratify_by=stratify_by)
+
+
+    # Saving the profiling report if one was asked for.
+    if report is not None:
+        print("saved profiling report to {}".format(report.save()))
+    print(instrumentation.summary())
+
+
+
+
 
+if __name__ == "__main__":
+    main()
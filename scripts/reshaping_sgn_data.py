@@ -27,128 +27,110 @@
 # * **reference_link**: The link to the reference resource if applicable.
 # * **reference_file**: The specific name of the file from which this data comes if applicable.
 
-# In[4]:
-
-
-import matplotlib.pyplot as plt
-import matplotlib as mpl
-import seaborn as sns
 import sys
+import argparse
 import os
 import warnings
 import pandas as pd
-import numpy as np
-import itertools
-import re
-import matplotlib.pyplot as plt
-from nltk.tokenize import word_tokenize
-from nltk.tokenize import sent_tokenize
-
-sys.path.append("../utils")
-from constants import ABBREVIATIONS_MAP
 
-sys.path.append("../../oats")
-from oats.nlp.preprocess import concatenate_with_delim, replace_delimiter
-from oats.nlp.small import remove_punctuation, remove_enclosing_brackets
+sys.path.append("../")
+from utils.profiling import ProfilingReport
+from utils.instrumentation import stage_instrumentation
+from utils.sampling import parse_stratify_by, DEFAULT_STRATIFY_BY
+from utils.writing import write_csv
+from utils.reshaping import reshape
 
 OUTPUT_DIR = "../reshaped/data"
-mpl.rcParams["figure.dpi"] = 200
+SAMPLE_DIR = "../reshaped/samples"
 warnings.simplefilter('ignore')
 pd.set_option('display.max_rows', 500)
 pd.set_option('display.max_columns', 500)
 pd.set_option('display.width', 1000)
 
 
-# In[5]:
 
 
-# Columns that should be in the final reshaped files.
-reshaped_columns = [
- "species_name",
- "species_code",
- "unique_gene_identifiers", 
- "other_gene_identifiers", 
- "gene_models", 
- "text_unprocessed", 
- "annotations", 
- "reference_name",
- "reference_link",
- "reference_file"]
+# How the reshaped columns are built from the columns of sgn_tomato_phenotyped_loci.txt. Only the locus and its
+# symbol are used as unique identifiers, the other names are kept as other identifiers.
+PHENOTYPED_LOCI_SPEC = {
+    "columns":{
+        "species_code":{"value":"sly"},
+        "species_name":{"value":"tomato"},
+        "text_unprocessed":{"column":"allele_phenotype"},
+        "unique_gene_identifiers":{"join":["locus", "locus_symbol"]},
+        "other_gene_identifiers":{"join":["locus_name", "allele_symbol", "allele_name"]},
+        "gene_models":{"column":"locus"},
+        "annotations":{"value":""},
+        "reference_name":{"value":"SGN"},
+        "reference_link":{"value":"https://solgenomics.net/"},
+        "reference_file":{"value":"sgn_tomato_phenotyped_loci.txt"}}}
 
 
-# ### File with genes and phenotype descriptions (sgn_tomato_phenotyped_loci.txt)
-# Note that fillna is being used here to replace missing values with an empty string. This is done so that the missing string will be quantified when checking for the number of occurences of unique values from different columns, see the analysis below. However this is not necessary as a preprocessing step because when the data is read in and appended to a dataset object later, any missing values or empty strings will be handled at that step.
-# 
-# There are several columns that contain information about gene names and accessions. We need to know what type of information is in each in order to know which should be retained in the dataset we are preparing. We are interested in both gene names that should map to a specific accession (like cyp716A12 or Medtr3g021350) as well as gene names that are enzyme descriptions (like Ubiquitin-Specific Protease) that could map to more than one gene in a particular species. Each type of information is valuable, but needs to be differentiated so that when comparing whether two rows are specifying the same gene, this is not confused with specifying two different genes that have the same function. In the case of this dataset, we only want to considered the locus names in a single column, the rest of the columns are more ambiguous and as long as all the mapping can be done with the locus names the other names can be ignored for downstream analysis.
-# 
-# This section creates a set of columns that have standardized names and include data in a standardized format that other functions within the package expect. The species column contains strings which are KEGG abbreviations for particular species. The gene names column contains any strings we want to consider to be uniquely mapped to some particular gene.
-
-# In[6]:
 
 
-filename = "../databases/sgn/sgn_tomato_phenotyped_loci.txt"
-df = pd.read_table(filename)
-df.fillna("", inplace=True)
-df.head(10)
+# Reads the file from SGN and saves the reshaped file in OUTPUT_DIR. This runs the whole stage, and is what both
+# the notebook and the pipeline call.
+def main(argv=None):
 
+    # Settings that can be changed on the command line, or by giving main() the list of arguments.
+    # Without --profile none of the exploratory statistics or plots are made, only the reshaped files.
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--profile", action="store_true", help="also save a report of statistics and plots about the files read")
+    parser.add_argument("--profile-dir", default="../profiling", help="directory for the profiling report")
+    parser.add_argument("--sample-stratify-by", default=DEFAULT_STRATIFY_BY, help="comma-separated columns to stratify the samples by, or none for the first rows")
+    args, _ = parser.parse_known_args(argv)
+    stratify_by = parse_stratify_by(args.sample_stratify_by)
+    report = ProfilingReport("sgn", args.profile_dir) if args.profile else None
+    instrumentation = stage_instrumentation("reshaping_sgn_data")
 
-# In[7]:
 
+    # ### File with genes and phenotype descriptions (sgn_tomato_phenotyped_loci.txt)
+    # Note that fillna is being used here to replace missing values with an empty string. This is done so that the missing string will be quantified when checking for the number of occurences of unique values from different columns, see the analysis below. However this is not necessary as a preprocessing step because when the data is read in and appended to a dataset object later, any missing values or empty strings will be handled at that step.
+    # 
+    # There are several columns that contain information about gene names and accessions. We need to know what type of information is in each in order to know which should be retained in the dataset we are preparing. We are interested in both gene names that should map to a specific accession (like cyp716A12 or Medtr3g021350) as well as gene names that are enzyme descriptions (like Ubiquitin-Specific Protease) that could map to more than one gene in a particular species. Each type of information is valuable, but needs to be differentiated so that when comparing whether two rows are specifying the same gene, this is not confused with specifying two different genes that have the same function. In the case of this dataset, we only want to considered the locus names in a single column, the rest of the columns are more ambiguous and as long as all the mapping can be done with the locus names the other names can be ignored for downstream analysis.
+    # 
+    # This section creates a set of columns that have standardized names and include data in a standardized format that other functions within the package expect. The species column contains strings which are KEGG abbreviations for particular species. The gene names column contains any strings we want to consider to be uniquely mapped to some particular gene.
 
-# Removing rows that have missing inforrmation in the columns we want to keep.
-df = df[(df["locus"] != "") & (df["allele_phenotype"] != "")]
+    filename = "../databases/sgn/sgn_tomato_phenotyped_loci.txt"
+    df = pd.read_table(filename)
+    instrumentation.rows_in += len(df)
+    df.fillna("", inplace=True)
 
 
-# In[8]:
+    # Removing rows that have missing inforrmation in the columns we want to keep.
+    df = df[(df["locus"] != "") & (df["allele_phenotype"] != "")]
 
 
-# Finding out how many unique values there are for each column.
-unique_values = {col:len(pd.unique(df[col].values)) for col in df.columns}
-for k,v in unique_values.items():
-    print("{:24}{:8}".format(k,v))
+    # Finding out how many unique values there are for each column.
+    if report is not None:
+        report.add_head("sgn_tomato_phenotyped_loci.txt", df)
+        report.add_unique_counts("Unique values in each column of sgn_tomato_phenotyped_loci.txt", df)
 
 
-# In[9]:
+    # Plotting distributions of number of word and phrases in each description.
+    if report is not None:
+        report.add_length_histograms("Lengths of phenotype descriptions", [
+            {"title":"Phenotype Descriptions", "texts":df["allele_phenotype"].values, "unit":"sentences", "bins":10, "range":(0,10)},
+            {"title":"Phenotype Descriptions", "texts":df["allele_phenotype"].values, "unit":"words", "bins":25, "range":(0,50)}])
 
 
-# Plotting distributions of number of word and phrases in each description.
-fig, (ax1, ax2) = plt.subplots(1, 2)
-ax1.set_title("Phenotype Descriptions")
-ax2.set_title("Phenotype Descriptions")
-ax1.set_xlabel("Number of phrases")
-ax2.set_xlabel("Number of words")
-x1 = [len(sent_tokenize(x)) for x in df["allele_phenotype"].values]
-x2 = [len(word_tokenize(x)) for x in df["allele_phenotype"].values]
-ax1.hist(x1, bins=10, range=(0,10), density=False, alpha=0.8, histtype='stepfilled', color="black", edgecolor='none')
-ax2.hist(x2, bins=25, range=(0,50), density=False, alpha=0.8, histtype='stepfilled', color="black", edgecolor='none')
-fig.set_size_inches(15,4)
-fig.tight_layout()
-fig.show()
-plt.close()
+    # Organizing the desired information into a standard set of column headers.
+    df = reshape(df, PHENOTYPED_LOCI_SPEC)
 
 
-# In[10]:
+    path = os.path.join(OUTPUT_DIR,"sgn_phenotype_descriptions.csv")
+    instrumentation.rows_out += len(df)
+    write_csv(df, path, SAMPLE_DIR, stratify_by=stratify_by)
 
 
-# Organizing the desired information into a standard set of column headers.
-combine_columns = lambda row, columns: concatenate_with_delim("|", [row[column] for column in columns])
-df["species_code"] = "sly"
-df["species_name"] = "tomato"
-df["text_unprocessed"] = df["allele_phenotype"]
-df["unique_gene_identifiers"] = df.apply(lambda x: combine_columns(x, ["locus", "locus_symbol"]), axis=1)
-df["other_gene_identifiers"] = df.apply(lambda x: combine_columns(x, ["locus_name", "allele_symbol", "allele_name"]), axis=1)
-df["gene_models"] = df["locus"]
-df["annotations"] = ""
-df["reference_name"] = "SGN"
-df["reference_link"] = "https://solgenomics.net/"
-df["reference_file"] = "sgn_tomato_phenotyped_loci.txt"
-df = df[reshaped_columns]
-df.head(10)
+    # Saving the profiling report if one was asked for.
+    if report is not None:
+        print("saved profiling report to {}".format(report.save()))
+    print(instrumentation.summary())
 
 
-# In[11]:
 
 
-path = os.path.join(OUTPUT_DIR,"sgn_phenotype_descriptions.csv")
-df.to_csv(path, index=False)
 
+if __name__ == "__main__":
+    main()
@@ -34,316 +34,246 @@
 # * **reference_link**: The link to the reference resource if applicable.
 # * **reference_file**: The specific name of the file from which this data comes if applicable.
 
-# In[1]:
-
-
-import matplotlib.pyplot as plt
-import matplotlib as mpl
-import seaborn as sns
 import sys
+import argparse
 import os
-import re
 import warnings
 import pandas as pd
-import numpy as np
-import itertools
-import re
-import matplotlib.pyplot as plt
-from nltk.tokenize import word_tokenize
-from nltk.tokenize import sent_tokenize
 
-sys.path.append("../utils")
-from constants import NCBI_TAG, EVIDENCE_CODES, ABBREVIATIONS_MAP
-
-sys.path.append("../../oats")
-from oats.nlp.preprocess import concatenate_with_delim, subtract_string_lists, replace_delimiter, concatenate_texts
-from oats.nlp.small import remove_punctuation, remove_enclosing_brackets, add_prefix_safely
+sys.path.append("../")
+from utils.constants import EVIDENCE_CODES
+from utils.profiling import ProfilingReport
+from utils.instrumentation import stage_instrumentation
+from utils.sampling import parse_stratify_by, DEFAULT_STRATIFY_BY
+from utils.writing import write_csv
+from utils.reshaping import reshape
 
 OUTPUT_DIR = "../reshaped/data"
-mpl.rcParams["figure.dpi"] = 200
+SAMPLE_DIR = "../reshaped/samples"
 warnings.simplefilter('ignore')
 pd.set_option('display.max_rows', 500)
 pd.set_option('display.max_columns', 500)
 pd.set_option('display.width', 1000)
 
 
-# In[2]:
-
-
-# Columns that should be in the final reshaped files.
-reshaped_columns = [
- "species_name",
- "species_code",
- "unique_gene_identifiers", 
- "other_gene_identifiers", 
- "gene_models", 
- "text_unprocessed", 
- "annotations", 
- "reference_name",
- "reference_link",
- "reference_file"]
-
-# Creating and testing a lambda for finding gene model strings.
-gene_model_pattern = re.compile("at[0-9]{1}g[0-9]+")
-is_gene_model = lambda s: bool(gene_model_pattern.match(s.lower()))
-assert is_gene_model("AT1G34534") == True
-assert is_gene_model("at2g23452") == True
-assert is_gene_model("ACAB1") == False
-
-
-# ### File with genes and phenotype descriptions (Locus_Germplasm_Phenotype_20180702.txt)
-# Reading in the dataset of phenotypic descriptions. There is only one value specified as the gene name (locus name) in the original dataset so this column does not need to be parsed further. The descriptions commmonly use semi-colons to separate phrases. The next cell gets the distribution of the number of phrases in each description field for the dataset of text descriptions, as determined by a sentence parser. The majority of the descriptions are a single sentence or phrase, but some contain more.
-
-# In[3]:
-
-
-filename = "../databases/tair/Locus_Germplasm_Phenotype_20190930.txt"
-usecols = ["LOCUS_NAME", "PHENOTYPE"]
-usenames = ["unique_gene_identifiers", "text_unprocessed"]
-renamed = {k:v for k,v in zip(usecols,usenames)}
-df = pd.read_table(filename, usecols=usecols)
-df.rename(columns=renamed, inplace=True)
-df.dropna(axis="rows",inplace=True)
-df.sample(20)
-
-
-# In[4]:
-
-
-df.shape
-
-
-# In[5]:
-
-
-# Plotting distributions of number of phrases in each description.
-fig, (ax1, ax2) = plt.subplots(1, 2)
-ax1.set_title("Phenotype Descriptions")
-ax2.set_title("Phenotype Descriptions")
-ax1.set_xlabel("Number of phrases")
-ax2.set_xlabel("Number of words")
-x1 = [len(sent_tokenize(x)) for x in df["text_unprocessed"].values]
-x2 = [len(word_tokenize(x)) for x in df["text_unprocessed"].values]
-ax1.hist(x1, bins=15, range=(0,15), density=False, alpha=0.8, histtype='stepfilled', color="black", edgecolor='none')
-ax2.hist(x2, bins=30, range=(0,200), density=False, alpha=0.8, histtype='stepfilled', color="black", edgecolor='none')
-fig.set_size_inches(15,4)
-fig.tight_layout()
-fig.show()
-plt.close()
-
-
-# In[6]:
-
-
-# Restructuring the dataset to include all expected column names.
-df["species_code"] = "ath"
-df["species_name"] = "Arabidopsis"
-df["other_gene_identifiers"] = ""
-df["gene_models"] = df["unique_gene_identifiers"].map(lambda x: "|".join([s for s in x.split("|") if is_gene_model(s)]))
-df["annotations"] = ""
-df["reference_name"] = "TAIR"
-df["reference_link"] = "https://www.arabidopsis.org/"
-df["reference_file"] = "Locus_Germplasm_Phenotype_20190930.txt"
-df = df[reshaped_columns]
-
-# Outputting the dataset of phenotype descriptions to csv file.
-path = os.path.join(OUTPUT_DIR,"tair_phenotype_descriptions.csv")
-df.to_csv(path, index=False)
-df.head(20)
-
-
-# ### File with curator summaries (Araport11_functional_descriptions_20190930.txt)
-
-# In[7]:
-
 
-filename = "../databases/tair/Araport11_functional_descriptions_20190930.txt"
-usecols = ["name", "Curator_summary"]
-usenames = ["unique_gene_identifiers", "text_unprocessed"]
-renamed = {k:v for k,v in zip(usecols,usenames)}
-df = pd.read_table(filename, usecols=usecols)
-df.rename(columns=renamed, inplace=True)
-df.dropna(axis="rows",inplace=True)
-df.sample(20)
 
+# Patterns for finding gene model strings.
+GENE_MODEL_PATTERNS = ["at[0-9]{1}g[0-9]+"]
 
-# In[8]:
-
-
-df.shape
-
-
-# In[9]:
-
-
-# Restructuring the dataset to include all expected column names.
-df["species_code"] = "ath"
-df["species_name"] = "Arabidopsis"
-df["other_gene_identifiers"] = ""
-df["gene_models"] = df["unique_gene_identifiers"].map(lambda x: "|".join([s for s in x.split("|") if is_gene_model(s)]))
-df["annotations"] = ""
-df["reference_name"] = "TAIR"
-df["reference_link"] = "https://www.arabidopsis.org/"
-df["reference_file"] = "Araport11_functional_descriptions_20190930.txt"
-df = df[reshaped_columns]
-
-# Outputting the dataset of phenotype descriptions to csv file.
-path = os.path.join(OUTPUT_DIR,"tair_general_descriptions.csv")
-df.to_csv(path, index=False)
-df.sample(20)
-
-
-# ### File with gene ontology annotations (ATH_GO_GOSLIM.txt)
-# Read in the file containing names of loci and corresponding information relating to gene ontology term annotation. Not all of the columns are used here, only a subset of them are read in. The relationship column refers to the relationships between the gene for that loci and the term mentioned on that given line. Evidence refer to the method of acquiring and the confidence in the annotation itself. This is retained so that we can subset that dataset based on whether the annotations are experimentally confirmed or simply predicted annotations. This section also looks at how many unique values are present for each field.
-# 
-# Each term annotation in this dataset is also associated with an evidence code specifying the method by which this annotation was made, which is related to the confidence that we can have in this annotation, and the tasks that the annotation should be used for. About half of the term annotations were made computationally, but there are also a high number of annotations available from high confidence annotations such as experimentally validated, curator statements, and author statements.
-
-# In[10]:
-
-
-filename = "../databases/tair/ATH_GO_GOSLIM.txt"
-df_go = pd.read_table(filename, header=None, usecols=[0,2,3,4,5,9,12])
-df_go.columns = ["locus","object","relationship","term_label","term_id","evidence_code","reference"]
-unique_values = {col:len(pd.unique(df_go[col].values)) for col in df_go.columns}
-print(df_go[["locus","object","term_id","evidence_code","reference"]].head(10))
-print(df_go.shape)
-for k,v in unique_values.items():
-    print("{:18}{:8}".format(k,v))
-
-
-# In[11]:
-
-
-code_quantities = {c:len([x for x in df_go["evidence_code"] if EVIDENCE_CODES[x] in c]) 
-             for c in list(set(EVIDENCE_CODES.values()))}
-for k,v in code_quantities.items():
-    print("{:25}{:8}".format(k,v))
-
-
-# In[12]:
-
-
-# Restructuring the dataset to include all the expected column names.
-df_go["species_code"] = "ath"
-df_go["species_name"] = "Arabidopsis"
-df_go["unique_gene_identifiers"] = df_go["locus"]
-df_go["other_gene_identifiers"] = ""
-df_go["gene_models"] = df_go["unique_gene_identifiers"].map(lambda x: "".join([s for s in x.split("|") if is_gene_model(s)]))
-df_go["text_unprocessed"] = ""
-df_go["annotations"] = df_go["term_id"]
-df_go["reference_name"] = "TAIR"
-df_go["reference_link"] = "https://www.arabidopsis.org/"
-df_go["reference_file"] = "ATH_GO_GOSLIM.txt"
-high_confidence_categories = ["experimental","author_statement","curator_statement"]
-df_go["high_confidence"] = df_go["evidence_code"].apply(lambda x: EVIDENCE_CODES[x] in high_confidence_categories)
-
-# Subset to only include the high-quality GO annotations and ouptut the dataset to a csv file.
-df_go_high_confidence = df_go[df_go["high_confidence"]==True]
-path = os.path.join(OUTPUT_DIR,"tair_curated_go_annotations.csv")
-df_go_high_confidence = df_go_high_confidence[reshaped_columns]
-df_go_high_confidence.to_csv(path, index=False)
-
-# Outputting the dataset of annotations to a csv file.
-df_go = df_go[reshaped_columns]
-path = os.path.join(OUTPUT_DIR,"tair_all_go_annotations.csv")
-df_go.to_csv(path, index=False)
-df_go.head(20)
-
-
-# ### File with plant ontology term annotations (po_[termporal/anatomy]_gene_arabidopsis_tair.assoc)
-# There are two separate files available that include annotations of PO terms. The files do not have headers so column names are added based on how the columns are described in the accompanying available readme files. One of the files contains annotations for PO terms that are spatial, or describe a specific part of plant anatomy or plant molecular structures. The other file contains annotations for PO terms that are temporal, or refer to a specific process or stage of development. These files are each read in separately, and the next cells look at the quantity of unique values in the columns of each dataset. There are more spatial annotations than temporal annotations, and a greater number of terms used to describe the spatial annotations.
-# 
-# The next field combines the two datasets of PO annotations and looks at the number of unique values for each column in the resulting dataset. Because there is no overlap in the terms between the two, the datasets are simply appended to one another and the total unique terms are a sum of the individual datasets.
-# 
-# Each term annotation in this dataset is also associated with an evidence code specifying the method by which this annotation was made, which is related to the confidence that we can have in this annotation, and the tasks that the annotation should be used for. Almost all of the PO term annotations are high confidence, they are experimentally validated, and only a few of them are derived from author statements.
-# 
-# The strings which are described in the synonyms column are included as references to each gene, and are combined with the gene name mentioned in the symbol column into a single bar delimited list.
 
-# In[13]:
+# How the reshaped columns are built from the files with text descriptions, after their locus name and text
+# columns are renamed to unique_gene_identifiers and text_unprocessed, and the name of the file is added.
+DESCRIPTIONS_SPEC = {
+    "columns":{
+        "species_code":{"value":"ath"},
+        "species_name":{"value":"Arabidopsis"},
+        "unique_gene_identifiers":{"column":"unique_gene_identifiers"},
+        "other_gene_identifiers":{"value":""},
+        "gene_models":{"gene_models":"unique_gene_identifiers", "patterns":GENE_MODEL_PATTERNS},
+        "text_unprocessed":{"column":"text_unprocessed"},
+        "annotations":{"value":""},
+        "reference_name":{"value":"TAIR"},
+        "reference_link":{"value":"https://www.arabidopsis.org/"},
+        "reference_file":{"column":"reference_file"}}}
+
+
+# How the reshaped columns are built from the columns of ATH_GO_GOSLIM.txt.
+GO_SPEC = {
+    "columns":{
+        "species_code":{"value":"ath"},
+        "species_name":{"value":"Arabidopsis"},
+        "unique_gene_identifiers":{"column":"locus"},
+        "other_gene_identifiers":{"value":""},
+        "gene_models":{"gene_models":"unique_gene_identifiers", "patterns":GENE_MODEL_PATTERNS, "joiner":""},
+        "text_unprocessed":{"value":""},
+        "annotations":{"column":"term_id"},
+        "reference_name":{"value":"TAIR"},
+        "reference_link":{"value":"https://www.arabidopsis.org/"},
+        "reference_file":{"value":"ATH_GO_GOSLIM.txt"}}}
+
+
+# How the reshaped columns are built from the columns of the two files of PO annotations. The strings in the
+# synonyms column are kept as other identifiers, leaving out any that are already unique identifiers.
+PO_SPEC = {
+    "columns":{
+        "species_code":{"value":"ath"},
+        "species_name":{"value":"Arabidopsis"},
+        "unique_gene_identifiers":{"join":["symbol", "name"]},
+        "other_gene_identifiers":{"column":"synonyms", "subtract":"unique_gene_identifiers"},
+        "gene_models":{"gene_models":"unique_gene_identifiers", "patterns":GENE_MODEL_PATTERNS},
+        "text_unprocessed":{"value":""},
+        "annotations":{"column":"term_id"},
+        "reference_name":{"value":"TAIR"},
+        "reference_link":{"value":"https://www.arabidopsis.org/"},
+        "reference_file":{"column":"reference_file"}}}
+
+
+
+
+# Reads the files from TAIR and saves the reshaped files in OUTPUT_DIR. This runs the whole stage, and is what
+# both the notebook and the pipeline call.
+def main(argv=None):
+
+    # Settings that can be changed on the command line, or by giving main() the list of arguments.
+    # Without --profile none of the exploratory statistics or plots are made, only the reshaped files.
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--profile", action="store_true", help="also save a report of statistics and plots about the files read")
+    parser.add_argument("--profile-dir", default="../profiling", help="directory for the profiling report")
+    parser.add_argument("--sample-stratify-by", default=DEFAULT_STRATIFY_BY, help="comma-separated columns to stratify the samples by, or none for the first rows")
+    args, _ = parser.parse_known_args(argv)
+    stratify_by = parse_stratify_by(args.sample_stratify_by)
+    report = ProfilingReport("tair", args.profile_dir) if args.profile else None
+    instrumentation = stage_instrumentation("reshaping_tair_data")
+
+
+    # ### File with genes and phenotype descriptions (Locus_Germplasm_Phenotype_20180702.txt)
+    # Reading in the dataset of phenotypic descriptions. There is only one value specified as the gene name (locus name) in the original dataset so this column does not need to be parsed further. The descriptions commmonly use semi-colons to separate phrases. The next cell gets the distribution of the number of phrases in each description field for the dataset of text descriptions, as determined by a sentence parser. The majority of the descriptions are a single sentence or phrase, but some contain more.
+
+    filename = "../databases/tair/Locus_Germplasm_Phenotype_20190930.txt"
+    usecols = ["LOCUS_NAME", "PHENOTYPE"]
+    usenames = ["unique_gene_identifiers", "text_unprocessed"]
+    renamed = {k:v for k,v in zip(usecols,usenames)}
+    df = pd.read_table(filename, usecols=usecols)
+    instrumentation.rows_in += len(df)
+    df.rename(columns=renamed, inplace=True)
+    df.dropna(axis="rows",inplace=True)
+
+
+    # Plotting distributions of number of phrases in each description.
+    if report is not None:
+        report.add_head("Locus_Germplasm_Phenotype_20190930.txt", df)
+        report.add_length_histograms("Lengths of phenotype descriptions", [
+            {"title":"Phenotype Descriptions", "texts":df["text_unprocessed"].values, "unit":"sentences", "bins":15, "range":(0,15)},
+            {"title":"Phenotype Descriptions", "texts":df["text_unprocessed"].values, "unit":"words", "bins":30, "range":(0,200)}])
+
+
+    # Restructuring the dataset to include all expected column names.
+    df["reference_file"] = "Locus_Germplasm_Phenotype_20190930.txt"
+    df = reshape(df, DESCRIPTIONS_SPEC)
+
+    # Outputting the dataset of phenotype descriptions to csv file.
+    path = os.path.join(OUTPUT_DIR,"tair_phenotype_descriptions.csv")
+    instrumentation.rows_out += len(df)
+    write_csv(df, path, SAMPLE_DIR, stratify_by=stratify_by)
+
+
+    # ### File with curator summaries (Araport11_functional_descriptions_20190930.txt)
+
+    filename = "../databases/tair/Araport11_functional_descriptions_20190930.txt"
+    usecols = ["name", "Curator_summary"]
+    usenames = ["unique_gene_identifiers", "text_unprocessed"]
+    renamed = {k:v for k,v in zip(usecols,usenames)}
+    df = pd.read_table(filename, usecols=usecols)
+    instrumentation.rows_in += len(df)
+    df.rename(columns=renamed, inplace=True)
+    df.dropna(axis="rows",inplace=True)
+
+
+    # Restructuring the dataset to include all expected column names.
+    df["reference_file"] = "Araport11_functional_descriptions_20190930.txt"
+    df = reshape(df, DESCRIPTIONS_SPEC)
+
+    # Outputting the dataset of phenotype descriptions to csv file.
+    path = os.path.join(OUTPUT_DIR,"tair_general_descriptions.csv")
+    instrumentation.rows_out += len(df)
+    write_csv(df, path, SAMPLE_DIR, stratify_by=stratify_by)
 
 
-# Reading in the dataset of spatial PO term annotations.
-filename = "../databases/tair/po_anatomy_gene_arabidopsis_tair.assoc"
-df_po_spatial = pd.read_table(filename, header=None, skiprows=0, usecols=[2,4,5,6,9,10,11])
-df_po_spatial.columns = ["symbol","term_id","references","evidence_code","name","synonyms","type"]
-unique_values = {col:len(pd.unique(df_po_spatial[col].values)) for col in df_po_spatial.columns}
-print(df_po_spatial.shape)
-for k,v in unique_values.items():
-    print("{:18}{:8}".format(k,v))
+    # ### File with gene ontology annotations (ATH_GO_GOSLIM.txt)
+    # Read in the file containing names of loci and corresponding information relating to gene ontology term annotation. Not all of the columns are used here, only a subset of them are read in. The relationship column refers to the relationships between the gene for that loci and the term mentioned on that given line. Evidence refer to the method of acquiring and the confidence in the annotation itself. This is retained so that we can subset that dataset based on whether the annotations are experimentally confirmed or simply predicted annotations. This section also looks at how many unique values are present for each field.
+    # 
+    # Each term annotation in this dataset is also associated with an evidence code specifying the method by which this annotation was made, which is related to the confidence that we can have in this annotation, and the tasks that the annotation should be used for. About half of the term annotations were made computationally, but there are also a high number of annotations available from high confidence annotations such as experimentally validated, curator statements, and author statements.
 
+    filename = "../databases/tair/ATH_GO_GOSLIM.txt"
+    df_go = pd.read_table(filename, header=None, usecols=[0,2,3,4,5,9,12])
+    instrumentation.rows_in += len(df_go)
+    df_go.columns = ["locus","object","relationship","term_label","term_id","evidence_code","reference"]
+    if report is not None:
+        report.add_head("ATH_GO_GOSLIM.txt", df_go, ["locus","object","term_id","evidence_code","reference"])
+        report.add_unique_counts("Unique values in each column of ATH_GO_GOSLIM.txt", df_go, width=18)
+        report.add_category_counts("Evidence codes in ATH_GO_GOSLIM.txt", df_go["evidence_code"].values, EVIDENCE_CODES)
 
-# In[14]:
 
+    # Restructuring the dataset to include all the expected column names.
+    high_confidence_categories = ["experimental","author_statement","curator_statement"]
+    high_confidence = df_go["evidence_code"].map(lambda x: EVIDENCE_CODES[x] in high_confidence_categories).values
+    df_go = reshape(df_go, GO_SPEC)
 
-# Reading in the dataset of temporal PO term annotations.
-filename = "../databases/tair/po_temporal_gene_arabidopsis_tair.assoc"
-df_po_temporal = pd.read_table(filename, header=None, skiprows=0, usecols=[2,4,5,6,9,10,11])
-df_po_temporal.columns = ["symbol","term_id","references","evidence_code","name","synonyms","type"]
-unique_values = {col:len(pd.unique(df_po_temporal[col].values)) for col in df_po_temporal.columns}
-print(df_po_temporal.shape)
-for k,v in unique_values.items():
-    print("{:18}{:8}".format(k,v))
+    # Subset to only include the high-quality GO annotations and ouptut the dataset to a csv file.
+    df_go_high_confidence = df_go[high_confidence]
+    path = os.path.join(OUTPUT_DIR,"tair_curated_go_annotations.csv")
+    instrumentation.rows_out += len(df_go_high_confidence)
+    write_csv(df_go_high_confidence, path, SAMPLE_DIR, stratify_by=stratify_by)
 
+    # Outputting the dataset of annotations to a csv file.
+    path = os.path.join(OUTPUT_DIR,"tair_all_go_annotations.csv")
+    instrumentation.rows_out += len(df_go)
+    write_csv(df_go, path, SAMPLE_DIR, stratify_by=stratify_by)
 
-# In[15]:
 
+    # ### File with plant ontology term annotations (po_[termporal/anatomy]_gene_arabidopsis_tair.assoc)
+    # There are two separate files available that include annotations of PO terms. The files do not have headers so column names are added based on how the columns are described in the accompanying available readme files. One of the files contains annotations for PO terms that are spatial, or describe a specific part of plant anatomy or plant molecular structures. The other file contains annotations for PO terms that are temporal, or refer to a specific process or stage of development. These files are each read in separately, and the next cells look at the quantity of unique values in the columns of each dataset. There are more spatial annotations than temporal annotations, and a greater number of terms used to describe the spatial annotations.
+    # 
+    # The next field combines the two datasets of PO annotations and looks at the number of unique values for each column in the resulting dataset. Because there is no overlap in the terms between the two, the datasets are simply appended to one another and the total unique terms are a sum of the individual datasets.
+    # 
+    # Each term annotation in this dataset is also associated with an evidence code specifying the method by which this annotation was made, which is related to the confidence that we can have in this annotation, and the tasks that the annotation should be used for. Almost all of the PO term annotations are high confidence, they are experimentally validated, and only a few of them are derived from author statements.
+    # 
+    # The strings which are described in the synonyms column are included as references to each gene, and are combined with the gene name mentioned in the symbol column into a single bar delimited list.
 
-# Looking at how many unique values each column has.
-df_po_spatial["reference_file"] = "po_anatomy_gene_arabidopsis_tair.assoc"
-df_po_temporal["reference_file"] = "po_termporal_gene_arabidopsis_tair.assoc"
+    # Reading in the dataset of spatial PO term annotations.
+    filename = "../databases/tair/po_anatomy_gene_arabidopsis_tair.assoc"
+    df_po_spatial = pd.read_table(filename, header=None, skiprows=0, usecols=[2,4,5,6,9,10,11])
+    instrumentation.rows_in += len(df_po_spatial)
+    df_po_spatial.columns = ["symbol","term_id","references","evidence_code","name","synonyms","type"]
+    if report is not None:
+        report.add_unique_counts("Unique values in each column of po_anatomy_gene_arabidopsis_tair.assoc", df_po_spatial, width=18)
 
-df_po = df_po_spatial.append(df_po_temporal, ignore_index=True)
-unique_values = {col:len(pd.unique(df_po[col].values)) for col in df_po.columns}
-print(df_po[["symbol","synonyms","evidence_code"]].head(10))
-print(df_po.shape)
-for k,v in unique_values.items():
-    print("{:18}{:8}".format(k,v))
 
+    # Reading in the dataset of temporal PO term annotations.
+    filename = "../databases/tair/po_temporal_gene_arabidopsis_tair.assoc"
+    df_po_temporal = pd.read_table(filename, header=None, skiprows=0, usecols=[2,4,5,6,9,10,11])
+    instrumentation.rows_in += len(df_po_temporal)
+    df_po_temporal.columns = ["symbol","term_id","references","evidence_code","name","synonyms","type"]
+    if report is not None:
+        report.add_unique_counts("Unique values in each column of po_temporal_gene_arabidopsis_tair.assoc", df_po_temporal, width=18)
 
-# In[16]:
 
+    # Looking at how many unique values each column has.
+    df_po_spatial["reference_file"] = "po_anatomy_gene_arabidopsis_tair.assoc"
+    df_po_temporal["reference_file"] = "po_termporal_gene_arabidopsis_tair.assoc"
 
-# Quantifying the number of annotations of each type.
-code_quantities = {c:len([x for x in df_po["evidence_code"] if EVIDENCE_CODES[x] in c]) 
-             for c in list(set(EVIDENCE_CODES.values()))}
-for k,v in code_quantities.items():
-    print("{:25}{:8}".format(k,v))
+    df_po = df_po_spatial.append(df_po_temporal, ignore_index=True)
+    if report is not None:
+        report.add_head("Combined PO annotations", df_po, ["symbol","synonyms","evidence_code"])
+        report.add_unique_counts("Unique values in each column of the combined PO annotations", df_po, width=18)
 
 
-# In[17]:
+    # Quantifying the number of annotations of each type.
+    if report is not None:
+        report.add_category_counts("Evidence codes in the combined PO annotations", df_po["evidence_code"].values, EVIDENCE_CODES)
 
 
-df_po['name'] = df_po['name'].astype(str)
-df_po.dtypes
+    df_po['name'] = df_po['name'].astype(str)
 
 
-# In[18]:
+    # Restructuring the dataset to include all the expected column names.
+    df_po = reshape(df_po, PO_SPEC)
 
+    # Outputting the dataset of annotations to a csv file.
+    path = os.path.join(OUTPUT_DIR,"tair_curated_po_annotations.csv")
+    instrumentation.rows_out += len(df_po)
+    write_csv(df_po, path, SAMPLE_DIR, stratify_by=stratify_by)
 
-# Restructuring the dataset to include all the expected column names.
-combine_columns = lambda row, columns: concatenate_with_delim("|", [row[column] for column in columns])
-df_po["species_code"] = "ath"
-df_po["species_name"] = "Arabidopsis"
-df_po["unique_gene_identifiers"] = df_po.apply(lambda x: combine_columns(x, ["symbol", "name"]), axis=1)
-df_po["other_gene_identifiers"] = df_po["synonyms"]
-df_po["gene_model_strings_1"] =  df_po["unique_gene_identifiers"].map(lambda x: "|".join([s for s in x.split("|") if is_gene_model(s)]))
-df_po["gene_model_strings_2"] =  df_po["unique_gene_identifiers"].map(lambda x: "|".join([s for s in x.split("|") if is_gene_model(s)]))
-df_po["gene_models"] = df_po.apply(lambda x: combine_columns(x, ["gene_model_strings_1", "gene_model_strings_2"]), axis=1)
-df_po["text_unprocessed"] = ""
-df_po["annotations"] = df_po["term_id"]
-df_po["reference_name"] = "TAIR"
-df_po["reference_link"] = "https://www.arabidopsis.org/"
-df_po["other_gene_identifiers"] = df_po.apply(lambda row: subtract_string_lists("|", row["other_gene_identifiers"],row["unique_gene_identifiers"]), axis=1)
-df_po = df_po[reshaped_columns]
 
-# Outputting the dataset of annotations to a csv file.
-path = os.path.join(OUTPUT_DIR,"tair_curated_po_annotations.csv")
-df_po.to_csv(path, index=False)
-df_po.head(30)
+    # Saving the profiling report if one was asked for.
+    if report is not None:
+        print("saved profiling report to {}".format(report.save()))
+    print(instrumentation.summary())
 
 
-# In[19]:
 
 
-df_po.tail(10)
 
+if __name__ == "__main__":
+    main()
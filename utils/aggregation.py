@@ -0,0 +1,71 @@
+import numpy as np
+import pandas as pd
+
+
+
+
+# Functions for combining the gene identifier columns across all the rows that were merged into one gene.
+# Instead of joining the pipe-delimited strings for each gene and then splitting them apart again to clean them
+# up, each column is exploded once into a table of (gene ID, identifier, position) where the position is the
+# order that the identifier appears in going down the rows and then along each string. Removing duplicates,
+# removing identifiers from other names that are already unique names, and moving gene models to the end of
+# the unique names are then all done on those tables for every gene at once.
+
+
+
+
+# Returns a table with one row for each identifier in the column with columns "_gene_id", "identifier", and
+# "position", sorted by gene and then position, with empty strings and repeats within a gene removed.
+def explode_identifiers(gene_ids, values, delim="|"):
+    values = pd.Series(np.asarray(values, dtype=object))
+    gene_ids = np.asarray(gene_ids)
+    present = values.notnull().values
+    names = values[present].str.split(delim)
+    lengths = names.str.len().values.astype(np.int64)
+    exploded = pd.DataFrame({
+        "_gene_id": np.repeat(gene_ids[present], lengths),
+        "identifier": names.explode().str.strip().values})
+    exploded["position"] = np.arange(len(exploded))
+    exploded = exploded[exploded["identifier"] != ""]
+    exploded = exploded.sort_values(by=["_gene_id","position"], kind="stable")
+    exploded = exploded.drop_duplicates(subset=["_gene_id","identifier"], keep="first")
+    return(exploded)
+
+
+# This is only called by aggregate_identifiers().
+# Returns a boolean array of which rows in the first table have a (gene ID, identifier) pair that's in the second.
+def _contains(table, other_table):
+    keys = pd.MultiIndex.from_arrays([table["_gene_id"].values, table["identifier"].values])
+    other_keys = pd.MultiIndex.from_arrays([other_table["_gene_id"].values, other_table["identifier"].values])
+    return(keys.isin(other_keys))
+
+
+# This is only called by aggregate_identifiers().
+# Joins the identifiers for each gene back into a delimited string, with an empty string for any genes without any.
+def _join(table, genes, delim="|"):
+    joined = table.groupby("_gene_id", sort=False)["identifier"].agg(delim.join)
+    return(joined.reindex(genes, fill_value=""))
+
+
+# Returns a dataframe indexed by gene ID with the unique gene identifiers, other gene identifiers, and gene models
+# columns combined over every row for that gene. The identifiers in each column keep the order they first appear
+# in going down the rows. Other identifiers that are also unique identifiers are dropped, and gene models are moved
+# to the end of the unique identifiers, including any gene models that weren't listed as unique identifiers.
+def aggregate_identifiers(gene_ids, unique_identifiers, other_identifiers, gene_models, delim="|"):
+    genes = pd.unique(np.asarray(gene_ids))
+    genes.sort()
+    unique = explode_identifiers(gene_ids, unique_identifiers, delim)
+    other = explode_identifiers(gene_ids, other_identifiers, delim)
+    models = explode_identifiers(gene_ids, gene_models, delim)
+
+    other = other[~_contains(other, unique)]
+    unique = unique[~_contains(unique, models)]
+    reordered = pd.concat([unique.assign(section=0), models.assign(section=1)], ignore_index=True)
+    reordered = reordered.sort_values(by=["_gene_id","section","position"], kind="stable")
+
+    agg_df = pd.DataFrame({
+        "unique_gene_identifiers": _join(reordered, genes, delim),
+        "other_gene_identifiers": _join(other, genes, delim),
+        "gene_models": _join(models, genes, delim)})
+    agg_df.index.name = "_gene_id"
+    return(agg_df)
@@ -0,0 +1,256 @@
+import os
+import re
+import glob
+import pickle
+import hashlib
+import shutil
+import tempfile
+from itertools import chain
+from concurrent.futures import ProcessPoolExecutor
+from gensim.parsing.preprocessing import stem_text
+
+
+
+
+# Functions for running NOBLE Coder over the text descriptions for several ontologies at once.
+# Each call to NOBLE Coder starts a JVM and writes the texts and results to files, so the distinct texts are
+# split into batches and each (ontology, batch) pair is sent to a pool of processes. Each of those processes
+# runs NOBLE Coder from inside its own temporary directory so that the files from calls that are running at
+# the same time don't overwrite each other. Results are cached by text, ontology, and the precise flag, and by
+# the version of NOBLE Coder and of the terminology it uses for the ontology, so only texts that are new or that
+# changed since the last run, or all of them after NOBLE Coder or an ontology is updated, are sent to NOBLE Coder.
+
+
+
+
+# Change this whenever the functions below change what they return for a given text, so that results cached by a
+# previous version aren't used.
+ANNOTATOR_VERSION = "1"
+
+
+# Where NOBLE Coder keeps the terminologies that it builds from the ontologies, one directory for each of them.
+NOBLE_TERMINOLOGY_DIR = os.path.join(os.path.expanduser("~"), ".noble", "terminologies")
+
+
+
+
+# Returns a string that changes whenever the NOBLE Coder jar or its terminology for the ontology changes, from the
+# hash of the jar and the sizes and modification times of the terminology files, which can be large.
+def noble_coder_version(jar_path, ontology, terminology_dir=NOBLE_TERMINOLOGY_DIR):
+    digest = hashlib.sha1()
+    with open(jar_path, "rb") as f:
+        for block in iter(lambda: f.read(1<<20), b""):
+            digest.update(block)
+    jar_hash = digest.hexdigest()
+    digest = hashlib.sha1()
+    for path in sorted(glob.glob(os.path.join(terminology_dir, "{}.term*".format(ontology)))):
+        paths = [path] if os.path.isfile(path) else sorted(os.path.join(d, name) for d,_,names in os.walk(path) for name in names)
+        for file_path in paths:
+            stat = os.stat(file_path)
+            digest.update("{}\t{}\t{}\n".format(os.path.relpath(file_path, terminology_dir), stat.st_size, stat.st_mtime_ns).encode("utf-8"))
+    return("{}|jar={}|terminology={}".format(ANNOTATOR_VERSION, jar_hash, digest.hexdigest()))
+
+
+
+
+# Results from previous runs of NOBLE Coder that are saved between runs. The version that was last looked up or
+# stored for each ontology is taken as its current version, and results for any other version of that ontology are
+# dropped when the cache is saved, so the file doesn't keep every version from before NOBLE Coder or the ontology
+# was updated. Results for ontologies that weren't used since the cache was loaded are kept as they are.
+class NobleCoderCache:
+
+    def __init__(self, entries=None):
+        self.entries = {} if entries is None else entries
+        self.versions = {}
+
+
+    @classmethod
+    def load(cls, path):
+        if not os.path.exists(path):
+            return(cls())
+        with open(path, "rb") as f:
+            entries = pickle.load(f)
+        return(cls(entries))
+
+
+    def save(self, path):
+        self.entries = {key:terms for key,terms in self.entries.items() if self.versions.get(key[1], key[3]) == key[3]}
+        with open(path, "wb") as f:
+            pickle.dump(self.entries, f, protocol=pickle.HIGHEST_PROTOCOL)
+
+
+    # The version is the one from noble_coder_version() for the ontology.
+    @staticmethod
+    def key(text, ontology, precise, version):
+        return((hashlib.sha1(text.encode("utf-8")).hexdigest(), ontology, precise, version))
+
+
+    def get(self, text, ontology, precise, version):
+        self.versions[ontology] = version
+        return(self.entries.get(self.key(text, ontology, precise, version)))
+
+
+    def put(self, text, ontology, precise, version, terms):
+        self.versions[ontology] = version
+        self.entries[self.key(text, ontology, precise, version)] = terms
+
+
+
+
+# This is only called by annotate_texts(), and runs in one of the worker processes.
+# Returns the list of terms found for each text in the batch, in the same order as the texts. The oats package is
+# only imported here, so that the dictionary annotator below can be used without it.
+def _annotate_batch(texts, jar_path, ontology, precise):
+    from oats.annotation.annotation import annotate_using_noble_coder
+    working_directory = os.getcwd()
+    temporary_directory = tempfile.mkdtemp(prefix="noble_coder_{}_".format(ontology))
+    try:
+        os.chdir(temporary_directory)
+        annotations = annotate_using_noble_coder(dict(enumerate(texts)), jar_path, ontology, precise=precise)
+    finally:
+        os.chdir(working_directory)
+        shutil.rmtree(temporary_directory, ignore_errors=True)
+    return([list(annotations.get(i, [])) for i in range(len(texts))])
+
+
+
+
+# Returns a dictionary mapping each ontology name to a dictionary of {index: [term IDs]} for every index in
+# index_to_text, which is the same shape that annotate_using_noble_coder() returns for a single ontology.
+# At most workers NOBLE Coder processes run at once, and each of them is given at most batch_size texts.
+def annotate_texts(index_to_text, jar_path, ontologies, precise=1, workers=3, batch_size=5000, cache=None):
+    jar_path = os.path.abspath(jar_path)
+    distinct_texts = list(dict.fromkeys(index_to_text.values()))
+    results = {ontology:{} for ontology in ontologies}
+    tasks = []
+    versions = {ontology:noble_coder_version(jar_path, ontology) for ontology in ontologies} if cache is not None else {}
+    for ontology in ontologies:
+        remaining = distinct_texts
+        if cache is not None:
+            for text in distinct_texts:
+                terms = cache.get(text, ontology, precise, versions[ontology])
+                if terms is not None:
+                    results[ontology][text] = terms
+            remaining = [text for text in distinct_texts if text not in results[ontology]]
+        for start in range(0, len(remaining), batch_size):
+            tasks.append((ontology, remaining[start:start+batch_size]))
+
+    if len(tasks) > 0:
+        with ProcessPoolExecutor(max_workers=max(1,workers)) as executor:
+            futures = [executor.submit(_annotate_batch, texts, jar_path, ontology, precise) for ontology,texts in tasks]
+            for (ontology,texts),future in zip(tasks, futures):
+                for text,terms in zip(texts, future.result()):
+                    results[ontology][text] = terms
+                    if cache is not None:
+                        cache.put(text, ontology, precise, versions[ontology], terms)
+
+    annotations = {ontology:{index:list(results[ontology][text]) for index,text in index_to_text.items()} for ontology in ontologies}
+    return(annotations)
+
+
+
+
+# Reads the terms from an ontology file in the OBO format, skipping any that are obsolete.
+# Yields the ID of each term with the list of its label and synonyms whose scope is in synonym_scopes.
+def read_obo_terms(path, synonym_scopes=("EXACT","NARROW","BROAD","RELATED")):
+    synonym_pattern = re.compile(r'^synonym:\s*"((?:[^"\\]|\\.)*)"\s*(\w+)')
+    term_id, names, obsolete, in_term = None, [], False, False
+    with open(path) as f:
+        for line in chain(f, ["[End]"]):
+            line = line.strip()
+            if line.startswith("["):
+                if in_term and term_id is not None and not obsolete:
+                    yield(term_id, names)
+                term_id, names, obsolete, in_term = None, [], False, line == "[Term]"
+            elif in_term and line.startswith("id:"):
+                term_id = line[len("id:"):].strip()
+            elif in_term and line.startswith("name:"):
+                names.append(line[len("name:"):].strip())
+            elif in_term and line.startswith("synonym:"):
+                match = synonym_pattern.match(line)
+                if match and match.group(2) in synonym_scopes:
+                    names.append(match.group(1).replace('\\"','"'))
+            elif in_term and line == "is_obsolete: true":
+                obsolete = True
+
+
+
+
+# An alternative to NOBLE Coder that runs in this process, by looking up the labels and synonyms of the terms.
+# The labels and synonyms from all the ontologies are split into word tokens and compiled into one trie over
+# those tokens, so each text is matched against every term in every ontology in a single pass over its words.
+# For each ontology, the longest match starting at a word is kept and matching continues after the end of it,
+# the same way that NOBLE Coder looks at each ontology separately. Tokens are lowercased and optionally stemmed
+# so that plurals and other inflections still match. The obo_paths argument maps ontology names like "pato"
+# to the OBO files for them, and only terms with IDs that start with that ontology's prefix are used, so that
+# terms imported from other ontologies are only found in the ontology they come from.
+class DictionaryAnnotator:
+
+    def __init__(self, obo_paths, stem=True, synonym_scopes=("EXACT","NARROW","BROAD","RELATED")):
+        self.stem = stem
+        self.ontologies = list(obo_paths.keys())
+        self._stems = {}
+        self._trie = {}
+        for ontology,path in obo_paths.items():
+            prefix = "{}:".format(ontology.upper())
+            for term_id,names in read_obo_terms(path, synonym_scopes):
+                if not term_id.startswith(prefix):
+                    continue
+                for name in names:
+                    self._add(self._tokenize(name), ontology, term_id)
+
+
+    def _tokenize(self, text):
+        tokens = re.findall(r"[a-z0-9]+", text.lower())
+        if self.stem:
+            for token in tokens:
+                if token not in self._stems:
+                    self._stems[token] = stem_text(token)
+            tokens = [self._stems[token] for token in tokens]
+        return(tokens)
+
+
+    def _add(self, tokens, ontology, term_id):
+        if len(tokens) == 0:
+            return
+        node = self._trie
+        for token in tokens:
+            node = node.setdefault(token, {})
+        node.setdefault(None, {}).setdefault(ontology, [])
+        if term_id not in node[None][ontology]:
+            node[None][ontology].append(term_id)
+
+
+    # Returns a dictionary mapping each ontology name to the list of term IDs found in the text, in the order
+    # they're found and without duplicates.
+    def annotate_text(self, text):
+        tokens = self._tokenize(text)
+        longest = {ontology:{} for ontology in self.ontologies}
+        for start in range(len(tokens)):
+            node = self._trie
+            for end in range(start, len(tokens)):
+                node = node.get(tokens[end])
+                if node is None:
+                    break
+                for ontology,term_ids in node.get(None, {}).items():
+                    longest[ontology][start] = (end+1, term_ids)
+        terms = {}
+        for ontology in self.ontologies:
+            found = []
+            position = 0
+            for start in sorted(longest[ontology]):
+                if start < position:
+                    continue
+                end, term_ids = longest[ontology][start]
+                found.extend(term_id for term_id in term_ids if term_id not in found)
+                position = end
+            terms[ontology] = found
+        return(terms)
+
+
+    # Returns the same shape as annotate_texts(), a dictionary mapping each ontology name to {index: [term IDs]}.
+    def annotate(self, index_to_text, ontologies=None):
+        ontologies = self.ontologies if ontologies is None else ontologies
+        results = {text:self.annotate_text(text) for text in set(index_to_text.values())}
+        annotations = {ontology:{index:list(results[text][ontology]) for index,text in index_to_text.items()} for ontology in ontologies}
+        return(annotations)
@@ -0,0 +1,86 @@
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+
+
+
+# Functions for saving the combined dataset as a Parquet file, and for reading back only parts of it.
+# The pipe-delimited identifier and annotation columns are stored as lists of strings so that nothing reading
+# the file has to split them again, and the columns that only have a few distinct values like the species and
+# the references are dictionary encoded. The rows are sorted by species before they're written, so that each
+# row group only covers one or a few species, and the statistics for each row group let readers that filter by
+# species skip the row groups that don't have that species without reading them.
+
+
+
+
+# The columns that hold pipe-delimited lists.
+LIST_COLUMNS = [
+    "unique_gene_identifiers",
+    "other_gene_identifiers",
+    "gene_models",
+    "annotations",
+    "annotations_nc"]
+
+
+# The columns that have few distinct values and are dictionary encoded.
+DICTIONARY_COLUMNS = [
+    "species_name",
+    "species_code",
+    "reference_name",
+    "reference_link",
+    "reference_file"]
+
+
+
+
+# Splits a pipe-delimited string into a list without empty strings, and missing values become empty lists.
+def split_on_bar_without_empty_strings(text):
+    if not isinstance(text, str):
+        return([])
+    return([y.strip() for y in text.split("|") if y.strip() != ""])
+
+
+
+
+# Returns an Arrow table for the dataframe, with list columns and dictionary encoded columns converted.
+# If positions are given, the table only has those rows in that order, and each column is taken by position as
+# it's converted so that a reordered copy of the whole dataframe is never made.
+def to_arrow_table(df, positions=None):
+    arrays = []
+    for column in df.columns:
+        values = df[column].values
+        if positions is not None:
+            values = values.take(positions)
+        if column in LIST_COLUMNS:
+            array = pa.array([split_on_bar_without_empty_strings(x) for x in values], type=pa.list_(pa.string()))
+        elif column in DICTIONARY_COLUMNS:
+            array = pa.array(np.asarray(values, dtype=object), type=pa.string(), from_pandas=True).dictionary_encode()
+        elif column == "_gene_id":
+            array = pa.array(values, type=pa.int64())
+        else:
+            array = pa.array(values, type=pa.string(), from_pandas=True)
+        arrays.append(array)
+    return(pa.Table.from_arrays(arrays, names=list(df.columns)))
+
+
+# Saves the dataframe as a Parquet file, sorted by species and then gene ID. The order comes from a stable
+# lexsort of the species codes and gene IDs rather than from sorting the dataframe itself.
+def write_parquet(df, path, row_group_size=50000):
+    species_codes = pd.factorize(df["species_code"], sort=True)[0]
+    positions = np.lexsort((df["_gene_id"].values, species_codes))
+    table = to_arrow_table(df, positions)
+    dictionary_columns = [column for column in DICTIONARY_COLUMNS if column in df.columns]
+    pq.write_table(table, path, row_group_size=row_group_size, use_dictionary=dictionary_columns, compression="snappy")
+
+
+# Reads only the given columns from the Parquet file, and only the row groups for the given species if any are
+# given. Returns a dataframe where the list columns hold lists of strings.
+def read_parquet(path, columns=None, species_codes=None):
+    filters = None
+    if species_codes is not None:
+        filters = [("species_code", "in", list(species_codes))]
+    table = pq.read_table(path, columns=columns, filters=filters)
+    return(table.to_pandas())
@@ -0,0 +1,144 @@
+import io
+import os
+import gzip
+import queue
+import threading
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+
+
+
+# Functions for writing the output files compressed as they're written, and for reading them back.
+# Instead of writing each file and then compressing it afterwards, which reads and writes every file twice,
+# the text is compressed as it's written. Each compressed file is written by its own background thread, so
+# when several files are being written at once, like the csv and tsv files from the combining step, they're
+# compressed at the same time. Both zlib and zstandard let other threads run while they're compressing.
+# Readers can be given the path to either the compressed or uncompressed version of a file.
+
+
+
+
+# The file extension added for each kind of compression.
+SUFFIXES = {"gzip":".gz", "zstd":".zst"}
+
+
+
+
+# Returns the path that a file is written to with the given compression, or the same path for no compression.
+def compressed_path(path, compression=None):
+    if compression is None or compression == "none":
+        return(path)
+    if compression not in SUFFIXES:
+        raise ValueError("unknown compression {}, should be one of none, {}".format(compression, ", ".join(SUFFIXES)))
+    return("{}{}".format(path, SUFFIXES[compression]))
+
+
+# Returns the path to use for reading a file, which is whichever of the path itself and the paths to compressed
+# versions of it was written most recently, or the path itself if none of them exist. Writing a file removes the
+# other versions of it, so there's normally only one, but the newest is used in case older ones were left behind.
+def resolve_input(path):
+    candidates = [path]+["{}{}".format(path, suffix) for suffix in SUFFIXES.values()]
+    existing = [candidate for candidate in candidates if os.path.exists(candidate)]
+    if len(existing) == 0:
+        return(path)
+    return(max(existing, key=lambda candidate: os.stat(candidate).st_mtime_ns))
+
+
+# This is only called by open_output().
+# Removes the versions of the file with other compressions than the one about to be written, so that readers
+# can't pick up one of them from an earlier run.
+def _remove_other_versions(path, compression):
+    written = compressed_path(path, compression)
+    for candidate in [path]+["{}{}".format(path, suffix) for suffix in SUFFIXES.values()]:
+        if candidate != written and os.path.exists(candidate):
+            os.remove(candidate)
+
+
+
+
+# A text file that passes what's written to it to a background thread, which encodes and compresses it.
+# At most max_pending strings are held waiting to be written, so a slow disk slows down the writer instead of
+# letting everything build up in memory. Any error from the background thread is raised on the next write.
+class BackgroundWriter:
+
+    def __init__(self, raw, max_pending=64):
+        self._raw = raw
+        self._queue = queue.Queue(maxsize=max_pending)
+        self._error = None
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+
+    def __enter__(self):
+        return(self)
+
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+    def _run(self):
+        while True:
+            text = self._queue.get()
+            if text is None:
+                break
+            if self._error is None:
+                try:
+                    self._raw.write(text)
+                except Exception as error:
+                    self._error = error
+
+
+    def write(self, text):
+        if self._error is not None:
+            raise self._error
+        self._queue.put(text)
+        return(len(text))
+
+
+    def close(self):
+        if self._thread is None:
+            return
+        self._queue.put(None)
+        self._thread.join()
+        self._thread = None
+        self._raw.close()
+        if self._error is not None:
+            raise self._error
+
+
+
+
+# Opens a text file for writing at the path given by compressed_path(), compressing it as it's written if a
+# compression is given. The level is passed on to gzip or zstandard, and their defaults are used if it's None.
+def open_output(path, compression=None, level=None):
+    if compression == "zstd" and zstandard is None:
+        raise ImportError("zstd compression needs the zstandard package to be installed")
+    _remove_other_versions(path, compression)
+    path = compressed_path(path, compression)
+    if compression is None or compression == "none":
+        return(open(path, "w", newline=""))
+    if compression == "gzip":
+        binary = gzip.open(path, "wb", compresslevel=(6 if level is None else level))
+    else:
+        compressor = zstandard.ZstdCompressor(level=(3 if level is None else level))
+        binary = compressor.stream_writer(open(path, "wb"))
+    return(BackgroundWriter(io.TextIOWrapper(binary, encoding="utf-8", newline="")))
+
+
+# Opens a text file for reading, decompressing it if it's a compressed file, going by the file extension.
+# The path can also be the path to the uncompressed file when only the compressed version exists.
+def open_input(path):
+    path = resolve_input(path)
+    if path.endswith(SUFFIXES["gzip"]):
+        return(gzip.open(path, "rt", encoding="utf-8", newline=""))
+    if path.endswith(SUFFIXES["zstd"]):
+        if zstandard is None:
+            raise ImportError("reading {} needs the zstandard package to be installed".format(path))
+        binary = zstandard.ZstdDecompressor().stream_reader(open(path, "rb"))
+        return(io.TextIOWrapper(binary, encoding="utf-8", newline=""))
+    return(open(path, newline=""))
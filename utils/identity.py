@@ -0,0 +1,212 @@
+import os
+import pickle
+import numpy as np
+import pandas as pd
+
+
+
+
+# Functions for resolving which rows of the stacked dataset refer to the same gene.
+# Rows and gene identifiers are treated as nodes of a bipartite graph, where each row is connected to
+# each of the identifier strings that it lists. Rows that end up in the same connected component are
+# the same gene. Instead of building a graph object with one string node for every row and identifier,
+# the identifiers are interned to integer codes and the components are found with a union-find over
+# arrays, so the memory used is a few integers per node.
+
+
+
+
+# Maps each identifier string to an integer code, in order of first appearance.
+# Returns the array of codes with one value for each input key, and the array of distinct keys.
+def intern_identifiers(keys):
+    codes, uniques = pd.factorize(np.asarray(keys, dtype=object), sort=False)
+    return(codes.astype(np.int64), np.asarray(uniques, dtype=object))
+
+
+
+
+# Finds the root node for every node given a list of undirected edges between integer nodes.
+# The parent array always points from a node to a node with a smaller index, so the root that is found
+# for each node is the smallest node index in its connected component. Each round hooks the larger of
+# the two roots on either end of every edge under the smaller one, and then compresses all the paths
+# by pointer jumping until every node points directly at a root. This repeats until no edge joins two
+# different roots. Any of the competing writes when a root is hooked more than once is valid, because
+# they all point to a smaller index, which means no cycles can be created.
+def find_roots(num_nodes, sources, targets):
+    parent = np.arange(num_nodes, dtype=np.int64)
+    sources = np.asarray(sources, dtype=np.int64)
+    targets = np.asarray(targets, dtype=np.int64)
+    while True:
+        source_roots = parent[sources]
+        target_roots = parent[targets]
+        low = np.minimum(source_roots, target_roots)
+        high = np.maximum(source_roots, target_roots)
+        crossing = low != high
+        if not crossing.any():
+            break
+        parent[high[crossing]] = low[crossing]
+        while True:
+            grandparent = parent[parent]
+            if np.array_equal(grandparent, parent):
+                break
+            parent = grandparent
+        sources = sources[crossing]
+        targets = targets[crossing]
+    return(parent)
+
+
+
+
+# Assigns a component number to each row given the edges between rows and interned identifiers.
+# The row nodes are numbered 0 to num_rows-1 and the identifier nodes are numbered after that, so the
+# root of every component that contains a row is the smallest row index in that component. Components
+# are then numbered in order of that smallest row, which is the same order that networkx enumerates the
+# connected components in when the rows and their identifiers are added to a graph one row at a time.
+def assign_components(num_rows, edge_rows, edge_identifiers, num_identifiers):
+    edge_rows = np.asarray(edge_rows, dtype=np.int64)
+    edge_identifiers = np.asarray(edge_identifiers, dtype=np.int64)+num_rows
+    roots = find_roots(num_rows+num_identifiers, edge_rows, edge_identifiers)
+    _, components = np.unique(roots[:num_rows], return_inverse=True)
+    return(components.astype(np.int64))
+
+
+
+
+# Creates the edges between rows and the identifiers in the pipe-delimited identifier column as integer arrays.
+# Each identifier is turned into a key that includes the species code, like "ath[SEP]at1g01010", so that the
+# same name in two species doesn't get merged. The work is done on whole columns, with the case folding
+# applied once over the identifier column instead of once per row, and without making tuples for each edge.
+# Returns the row for each edge, the interned code of the identifier for each edge, and the distinct keys.
+def build_edges(row_ids, species_codes, identifiers, case_sensitive=False):
+    identifiers = pd.Series(np.asarray(identifiers, dtype=object))
+    if not case_sensitive:
+        identifiers = identifiers.str.lower()
+    names = identifiers.str.split("|")
+    lengths = names.str.len().values.astype(np.int64)
+    edge_rows = np.repeat(np.asarray(row_ids, dtype=np.int64), lengths)
+    edge_species = np.repeat(np.asarray(species_codes, dtype=object), lengths)
+    edge_names = np.asarray(names.explode().values, dtype=object)
+    edge_keys = pd.Series(edge_species).str.cat(pd.Series(edge_names), sep="[SEP]")
+    codes, uniques = intern_identifiers(edge_keys.values)
+    return(edge_rows, codes, uniques)
+
+
+
+
+# Convenience function for going straight from (row, identifier string) pairs to component numbers.
+# The keys are expected to already include the species code, such as "ath[SEP]at1g01010".
+def resolve_gene_ids(num_rows, edge_rows, edge_keys):
+    codes, uniques = intern_identifiers(edge_keys)
+    components = assign_components(num_rows, edge_rows, codes, len(uniques))
+    return(components)
+
+
+
+
+# A persistent mapping from identifier keys to gene IDs, so that gene IDs stay the same across runs.
+# Each key such as "ath[SEP]at1g01010" is mapped to the gene ID it was last assigned to, and the next free
+# gene ID is stored so that IDs are never reused. When new rows are assigned, any row whose identifiers are
+# all already in the index and all point to the same gene just gets that gene ID without any other work.
+# The union-find is only run over the remaining rows, which are the ones that have new identifiers or that
+# connect genes which were separate before. Genes that get connected are merged into the one with the
+# smallest ID, and the other IDs are retired. Genes are never split by the index, so if a source is refreshed
+# and no longer lists an identifier that was joining two genes, they stay merged until the index is rebuilt,
+# which is done by deleting the saved file. This only makes the merging incremental, the rows given to it are
+# still every row of the stacked dataset.
+class IdentifierIndex:
+
+    def __init__(self, keys=None, gene_ids=None, next_gene_id=0):
+        keys = [] if keys is None else keys
+        gene_ids = [] if gene_ids is None else gene_ids
+        self.keys = pd.Index(np.asarray(keys, dtype=object))
+        self.gene_ids = np.asarray(gene_ids, dtype=np.int64)
+        self.next_gene_id = next_gene_id
+
+
+    @classmethod
+    def load(cls, path):
+        if not os.path.exists(path):
+            return(cls())
+        with open(path, "rb") as f:
+            state = pickle.load(f)
+        return(cls(state["keys"], state["gene_ids"], state["next_gene_id"]))
+
+
+    def save(self, path):
+        state = {"keys":list(self.keys), "gene_ids":self.gene_ids, "next_gene_id":self.next_gene_id}
+        with open(path, "wb") as f:
+            pickle.dump(state, f, protocol=pickle.HIGHEST_PROTOCOL)
+
+
+    def __len__(self):
+        return(len(self.keys))
+
+
+    # Returns the gene ID for each row given the (row, identifier key) edges, and updates the index.
+    def assign(self, num_rows, edge_rows, edge_keys):
+        codes, uniques = intern_identifiers(edge_keys)
+        return(self.assign_codes(num_rows, edge_rows, codes, uniques))
+
+
+    # Same as above but for edges that were already interned, such as the ones returned by build_edges().
+    def assign_codes(self, num_rows, edge_rows, codes, uniques):
+        edge_rows = np.asarray(edge_rows, dtype=np.int64)
+        codes = np.asarray(codes, dtype=np.int64)
+        positions = self.keys.get_indexer(uniques)
+        known_gene_ids = np.full(len(uniques), -1, dtype=np.int64)
+        known_gene_ids[positions >= 0] = self.gene_ids[positions[positions >= 0]]
+        edge_gene_ids = known_gene_ids[codes]
+
+        # Rows where every identifier is already known and all of them point to the same gene.
+        lowest = np.full(num_rows, np.iinfo(np.int64).max, dtype=np.int64)
+        highest = np.full(num_rows, -1, dtype=np.int64)
+        np.minimum.at(lowest, edge_rows, edge_gene_ids)
+        np.maximum.at(highest, edge_rows, edge_gene_ids)
+        settled = (lowest == highest) & (lowest >= 0)
+        row_gene_ids = np.where(settled, lowest, -1)
+        unsettled_rows = np.flatnonzero(~settled)
+        if len(unsettled_rows) == 0:
+            return(row_gene_ids)
+
+        # Everything else goes through the union-find, using only the edges from those rows. The existing
+        # genes that their identifiers point to are included as nodes too, so that two rows that each touch
+        # the same existing gene end up in the same component even if they don't share an identifier.
+        edge_mask = ~settled[edge_rows]
+        local_codes, local_uniques = pd.factorize(codes[edge_mask], sort=False)
+        local_gene_ids = known_gene_ids[local_uniques]
+        is_known = local_gene_ids >= 0
+        gene_codes, touched_gene_ids = pd.factorize(local_gene_ids[is_known], sort=False)
+        num_local_rows = len(unsettled_rows)
+        num_local_keys = len(local_uniques)
+        key_nodes = np.arange(num_local_keys)+num_local_rows
+        sources = np.concatenate([np.searchsorted(unsettled_rows, edge_rows[edge_mask]), key_nodes[is_known]])
+        targets = np.concatenate([local_codes+num_local_rows, gene_codes+num_local_rows+num_local_keys])
+        roots = find_roots(num_local_rows+num_local_keys+len(touched_gene_ids), sources, targets)
+        _, components = np.unique(roots, return_inverse=True)
+        row_components = components[:num_local_rows]
+        key_components = components[num_local_rows:num_local_rows+num_local_keys]
+        gene_components = components[num_local_rows+num_local_keys:]
+
+        # Each component keeps the smallest existing gene ID that it touches, and the others are retired.
+        # Components that don't touch any existing gene get new IDs, in the order of their first row.
+        num_components = components.max()+1
+        unassigned = np.iinfo(np.int64).max
+        component_gene_ids = np.full(num_components, unassigned, dtype=np.int64)
+        np.minimum.at(component_gene_ids, gene_components, touched_gene_ids)
+        first_rows = np.full(num_components, num_local_rows, dtype=np.int64)
+        np.minimum.at(first_rows, row_components, np.arange(num_local_rows))
+        new_components = np.flatnonzero(component_gene_ids == unassigned)
+        new_components = new_components[np.argsort(first_rows[new_components], kind="stable")]
+        component_gene_ids[new_components] = np.arange(self.next_gene_id, self.next_gene_id+len(new_components))
+        self.next_gene_id = self.next_gene_id+len(new_components)
+        row_gene_ids[unsettled_rows] = component_gene_ids[row_components]
+
+        # Point the identifiers of any retired genes at the surviving gene, and add the new identifiers.
+        mapping = np.arange(self.next_gene_id, dtype=np.int64)
+        mapping[touched_gene_ids] = component_gene_ids[gene_components]
+        self.gene_ids = mapping[self.gene_ids]
+        row_gene_ids = mapping[row_gene_ids]
+        is_new_key = ~is_known
+        self.keys = self.keys.append(pd.Index(uniques[local_uniques[is_new_key]]))
+        self.gene_ids = np.concatenate([self.gene_ids, component_gene_ids[key_components[is_new_key]]])
+        return(row_gene_ids)
@@ -0,0 +1,135 @@
+import sys
+import json
+import time
+import resource
+from contextlib import contextmanager
+
+
+
+
+# Measurements of how long each stage of the pipeline and each of the larger steps inside it take, how much memory
+# they use, and how many rows go into and come out of them. The wall time is the elapsed time, and the CPU time is
+# the user and system time of this process and of any processes it has started and waited for, like the pools
+# used for tokenizing or the NOBLE Coder processes, so a CPU time much larger than the wall time means the step ran
+# in parallel. The peak memory is the largest resident set size this process has had up to the end of the step, so
+# it only goes up from one step to the next, and the step where it goes up is the one that needed that memory.
+# The largest resident set size of any of the processes it started is given separately. Each stage saves a report
+# with all of this as json, and the runner combines those into one report for the whole run.
+
+
+
+
+# Returns the peak resident set size of this process so far in megabytes.
+# The units that ru_maxrss is reported in are kilobytes on Linux but bytes on macOS.
+def peak_rss_mb(who=resource.RUSAGE_SELF):
+    peak = resource.getrusage(who).ru_maxrss
+    if sys.platform == "darwin":
+        return(peak/1E6)
+    return(peak/1E3)
+
+
+# Returns the user and system time used so far by this process and the processes it has waited for, in seconds.
+def cpu_seconds():
+    own = resource.getrusage(resource.RUSAGE_SELF)
+    children = resource.getrusage(resource.RUSAGE_CHILDREN)
+    return(own.ru_utime+own.ru_stime+children.ru_utime+children.ru_stime)
+
+
+
+
+# The measurements for one stage. Steps are measured with the step() context manager, which gives back the
+# dictionary for that step so that the number of rows that came out of it can be set once they're known.
+# The rows read and written by the stage as a whole are counted in rows_in and rows_out.
+class Instrumentation:
+
+    def __init__(self, name):
+        self.name = name
+        self.steps = []
+        self.rows_in = 0
+        self.rows_out = 0
+        self._start_wall = time.perf_counter()
+        self._start_cpu = cpu_seconds()
+
+
+    @contextmanager
+    def step(self, name, rows_in=None):
+        step = {"name":name, "rows_in":rows_in, "rows_out":None}
+        start_wall = time.perf_counter()
+        start_cpu = cpu_seconds()
+        try:
+            yield step
+        finally:
+            step["wall_seconds"] = time.perf_counter()-start_wall
+            step["cpu_seconds"] = cpu_seconds()-start_cpu
+            step["peak_rss_mb"] = peak_rss_mb()
+            step["children_peak_rss_mb"] = peak_rss_mb(resource.RUSAGE_CHILDREN)
+            self.steps.append(step)
+
+
+    # Returns the measurements for the stage so far, and for each of its steps, as a dictionary.
+    def report(self):
+        return({
+            "name":self.name,
+            "wall_seconds":time.perf_counter()-self._start_wall,
+            "cpu_seconds":cpu_seconds()-self._start_cpu,
+            "peak_rss_mb":peak_rss_mb(),
+            "children_peak_rss_mb":peak_rss_mb(resource.RUSAGE_CHILDREN),
+            "rows_in":self.rows_in,
+            "rows_out":self.rows_out,
+            "steps":list(self.steps)})
+
+
+    def save(self, path):
+        with open(path, "w") as f:
+            json.dump(self.report(), f, indent=4)
+
+
+    def summary(self):
+        return(format_summary([self.report()]))
+
+
+
+
+# The instrumentation for the stage that the pipeline is running in this process, if there is one.
+_pipeline_instrumentation = None
+
+
+# This is only called by the pipeline runner, in the process started for a stage.
+def set_pipeline_instrumentation(instrumentation):
+    global _pipeline_instrumentation
+    _pipeline_instrumentation = instrumentation
+
+
+# Returns the instrumentation that a script should record its steps with. When the script is run as a stage of the
+# pipeline this is the one the runner started for that stage, so the steps end up in the report for the run, and
+# otherwise a new one is started.
+def stage_instrumentation(name):
+    if _pipeline_instrumentation is not None:
+        return(_pipeline_instrumentation)
+    return(Instrumentation(name))
+
+
+
+
+def _format_rows(rows):
+    return("" if rows is None else "{:,}".format(rows))
+
+
+# Returns a table of the measurements for each of the stage reports and the steps inside them, for reading.
+# Reports can have the status of the stage, which is shown after the name unless it's "ok", and reports that only
+# have a status, for stages that were skipped or never finished, are shown without any measurements.
+def format_summary(reports):
+    line = "{:<40} {:>9} {:>9} {:>10} {:>10} {:>12} {:>12}"
+    lines = [line.format("", "wall_s", "cpu_s", "rss_mb", "child_mb", "rows_in", "rows_out")]
+    for report in reports:
+        status = report.get("status", "ok")
+        name = report["name"] if status == "ok" else "{} ({})".format(report["name"], status)
+        if "wall_seconds" not in report:
+            lines.append(name)
+            continue
+        lines.append(line.format(name, "{:.1f}".format(report["wall_seconds"]), "{:.1f}".format(report["cpu_seconds"]),
+            "{:.0f}".format(report["peak_rss_mb"]), "{:.0f}".format(report["children_peak_rss_mb"]), _format_rows(report["rows_in"]), _format_rows(report["rows_out"])))
+        for step in report["steps"]:
+            lines.append(line.format("  {}".format(step["name"])[:40], "{:.1f}".format(step["wall_seconds"]), "{:.1f}".format(step["cpu_seconds"]),
+                "{:.0f}".format(step["peak_rss_mb"]), "{:.0f}".format(step["children_peak_rss_mb"]), _format_rows(step["rows_in"]), _format_rows(step["rows_out"])))
+    return("\n".join(lines))
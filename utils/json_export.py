@@ -0,0 +1,301 @@
+import json
+import pandas as pd
+from utils.compression import open_input
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+
+
+# Functions for saving the combined dataset as json without building the whole document in memory first.
+# The csv file is read in chunks, each row is turned into a plain dictionary, and each of those is encoded and
+# written on its own. The indented output is the same as what json.dump() writes for the list of all of them.
+
+
+
+
+# The order of the fields in each gene object, and the ones that are pipe-delimited lists in the csv file.
+FIELDS = [
+    "_gene_id",
+    "species_code",
+    "species_name",
+    "unique_gene_identifiers",
+    "other_gene_identifiers",
+    "gene_models",
+    "text_unprocessed",
+    "text_tokenized_sents",
+    "text_tokenized_words",
+    "text_tokenized_stems",
+    "annotations",
+    "annotations_nc",
+    "reference_name",
+    "reference_file",
+    "reference_link"]
+LIST_FIELDS = [
+    "unique_gene_identifiers",
+    "other_gene_identifiers",
+    "gene_models",
+    "annotations",
+    "annotations_nc"]
+
+
+
+
+def split_on_bar_without_empty_strings(x):
+    return([y.strip() for y in x.split("|") if y.strip() != ""])
+
+
+
+
+# Yields one dictionary for each row in the dataframe, with missing values treated as empty strings.
+def to_records(df):
+    df = df.fillna("")
+    columns = [df[field].tolist() for field in FIELDS]
+    is_list = [field in LIST_FIELDS for field in FIELDS]
+    for values in zip(*columns):
+        yield({field:(split_on_bar_without_empty_strings(value) if listed else value) for field,value,listed in zip(FIELDS, values, is_list)})
+
+
+# Yields one dictionary for each row in the csv file, reading chunk_size rows at a time.
+# Every column other than the gene ID is read as a string, so that the values can't be read as different types
+# depending on what the other values in that chunk happen to be. The csv file can be compressed. Each chunk is
+# also given to the sampler if there is one, so that a sample can be taken in the same pass.
+def iter_records(path, chunk_size=10000, sampler=None):
+    dtypes = {field:str for field in FIELDS if field != "_gene_id"}
+    with open_input(path) as f:
+        for chunk in pd.read_csv(f, chunksize=chunk_size, dtype=dtypes):
+            if sampler is not None:
+                sampler.add(chunk)
+            for record in to_records(chunk):
+                yield(record)
+
+
+
+
+# Encodes records with the json module from the standard library, either compact or with indentation.
+class StandardEncoder:
+
+    name = "json"
+
+    def __init__(self):
+        self._compact = json.JSONEncoder(separators=(",",":"))
+        self._indented = {}
+
+
+    def encode(self, record, indent=None):
+        if indent is None:
+            return(self._compact.encode(record))
+        if indent not in self._indented:
+            self._indented[indent] = json.JSONEncoder(indent=indent)
+        return(self._indented[indent].encode(record))
+
+
+
+
+# Encodes records with orjson, giving exactly the same strings as StandardEncoder does. The orjson library only
+# indents by two spaces, so indented output has the leading spaces on each line scaled up to the given indent,
+# which is safe because json strings can't have newlines or null characters in them. It also writes non-ASCII characters as they
+# are instead of escaping them, so records with any of those or with the delete character, and records orjson
+# can't encode like ones with integers that are too large, are handed to StandardEncoder instead.
+class OrjsonEncoder:
+
+    name = "orjson"
+
+    def __init__(self):
+        self._fallback = StandardEncoder()
+
+
+    def encode(self, record, indent=None):
+        try:
+            encoded = orjson.dumps(record, option=(0 if indent is None else orjson.OPT_INDENT_2)).decode("ascii")
+        except (TypeError, UnicodeDecodeError):
+            return(self._fallback.encode(record, indent))
+        if "\x7f" in encoded:
+            return(self._fallback.encode(record, indent))
+        if indent is not None and indent != 2:
+            encoded = self._reindent(encoded, indent)
+        return(encoded)
+
+
+    # Changes the indentation from two spaces to the given indent for each level. The deepest levels are swapped
+    # for null characters first, which can't be in the encoded string already, so that the shallower levels that
+    # are done after them don't also match the lines that were already changed.
+    @staticmethod
+    def _reindent(encoded, indent):
+        depth = 0
+        while "\n"+"  "*(depth+1) in encoded:
+            depth = depth+1
+        for level in range(depth, 0, -1):
+            encoded = encoded.replace("\n"+"  "*level, "\n"+"\x00"*level)
+        return(encoded.replace("\x00", " "*indent))
+
+
+
+
+# The encoders that can be used by name, where "auto" uses orjson if it's installed.
+ENCODERS = {"json":StandardEncoder, "orjson":OrjsonEncoder}
+
+
+def get_encoder(backend="auto"):
+    if backend == "auto":
+        backend = "json" if orjson is None else "orjson"
+    if backend not in ENCODERS:
+        raise ValueError("unknown json backend {}, should be one of {}".format(backend, ", ".join(["auto"]+list(ENCODERS))))
+    if backend == "orjson" and orjson is None:
+        raise ImportError("the orjson backend needs the orjson package to be installed")
+    return(ENCODERS[backend]())
+
+
+
+
+# Writes the records as one json array, one at a time. The indented layout is the same as json.dump(records, f,
+# indent=indent), and the compact layout is the same as json.dump(records, f, separators=(",",":")).
+# The encoder is one of the ones from get_encoder(), and the output is the same no matter which one is used.
+def write_json(records, f, indent=4, compact=False, encoder=None):
+    encoder = get_encoder() if encoder is None else encoder
+    if compact:
+        indent = None
+        opening, separator, closing, prefix = "[", ",", "]", ""
+    else:
+        opening, separator, closing, prefix = "[\n", ",\n", "\n]", " "*indent
+    count = 0
+    for record in records:
+        encoded = encoder.encode(record, indent)
+        if prefix != "":
+            encoded = prefix+encoded.replace("\n", "\n"+prefix)
+        f.write(opening if count == 0 else separator)
+        f.write(encoded)
+        count = count+1
+    f.write(closing if count > 0 else "[]")
+    return(count)
+
+
+
+
+# Writes records as json lines, one compact json object per line, along with an index of where each gene is.
+# This file is never compressed, because the offsets in the index are for seeking in the uncompressed file.
+# The index is a tab-separated file with the gene ID, the byte offset, and the length in bytes of each run of
+# consecutive lines for that gene. The rows of the combined dataset are sorted by gene ID, so there is usually
+# exactly one run for each gene. The index is written when the writer is closed.
+class JsonLinesWriter:
+
+    def __init__(self, path, index_path=None, encoder=None):
+        self.path = path
+        self.index_path = "{}.index".format(path) if index_path is None else index_path
+        self._file = open(path, "wb")
+        self._encoder = get_encoder() if encoder is None else encoder
+        self._spans = []
+        self._offset = 0
+
+
+    def __enter__(self):
+        return(self)
+
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+    # Writes one record and returns it, so that this can be used while the records are passed on somewhere else.
+    def write(self, record):
+        line = "{}\n".format(self._encoder.encode(record)).encode("utf-8")
+        self._file.write(line)
+        gene_id = record["_gene_id"]
+        if len(self._spans) > 0 and self._spans[-1][0] == gene_id and self._spans[-1][1]+self._spans[-1][2] == self._offset:
+            self._spans[-1][2] += len(line)
+        else:
+            self._spans.append([gene_id, self._offset, len(line)])
+        self._offset += len(line)
+        return(record)
+
+
+    def close(self):
+        if self._file.closed:
+            return
+        self._file.close()
+        with open(self.index_path, "w") as f:
+            f.write("_gene_id\toffset\tlength\n")
+            for gene_id,offset,length in self._spans:
+                f.write("{}\t{}\t{}\n".format(gene_id, offset, length))
+
+
+
+
+# Reads the records for particular genes from a json lines file using the index written with it, by seeking
+# straight to the lines for those genes without reading or parsing any of the rest of the file.
+class JsonLinesReader:
+
+    def __init__(self, path, index_path=None):
+        self.path = path
+        index_path = "{}.index".format(path) if index_path is None else index_path
+        self._spans = {}
+        with open(index_path) as f:
+            next(f)
+            for line in f:
+                gene_id, offset, length = line.split("\t")
+                self._spans.setdefault(int(gene_id), []).append((int(offset), int(length)))
+        self._file = open(path, "rb")
+
+
+    def __enter__(self):
+        return(self)
+
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+    def close(self):
+        self._file.close()
+
+
+    def __contains__(self, gene_id):
+        return(gene_id in self._spans)
+
+
+    def gene_ids(self):
+        return(list(self._spans.keys()))
+
+
+    # Returns the list of records for one gene, which is empty if the gene isn't in the file.
+    def get(self, gene_id):
+        records = []
+        for offset,length in self._spans.get(gene_id, []):
+            self._file.seek(offset)
+            records.extend(json.loads(line) for line in self._file.read(length).splitlines())
+        return(records)
+
+
+    # Returns a dictionary mapping each of the gene IDs to its list of records. The reads are done in the order
+    # they appear in the file so that looking up a batch of genes moves forward through the file.
+    def get_many(self, gene_ids):
+        spans = sorted((offset, length, gene_id) for gene_id in set(gene_ids) for offset,length in self._spans.get(gene_id, []))
+        records = {gene_id:[] for gene_id in gene_ids}
+        for offset,length,gene_id in spans:
+            self._file.seek(offset)
+            records[gene_id].extend(json.loads(line) for line in self._file.read(length).splitlines())
+        return(records)
+
+
+
+
+# Writes the records as one json array in the layout used for the sample files, which is the same as json.dump()
+# with indentation except that each list is kept on the same line as its field name, like ["a", "b"].
+def write_sample_json(records, f, indent=4):
+    count = 0
+    for record in records:
+        fields = []
+        for field,value in record.items():
+            if isinstance(value, list):
+                encoded = "[{}]".format(", ".join(json.dumps(item) for item in value))
+            else:
+                encoded = json.dumps(value)
+            fields.append("{}{}: {}".format(" "*(indent*2), json.dumps(field), encoded))
+        f.write("[\n" if count == 0 else ",\n")
+        f.write("{}{{\n{}\n{}}}".format(" "*indent, ",\n".join(fields), " "*indent))
+        count = count+1
+    f.write("\n]" if count > 0 else "[]")
+    return(count)
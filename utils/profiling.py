@@ -0,0 +1,97 @@
+import os
+import sys
+import pandas as pd
+
+
+
+
+# A report of the exploratory statistics and plots for the files that a reshaping script reads.
+# None of this is needed to create the reshaped files, so the reshaping scripts only make a report when they're
+# asked to with --profile. The libraries that are only used for it, matplotlib and the nltk tokenizers, are not
+# imported until a report actually needs them, so they're never imported at all when the scripts run without it.
+# Each section of the report is saved as text in one file, and each figure is saved as an image next to it.
+class ProfilingReport:
+
+    def __init__(self, name, directory):
+        self.name = name
+        self.directory = directory
+        self.sections = []
+        self.figures = []
+
+
+    def add_text(self, title, text):
+        self.sections.append((title, str(text)))
+
+
+    # Adds the first rows of the dataframe for the given columns, and the shape of the whole dataframe.
+    def add_head(self, title, df, columns=None, num_rows=10):
+        df_head = df.head(num_rows) if columns is None else df[columns].head(num_rows)
+        self.add_text(title, "{}\n{} rows, {} columns".format(df_head, df.shape[0], df.shape[1]))
+
+
+    # Adds how many distinct values there are in each of the columns.
+    def add_unique_counts(self, title, df, width=24):
+        lines = ["{:{}}{:8}".format(column, width, len(pd.unique(df[column].values))) for column in df.columns]
+        self.add_text(title, "\n".join(lines))
+
+
+    # Adds how many times each of the most common values occurs.
+    def add_value_counts(self, title, values, num_values=10, char_limit=70):
+        counts = pd.Series(values).value_counts().head(num_values)
+        lines = ["{:6}    {:20}".format(count, str(value)[:char_limit]) for value,count in counts.items()]
+        self.add_text(title, "\n".join(lines))
+
+
+    # Adds how many of the evidence codes fall under each category, using a dictionary of codes to categories.
+    def add_category_counts(self, title, codes, categories, width=25):
+        counts = pd.Series(codes).map(categories).value_counts()
+        lines = ["{:{}}{:8}".format(category, width, counts.get(category, 0)) for category in sorted(set(categories.values()))]
+        self.add_text(title, "\n".join(lines))
+
+
+    # Adds a figure with a histogram for each panel, where each panel is a dictionary with the title, the texts,
+    # whether to count the "sentences" or "words" in each text, and the number of bins and range of the histogram.
+    # The punkt tokenizer data for nltk has to be installed already, it isn't downloaded here.
+    def add_length_histograms(self, title, panels):
+        import matplotlib
+        if "matplotlib.pyplot" not in sys.modules:
+            matplotlib.use("Agg")
+        import matplotlib.pyplot as plt
+        import nltk
+        from nltk.tokenize import sent_tokenize, word_tokenize
+        for resource in ["tokenizers/punkt_tab", "tokenizers/punkt"]:
+            try:
+                nltk.data.find(resource)
+                break
+            except LookupError:
+                continue
+        else:
+            raise LookupError("the text length histograms need the nltk punkt tokenizer data, which can be installed with python -m nltk.downloader punkt_tab punkt")
+        tokenizers = {"sentences":sent_tokenize, "words":word_tokenize}
+        labels = {"sentences":"Number of phrases", "words":"Number of words"}
+        fig, axes = plt.subplots(1, len(panels), squeeze=False)
+        for ax,panel in zip(axes[0], panels):
+            lengths = [len(tokenizers[panel["unit"]](text)) for text in panel["texts"]]
+            ax.set_title(panel["title"])
+            ax.set_xlabel(labels[panel["unit"]])
+            ax.hist(lengths, bins=panel["bins"], range=panel["range"], density=False, alpha=0.8, histtype='stepfilled', color="black", edgecolor='none')
+        fig.set_size_inches(15,4)
+        fig.tight_layout()
+        path = os.path.join(self.directory, "{}_{}.png".format(self.name, len(self.figures)+1))
+        self.figures.append((title, path, fig))
+        self.add_text(title, "saved as {}".format(os.path.basename(path)))
+
+
+    # Saves the text of the report and all of its figures, and returns the path to the text file.
+    def save(self):
+        os.makedirs(self.directory, exist_ok=True)
+        for _,path,fig in self.figures:
+            fig.savefig(path, dpi=200)
+        if len(self.figures) > 0:
+            import matplotlib.pyplot as plt
+            plt.close("all")
+        path = os.path.join(self.directory, "{}.txt".format(self.name))
+        with open(path, "w") as f:
+            for title,text in self.sections:
+                f.write("{}\n{}\n{}\n\n\n".format(title, "-"*len(title), text))
+        return(path)
@@ -0,0 +1,142 @@
+import re
+import numpy as np
+import pandas as pd
+
+
+
+
+# Building the standard columns of the reshaped files from the columns of the files from each source. Each source
+# describes how to build each standard column in a spec, and reshape() builds all of them a whole column at a
+# time, instead of calling a function on each row with DataFrame.apply(), which makes a new series for every row
+# and is most of the time the reshaping scripts took. Constant values, mappings, prefixes, and joining columns as
+# they are use the pandas operations on whole columns. Joining, removing repeats, and removing identifiers that are
+# in another column are done on the lists of plain strings for each column, which is much faster than apply(), and
+# also faster than splitting every list into one long series of identifiers and grouping them back into rows. On a
+# million rows, benchmarks/benchmark_reshaping.py measured joining at 4.0 s against 14.2 s with apply() and 30.0 s
+# with explode() and groupby(), and subtracting at 2.1 s against 11.7 s and 40.6 s. Finding gene models was already
+# done with map() and only went from 2.2 s to 1.9 s, and took 13.5 s with the pandas string methods.
+#
+# A spec is a dictionary with these keys.
+#   "prefixes": Optional, maps input columns to a prefix added to each of their non-empty values before anything
+#       else is done, like {"ncbi_gene":NCBI_TAG}.
+#   "columns": Maps each of the reshaped columns to the rule for building it. The rules are applied in order, and
+#       a rule can use the reshaped columns that come before it, so unique_gene_identifiers can be used to find
+#       gene_models. Any of RESHAPED_COLUMNS that aren't given are left empty.
+# Each rule is a dictionary with one of these keys.
+#   "value": The same value for every row.
+#   "column": The values of an input column as they are.
+#   "map": The values of an input column looked up in the dictionary given as "mapping".
+#   "join": A list of columns whose values are lists, joined into one list with the same rules as the old
+#       concatenate_with_delim(), which splits every value on the delimiter, strips the whitespace from each item,
+#       drops the ones that are left empty, and keeps only the first of any repeats.
+#   "concat": A list of columns whose values are joined with the delimiter as they are, like str.format() does,
+#       so missing values become "nan".
+#   "gene_models": A column whose values are lists, keeping the identifiers in it that match any of the regular
+#       expressions given as "patterns" when lowercased, which are joined with "joiner".
+# Every rule can also have "delim", the delimiter for the lists, which is "|" by default, and "subtract", another
+# column whose identifiers are removed from the list this rule makes, like removing the unique identifiers from
+# the other identifiers.
+
+
+
+
+# Columns that should be in the final reshaped files.
+RESHAPED_COLUMNS = [
+    "species_name",
+    "species_code",
+    "unique_gene_identifiers",
+    "other_gene_identifiers",
+    "gene_models",
+    "text_unprocessed",
+    "annotations",
+    "reference_name",
+    "reference_link",
+    "reference_file"]
+
+
+
+
+# This is only called by the functions below.
+# Returns a list of the values as strings, with missing values as empty strings.
+def _as_strings(values):
+    values = pd.Series(np.asarray(values, dtype=object))
+    return(values.where(values.notnull(), "").astype(str).tolist())
+
+
+
+
+# Joins the lists in each of the columns into one list for each row, splitting the values on the delimiter,
+# stripping whitespace, dropping the items that are left empty, and removing repeats, which is what
+# concatenate_with_delim() did to each row. The items keep the order of the columns and then the order inside each value.
+def join_columns(df, columns, delim="|"):
+    rows = zip(*[_as_strings(df[column].values) for column in columns])
+    joined = [delim.join(dict.fromkeys(s for s in (item.strip() for value in row for item in value.split(delim)) if s)) for row in rows]
+    return(pd.Series(joined, index=df.index, dtype=object))
+
+
+# Joins the values of the columns with the delimiter, without splitting them or removing anything. Every value is
+# converted with str() the same as "{}|{}".format() did for each row, so missing values become "nan".
+def concat_columns(df, columns, delim="|"):
+    values = [df[column].astype(str) for column in columns]
+    return(values[0].str.cat(values[1:], sep=delim))
+
+
+# Returns the lists in the first values with any items that are in the list in the same row of the other values
+# removed, which is what subtract_string_lists() did to each row. Everything else about the lists is left as is.
+def subtract_lists(values, other_values, delim="|"):
+    subtracted = []
+    for value,other_value in zip(_as_strings(values), _as_strings(other_values)):
+        other_items = set(other_value.split(delim))
+        subtracted.append(delim.join(item for item in value.split(delim) if item not in other_items))
+    return(np.array(subtracted, dtype=object))
+
+
+# Returns the items in each of the lists that match any of the patterns when lowercased, joined with the joiner.
+def find_gene_models(values, patterns, delim="|", joiner="|"):
+    pattern = re.compile("|".join("(?:{})".format(p) for p in patterns))
+    found = [joiner.join(item for item in value.split(delim) if pattern.match(item.lower())) for value in _as_strings(values)]
+    return(np.array(found, dtype=object))
+
+
+# Adds the prefix to each of the values that aren't empty or missing.
+def add_prefix(values, prefix):
+    values = pd.Series(_as_strings(values), dtype=object)
+    return(values.where(values == "", prefix+values).values)
+
+
+
+
+# This is only called by reshape().
+def _apply_rule(df, rule):
+    delim = rule.get("delim", "|")
+    if "value" in rule:
+        return(rule["value"])
+    if "column" in rule:
+        return(df[rule["column"]].values)
+    if "map" in rule:
+        return(df[rule["map"]].map(rule["mapping"]).values)
+    if "join" in rule:
+        return(join_columns(df, rule["join"], delim).values)
+    if "concat" in rule:
+        return(concat_columns(df, rule["concat"], delim).values)
+    if "gene_models" in rule:
+        return(find_gene_models(df[rule["gene_models"]].values, rule["patterns"], delim, rule.get("joiner", "|")))
+    raise ValueError("the rule {} doesn't say how to build the column".format(rule))
+
+
+# Returns a dataframe with the reshaped columns built from the dataframe read from a source, following the spec.
+def reshape(df, spec):
+    df = df.copy()
+    for column,prefix in spec.get("prefixes", {}).items():
+        df[column] = add_prefix(df[column].values, prefix)
+    reshaped_df = pd.DataFrame(index=df.index)
+    for column,rule in spec["columns"].items():
+        values = _apply_rule(df, rule)
+        if "subtract" in rule:
+            values = subtract_lists(values, df[rule["subtract"]].values, rule.get("delim", "|"))
+        reshaped_df[column] = values
+        df[column] = reshaped_df[column].values
+    for column in RESHAPED_COLUMNS:
+        if column not in reshaped_df.columns:
+            reshaped_df[column] = ""
+    return(reshaped_df[RESHAPED_COLUMNS])
@@ -0,0 +1,117 @@
+import numpy as np
+import pandas as pd
+
+
+
+
+# Taking the sample version of a file from the rows as they're written, instead of reading the file again after.
+# A sampler is given each chunk of rows on its way to the file, and only ever holds the rows that could still end
+# up in the sample. Without any columns to stratify by, the sample is the first rows of the file. With columns to
+# stratify by, like the species and the source, the sample is split between each combination of values in those
+# columns in proportion to how many rows have it, with at least one row for each, so that a sample of a file that's
+# mostly one species still shows the others. The rows within each combination are picked by a fixed pseudorandom
+# ordering of the row positions, so the same file always gives the same sample. Either way the rows in the sample
+# are in the order they're in the file.
+
+
+
+
+# The columns that samples are stratified by unless the scripts are told otherwise. By default the samples are the
+# first rows of each file, the same as they were before the samples were taken as the files are written, and giving
+# the scripts --sample-stratify-by species_code,reference_name makes every species and source show up in them.
+DEFAULT_STRATIFY_BY = "none"
+
+
+
+
+# Splits the sample size between the values in proportion to their counts, giving the rows left over from
+# rounding down to the values with the largest remainders, after making sure that each value gets at least one.
+# Returns a dictionary mapping each value to the number of rows to take for it.
+def allocate_sample(counts, sample_size):
+    total = counts.sum()
+    if total <= sample_size:
+        return(counts.to_dict())
+    guaranteed = 1 if len(counts) <= sample_size else 0
+    spare = sample_size-guaranteed*len(counts)
+    shares = (counts-guaranteed).clip(lower=0)*spare/max(1, (counts-guaranteed).sum())
+    quotas = shares.astype(int)+guaranteed
+    leftover = sample_size-quotas.sum()
+    for value in (shares-shares.astype(int)).sort_values(ascending=False, kind="stable").index[:leftover]:
+        quotas[value] += 1
+    return(quotas.to_dict())
+
+
+# Returns a pseudorandom 64 bit number for each position, from the splitmix64 mixing function, which is the same
+# on every platform and for every version of numpy, unlike the random number generators.
+def _mix(positions, seed):
+    with np.errstate(over="ignore"):
+        z = positions.astype(np.uint64)+np.uint64(seed)*np.uint64(0x9E3779B97F4A7C15)+np.uint64(0x9E3779B97F4A7C15)
+        z = (z^(z>>np.uint64(30)))*np.uint64(0xBF58476D1CE4E5B9)
+        z = (z^(z>>np.uint64(27)))*np.uint64(0x94D049BB133111EB)
+        return(z^(z>>np.uint64(31)))
+
+
+
+
+# Collects a sample of sample_size rows from the chunks of a dataframe given to add(). The stratify_by argument is
+# a list of columns, and only the ones that are in the rows are used, so that the same setting can be given for
+# files with different columns. Files that don't have any of them are sampled from the start.
+class RowSampler:
+
+    def __init__(self, sample_size=100, stratify_by=None, seed=0):
+        self.sample_size = sample_size
+        self.stratify_by = [] if stratify_by is None else list(stratify_by)
+        self.seed = seed
+        self._kept = None
+        self._counts = pd.Series(dtype=np.int64)
+        self._position = 0
+
+
+    # Returns the label of the stratum for each row, which is the values of the columns joined together.
+    def _strata(self, chunk):
+        columns = [column for column in self.stratify_by if column in chunk.columns]
+        if len(columns) == 0:
+            return(pd.Series("", index=chunk.index))
+        strata = chunk[columns[0]].astype(str)
+        for column in columns[1:]:
+            strata = strata+"\t"+chunk[column].astype(str)
+        return(strata)
+
+
+    def add(self, chunk):
+        positions = np.arange(self._position, self._position+len(chunk), dtype=np.int64)
+        self._position += len(chunk)
+        if len(chunk) == 0:
+            return
+        strata = self._strata(chunk)
+        self._counts = self._counts.add(strata.value_counts(sort=False), fill_value=0).astype(np.int64)
+        if self._kept is not None and len(self.stratify_by) == 0 and len(self._kept) >= self.sample_size:
+            return
+        priorities = positions if len(self.stratify_by) == 0 else _mix(positions, self.seed)
+        candidates = chunk.assign(_stratum=strata.values, _priority=priorities, _position=positions)
+        if self._kept is not None:
+            candidates = pd.concat([self._kept, candidates])
+        candidates = candidates.sort_values(by="_priority", kind="stable")
+        self._kept = candidates.groupby("_stratum", sort=False).head(self.sample_size)
+
+
+    # Returns the sample as a dataframe with the same columns as the chunks, in the order the rows were added.
+    def sample(self):
+        if self._kept is None:
+            return(None)
+        quotas = allocate_sample(self._counts, self.sample_size)
+        kept = self._kept.sort_values(by="_priority", kind="stable")
+        rank = kept.groupby("_stratum", sort=False).cumcount()
+        sample_df = kept[rank.values < kept["_stratum"].map(quotas).values]
+        sample_df = sample_df.sort_values(by="_position", kind="stable")
+        return(sample_df.drop(["_stratum","_priority","_position"], axis="columns"))
+
+
+
+
+# Returns the list of columns to stratify by from a comma-separated command line argument, where "none" or an empty
+# string means not to stratify.
+def parse_stratify_by(argument):
+    if argument is None or argument.strip().lower() in ("", "none"):
+        return(None)
+    return([column.strip() for column in argument.split(",") if column.strip() != ""])
@@ -0,0 +1,354 @@
+import os
+import sys
+import glob
+import json
+import time
+import hashlib
+import importlib
+import multiprocessing
+from utils.compression import resolve_input
+from utils.instrumentation import Instrumentation, set_pipeline_instrumentation, format_summary
+
+
+
+
+# Functions for running the stages of the pipeline in the order their files require. Each stage is a dictionary
+# that names the script with its main() function and the files it reads and writes, and a stage depends on every
+# other stage that writes one of the files it reads. Every stage runs in its own process, which is forked from
+# this one after the scripts have been imported, so that the libraries they use are only imported once for the
+# whole pipeline. Stages that don't depend on each other run at the same time, up to some number of processes at
+# once, and a stage starts as soon as everything it depends on has finished. If any stage fails, the stages that
+# are still running are stopped and nothing else is started, so that a broken stage is reported right away
+# instead of after every other stage has run. A stage is skipped when none of its inputs, its code, or its
+# arguments have changed since the last time it ran successfully, its outputs are all still there, and none of the
+# stages it depends on were run, which is checked by comparing fingerprints of those things with the ones saved in
+# a manifest file. The time, memory, and
+# rows for each stage and the steps inside it are saved in a report for the whole run, in the same directory as
+# the logs, and a summary of that report is printed at the end.
+#
+# Each stage is a dictionary with the following keys.
+#   "name": The name of the stage, used for its log file and in the status lines.
+#   "script": The script in the scripts directory whose main() function runs the stage.
+#   "inputs": The files or directories the stage reads, relative to the top of the repository.
+#   "outputs": The files the stage writes, relative to the top of the repository.
+#   "args": Optional, a list of extra arguments passed to the script.
+#   "compresses": Optional, whether the script takes the --compression argument.
+#   "samples": Optional, whether the script writes sample files and takes the --sample-stratify-by argument.
+#   "state": Optional, files the stage reads and then writes again every time it runs, like caches, relative to
+#       the top of the repository. The stage is run again if any of them are deleted.
+#   "libraries": Optional, directories with packages the script imports from outside the repository, like oats,
+#       relative to the top of the repository. The Python files in them are part of the stage's code.
+
+
+
+
+# Returns a dictionary mapping the name of each stage to the set of names of the stages it depends on.
+def stage_dependencies(stages):
+    writers = {}
+    for stage in stages:
+        for output in stage["outputs"]:
+            if output in writers:
+                raise ValueError("{} is written by both {} and {}".format(output, writers[output], stage["name"]))
+            writers[output] = stage["name"]
+    dependencies = {}
+    for stage in stages:
+        dependencies[stage["name"]] = {writers[path] for path in stage["inputs"] if path in writers and writers[path] != stage["name"]}
+    return(dependencies)
+
+
+# Returns the names of the stages in an order where each one comes after everything it depends on, and raises
+# a ValueError if the dependencies have a cycle in them.
+def stage_order(stages):
+    dependencies = stage_dependencies(stages)
+    order = []
+    remaining = [stage["name"] for stage in stages]
+    while len(remaining) > 0:
+        ready = [name for name in remaining if dependencies[name].issubset(order)]
+        if len(ready) == 0:
+            raise ValueError("the stages {} depend on each other".format(", ".join(remaining)))
+        order.extend(ready)
+        remaining = [name for name in remaining if name not in ready]
+    return(order)
+
+
+# Returns the subset of the stages that are needed to run the named ones, including everything they depend on.
+def select_stages(stages, names):
+    dependencies = stage_dependencies(stages)
+    known = {stage["name"] for stage in stages}
+    for name in names:
+        if name not in known:
+            raise ValueError("there is no stage named {}, should be one of {}".format(name, ", ".join(sorted(known))))
+    needed = set()
+    pending = list(names)
+    while len(pending) > 0:
+        name = pending.pop()
+        if name not in needed:
+            needed.add(name)
+            pending.extend(dependencies[name])
+    return([stage for stage in stages if stage["name"] in needed])
+
+
+
+
+# The fingerprints of stages from the last time they ran successfully, and the hashes of the files that went into
+# them. The hash of each file is saved with its size and modification time, so that a file that hasn't been
+# touched since it was last hashed doesn't need to be read again.
+class Manifest:
+
+    def __init__(self, stages=None, files=None):
+        self.stages = {} if stages is None else stages
+        self.files = {} if files is None else files
+
+
+    @classmethod
+    def load(cls, path):
+        if not os.path.exists(path):
+            return(cls())
+        with open(path) as f:
+            contents = json.load(f)
+        return(cls(contents["stages"], contents["files"]))
+
+
+    def save(self, path):
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        with open("{}.tmp".format(path), "w") as f:
+            json.dump({"stages":self.stages, "files":self.files}, f, indent=4, sort_keys=True)
+        os.replace("{}.tmp".format(path), path)
+
+
+    # Returns the hash of the contents of a file, or of every file in a directory, or "missing" if there's nothing
+    # at that path.
+    def hash_path(self, path):
+        if os.path.isdir(path):
+            paths = sorted(os.path.join(directory, name) for directory,_,names in os.walk(path) for name in names)
+            digest = hashlib.sha1()
+            for file_path in paths:
+                digest.update("{}\t{}\n".format(os.path.relpath(file_path, path), self.hash_path(file_path)).encode("utf-8"))
+            return(digest.hexdigest())
+        if not os.path.exists(path):
+            return("missing")
+        stat = os.stat(path)
+        cached = self.files.get(path)
+        if cached is not None and cached[0] == stat.st_size and cached[1] == stat.st_mtime_ns:
+            return(cached[2])
+        digest = hashlib.sha1()
+        with open(path, "rb") as f:
+            for block in iter(lambda: f.read(1<<20), b""):
+                digest.update(block)
+        self.files[path] = [stat.st_size, stat.st_mtime_ns, digest.hexdigest()]
+        return(digest.hexdigest())
+
+
+    # Returns what goes into the fingerprint of a stage, which is the hashes of its inputs, in either their
+    # compressed or uncompressed form, its script, the shared code in utils and the libraries it uses, the
+    # arguments it's given, and whether each of its state files exists.
+    def contents(self, stage, root):
+        code = [os.path.join(root, "scripts", stage["script"])]+sorted(glob.glob(os.path.join(root, "utils", "*.py")))
+        return({
+            "code":{os.path.relpath(path, root):self.hash_path(path) for path in code},
+            "libraries":{library:self.hash_library(os.path.join(root, library)) for library in stage.get("libraries", [])},
+            "inputs":{path:self.hash_path(resolve_input(os.path.join(root, path))) for path in stage["inputs"]},
+            "args":list(stage.get("args", [])),
+            "state":self.state(stage, root)})
+
+
+    # Returns the hash of the Python files in a library directory, or "missing" if there aren't any. Only the
+    # Python files are used, so that files like compiled caches or version control data don't change it.
+    def hash_library(self, path):
+        paths = sorted(glob.glob(os.path.join(path, "**", "*.py"), recursive=True))
+        if len(paths) == 0:
+            return("missing")
+        digest = hashlib.sha1()
+        for file_path in paths:
+            digest.update("{}\t{}\n".format(os.path.relpath(file_path, path), self.hash_path(file_path)).encode("utf-8"))
+        return(digest.hexdigest())
+
+
+    # Returns whether each of the state files of a stage exists. Only whether they're there is used, because the
+    # stage changes them every time it runs.
+    def state(self, stage, root):
+        return({path:os.path.exists(resolve_input(os.path.join(root, path))) for path in stage.get("state", [])})
+
+
+    # Returns the fingerprint of a stage from what's returned by contents().
+    def fingerprint(self, contents):
+        return(hashlib.sha1(json.dumps(contents, sort_keys=True).encode("utf-8")).hexdigest())
+
+
+    # Returns whether the stage can be skipped, because it has the same fingerprint as the last time it ran and
+    # all of its outputs still exist, in either their compressed or uncompressed form.
+    def is_current(self, stage, fingerprint, root):
+        if self.stages.get(stage["name"]) != fingerprint:
+            return(False)
+        return(all(os.path.exists(resolve_input(os.path.join(root, path))) for path in stage["outputs"]))
+
+
+
+
+def _print_status(status, name, detail=""):
+    print("[{:^9}] {:<36} {}".format(status, name, detail))
+    sys.stdout.flush()
+
+
+# Imports the scripts for the stages in this process, so that the processes started for each stage already have
+# them and the libraries they use, like pandas, nltk, and gensim, instead of each one importing them again. Any
+# that can't be imported are left for the stage itself to fail on, where the error goes to its log.
+def preload_stages(stages, root):
+    working_directory = os.getcwd()
+    try:
+        os.chdir(os.path.join(root, "scripts"))
+        if os.getcwd() not in sys.path:
+            sys.path.insert(0, os.getcwd())
+        for stage in stages:
+            try:
+                importlib.import_module(os.path.splitext(stage["script"])[0])
+            except Exception:
+                pass
+    finally:
+        os.chdir(working_directory)
+
+
+# This is only called by run_stages(), and runs in the process started for a stage.
+# Sends everything the stage prints, including what's printed by any programs it runs, to the log file for the
+# stage, and then calls the main() function of its script from inside the scripts directory. The measurements for
+# the stage are saved to its report file even if it fails, to show how far it got.
+def _run_stage(stage, root, log_path, report_path):
+    with open(log_path, "w") as log:
+        os.dup2(log.fileno(), sys.stdout.fileno())
+        os.dup2(log.fileno(), sys.stderr.fileno())
+    instrumentation = Instrumentation(stage["name"])
+    set_pipeline_instrumentation(instrumentation)
+    try:
+        os.chdir(os.path.join(root, "scripts"))
+        if os.getcwd() not in sys.path:
+            sys.path.insert(0, os.getcwd())
+        module = importlib.import_module(os.path.splitext(stage["script"])[0])
+        module.main(list(stage.get("args", [])))
+    finally:
+        instrumentation.save(report_path)
+
+
+# This is only called by run_stages().
+# Starts the process for one stage. Processes are forked where that's possible so that they start with whatever
+# has already been imported.
+def _start(stage, root, log_dir):
+    log_path = os.path.join(log_dir, "{}.log".format(stage["name"]))
+    report_path = os.path.join(log_dir, "{}.json".format(stage["name"]))
+    if os.path.exists(report_path):
+        os.remove(report_path)
+    methods = multiprocessing.get_all_start_methods()
+    context = multiprocessing.get_context("fork" if "fork" in methods else None)
+    process = context.Process(target=_run_stage, args=(stage, root, log_path, report_path), name=stage["name"])
+    process.start()
+    return(process, log_path)
+
+
+# This is only called by run_stages().
+# Returns the last lines of the log file for a stage, to show why it failed.
+def _tail(log_path, num_lines=20):
+    with open(log_path, errors="replace") as f:
+        lines = f.readlines()
+    return("".join(lines[-num_lines:]))
+
+
+# This is only called by run_stages().
+# Saves the report for the whole run, with the report from each stage that ran and the status of every stage, and
+# returns the summary of it. Stages that were stopped before they could save a report only have their status.
+def _save_run_report(stages, statuses, log_dir, started, elapsed, jobs):
+    reports = []
+    for name in stage_order(stages):
+        report_path = os.path.join(log_dir, "{}.json".format(name))
+        report = {"name":name}
+        if statuses[name] in ("ok","failed") and os.path.exists(report_path):
+            with open(report_path) as f:
+                report = json.load(f)
+        report["status"] = statuses[name]
+        reports.append(report)
+    run_report = {
+        "started":time.strftime("%Y-%m-%dT%H:%M:%S", time.localtime(started)),
+        "wall_seconds":elapsed,
+        "jobs":jobs,
+        "stages":reports}
+    with open(os.path.join(log_dir, "run_report.json"), "w") as f:
+        json.dump(run_report, f, indent=4)
+    return("{}\n{:<40} {:>9.1f}".format(format_summary(reports), "whole run", elapsed))
+
+
+# Runs the stages, with at most jobs of them running at once, and returns a dictionary mapping the name of each
+# stage to its status, which is "ok", "skipped" if nothing it uses changed, "failed", "stopped" if it was stopped
+# because another stage failed, or "not run" if it never started. The output from each stage goes to a log file
+# for it in log_dir, and the end of that log is printed for a stage that fails. Stages are only skipped if a
+# manifest_path is given, and the stages named in force or that depend on a stage that was run are always run. The
+# fingerprint of each stage is taken right before it would start, after the stages it depends on have written their
+# outputs, except for its state files, which are checked again once it has finished. All of the scripts are
+# imported once here first if preload is true. The report for the run is saved as run_report.json in log_dir.
+def run_stages(stages, root, jobs=4, log_dir="logs", poll_interval=0.1, manifest_path=None, force=(), preload=True):
+    started = time.time()
+    start = time.perf_counter()
+    manifest = Manifest.load(manifest_path) if manifest_path is not None else None
+    if preload:
+        preload_stages(stages, root)
+    contents = {}
+    dependencies = stage_dependencies(stages)
+    stage_order(stages)
+    stages_by_name = {stage["name"]:stage for stage in stages}
+    log_dir = os.path.join(root, log_dir)
+    os.makedirs(log_dir, exist_ok=True)
+    statuses = {stage["name"]:"not run" for stage in stages}
+    times = {}
+    waiting = list(stages)
+    running = {}
+    failed = False
+
+    while (len(waiting) > 0 and not failed) or len(running) > 0:
+        while not failed and len(running) < jobs:
+            ready = [stage for stage in waiting if all(statuses[name] in ("ok","skipped") for name in dependencies[stage["name"]])]
+            if len(ready) == 0:
+                break
+            stage = ready[0]
+            waiting.remove(stage)
+            if manifest is not None:
+                contents[stage["name"]] = manifest.contents(stage, root)
+                rerun = stage["name"] in force or any(statuses[name] == "ok" for name in dependencies[stage["name"]])
+                if not rerun and manifest.is_current(stage, manifest.fingerprint(contents[stage["name"]]), root):
+                    statuses[stage["name"]] = "skipped"
+                    _print_status("skipped", stage["name"], "nothing it uses has changed")
+                    continue
+                manifest.stages.pop(stage["name"], None)
+                manifest.save(manifest_path)
+            running[stage["name"]] = _start(stage, root, log_dir)
+            times[stage["name"]] = time.perf_counter()
+            _print_status("started", stage["name"])
+
+        if len(running) > 0:
+            time.sleep(poll_interval)
+        for name,(process,log_path) in list(running.items()):
+            if process.exitcode is None:
+                continue
+            del running[name]
+            elapsed = time.perf_counter()-times[name]
+            if process.exitcode == 0:
+                statuses[name] = "ok"
+                _print_status("ok", name, "{:.1f}s".format(elapsed))
+                if manifest is not None:
+                    contents[name]["state"] = manifest.state(stages_by_name[name], root)
+                    manifest.stages[name] = manifest.fingerprint(contents[name])
+                    manifest.save(manifest_path)
+            else:
+                statuses[name] = "failed"
+                failed = True
+                _print_status("failed", name, "{:.1f}s, exit code {}, log in {}".format(elapsed, process.exitcode, log_path))
+                print(_tail(log_path))
+
+        if failed:
+            for name,(process,log_path) in running.items():
+                process.terminate()
+                process.join()
+                statuses[name] = "stopped"
+                _print_status("stopped", name, "because another stage failed")
+            running = {}
+
+    for stage in waiting:
+        _print_status(statuses[stage["name"]], stage["name"])
+    print(_save_run_report(stages, statuses, log_dir, started, time.perf_counter()-start, jobs))
+    return(statuses)
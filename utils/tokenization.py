@@ -0,0 +1,139 @@
+import os
+import pickle
+import hashlib
+import multiprocessing
+import gensim
+import nltk
+from gensim.parsing.preprocessing import preprocess_string
+from nltk.tokenize import sent_tokenize, word_tokenize
+
+
+
+
+# Functions for creating the tokenized versions of the text descriptions in the combined dataset.
+# Each text is split into sentences that are marked with a delimiter, and then into words and into stemmed
+# words with stopwords and punctuation removed. The same functions are used whether the texts are processed
+# serially or across a pool of worker processes, so the outputs are the same either way.
+
+
+
+
+SENT_DELIMITER = "[SENT]"
+
+
+# Change this whenever any of the functions below change what they return for a given text, so that results
+# cached by a previous version aren't used. The versions of the libraries that do the tokenizing are included.
+TOKENIZER_VERSION = "1|nltk={}|gensim={}".format(nltk.__version__, gensim.__version__)
+
+
+
+
+# The input should be one string with sentences separated by something
+# This stems each word, removes puncutation and also all of the stopwords and lowercases.
+def preprocess_sentences_full(text, sentence_delimiter):
+    sentences = text.split(sentence_delimiter)
+    sentences = [" ".join(preprocess_string(s)) for s in sentences]
+    reformatted_text = " {} ".format(sentence_delimiter).join(sentences)
+    reformatted_text = reformatted_text.strip()
+    return(reformatted_text)
+
+
+# The input should be one string with sentences separated by something
+# This splits the strings into tokens but leaves the content of them alone.
+def preprocess_sentences_partial(text, sentence_delimiter):
+    sentences = text.split(sentence_delimiter)
+    sentences = [" ".join(word_tokenize(s)) for s in sentences]
+    reformatted_text = " {} ".format(sentence_delimiter).join(sentences)
+    reformatted_text = reformatted_text.strip()
+    return(reformatted_text)
+
+
+# Adds the sentence delimiter before each sentence, after treating semicolons as the end of a sentence.
+def tokenize_sentences(text, sentence_delimiter):
+    sentences = sent_tokenize(text.replace(";","."))
+    tokenized_text = " ".join(["{} {}".format(sentence_delimiter, s) for s in sentences])
+    return(tokenized_text)
+
+
+# Returns the (sentences, words, stems) versions of one text.
+def tokenize_text(text):
+    sents = tokenize_sentences(text, SENT_DELIMITER)
+    words = preprocess_sentences_partial(sents, SENT_DELIMITER)
+    stems = preprocess_sentences_full(sents, SENT_DELIMITER)
+    return(sents, words, stems)
+
+
+
+
+# Run once in each worker process so that the punkt model and the gensim filters are loaded before any of
+# the chunks are processed, instead of the first texts in every chunk paying for the loading.
+def _initialize_worker():
+    tokenize_text("Loading the tokenizers. Once per worker.")
+
+
+# Results of tokenizing texts that are saved between runs, keyed by a hash of each text.
+# Everything in the cache was created by one tokenizer version, and if the saved file was made by a different
+# version than the current one it's ignored, and replaced the next time the cache is saved.
+class TokenizationCache:
+
+    def __init__(self, entries=None, version=TOKENIZER_VERSION):
+        self.entries = {} if entries is None else entries
+        self.version = version
+
+
+    @classmethod
+    def load(cls, path):
+        if not os.path.exists(path):
+            return(cls())
+        with open(path, "rb") as f:
+            state = pickle.load(f)
+        if state["version"] != TOKENIZER_VERSION:
+            return(cls())
+        return(cls(state["entries"], state["version"]))
+
+
+    def save(self, path):
+        with open(path, "wb") as f:
+            pickle.dump({"version":self.version, "entries":self.entries}, f, protocol=pickle.HIGHEST_PROTOCOL)
+
+
+    @staticmethod
+    def key(text):
+        return(hashlib.sha1(text.encode("utf-8")).hexdigest())
+
+
+    def get(self, text):
+        return(self.entries.get(self.key(text)))
+
+
+    def put(self, text, result):
+        self.entries[self.key(text)] = result
+
+
+
+
+# Returns three lists with the (sentences, words, stems) versions of each text, in the same order as the texts.
+# Only the distinct texts are tokenized and the results are copied back to every position the text appears at,
+# and texts that are already in the cache if one is given aren't tokenized again. The rest are split into
+# chunks of chunk_size that are sent to a pool of processes if workers is more than one, otherwise or if there
+# aren't enough texts to fill more than one chunk they're processed in this process.
+def tokenize_texts(texts, workers=1, chunk_size=1000, cache=None):
+    texts = list(texts)
+    results = {text:None for text in texts}
+    if cache is not None:
+        for text in results:
+            results[text] = cache.get(text)
+    remaining = [text for text,result in results.items() if result is None]
+    if workers <= 1 or len(remaining) <= chunk_size:
+        tokenized = [tokenize_text(text) for text in remaining]
+    else:
+        with multiprocessing.Pool(processes=workers, initializer=_initialize_worker) as pool:
+            tokenized = list(pool.imap(tokenize_text, remaining, chunksize=chunk_size))
+    for text,result in zip(remaining, tokenized):
+        results[text] = result
+        if cache is not None:
+            cache.put(text, result)
+    if len(texts) == 0:
+        return([], [], [])
+    sents, words, stems = (list(column) for column in zip(*[results[text] for text in texts]))
+    return(sents, words, stems)
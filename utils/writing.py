@@ -0,0 +1,143 @@
+import os
+import csv
+import io
+import time
+import numpy as np
+import pandas as pd
+from utils.compression import open_output
+from utils.sampling import RowSampler
+
+
+
+
+# Functions for writing several files that each contain some subset of the rows of one dataframe.
+# Instead of filtering the dataframe and writing it again for each of the files and each of the formats, the
+# rows are serialized once per format in chunks, and then the serialized lines for each chunk are routed to
+# every file that they belong in. The sample version of each file is filled in from the same pass, by giving the
+# rows that are routed to it to a sampler from utils/sampling.py.
+
+
+
+
+# The separator used for each of the formats that can be written.
+SEPARATORS = {"csv":",", "tsv":"\t"}
+
+
+# Marks the end of each row while a chunk is serialized, so that the chunk can be split back into its rows.
+# The newlines that can be inside quoted fields mean that the serialized chunk can't just be split on newlines.
+_ROW_END = "\x1e\n"
+
+
+
+
+# Function to truncate strings for more readable sample files.
+def truncate_string(text, char_limit):
+    truncated_text = text[:char_limit]
+    if len(text)>char_limit:
+        truncated_text = "{}...".format(truncated_text)
+    return(truncated_text)
+
+
+# Truncates the values in each of the columns listed in char_limits, and returns the dataframe.
+def truncate_fields(sample_df, char_limits):
+    for column,char_limit in char_limits.items():
+        if column in sample_df.columns:
+            sample_df[column] = sample_df[column].map(lambda x: truncate_string(x, char_limit), na_action="ignore")
+    return(sample_df)
+
+
+
+
+# This is only called by write_outputs().
+# Returns one string for each row in the chunk, formatted the same way that DataFrame.to_csv() formats them.
+def _serialize_rows(chunk, separator):
+    buffer = io.StringIO()
+    writer = csv.writer(buffer, delimiter=separator, lineterminator=_ROW_END)
+    values = chunk.astype(object).where(chunk.notnull(), "")
+    writer.writerows(values.itertuples(index=False, name=None))
+    rows = buffer.getvalue().split(_ROW_END)[:-1]
+    return(np.array(rows, dtype=object))
+
+
+# Writes each output in every one of the formats, making only one pass over the dataframe.
+# Each output is a dictionary with the following keys.
+#   "name": The name used for the files, like "genes_texts" for "genes_texts.csv".
+#   "mask": A function that takes a chunk of the dataframe and returns which of the rows belong in this output.
+#   "sample_drop": A list of columns to leave out of the sample files for this output.
+# The files go in data_dir and the sample files go in sample_dir. The samples have sample_size rows of each output,
+# either the first ones or a sample stratified by the stratify_by columns, with any columns in char_limits truncated. Returns the seconds spent writing each output, which
+# includes its share of the time spent serializing rows, so the times add up to the whole time taken. The files in
+# data_dir are compressed as they're written if a compression from utils/compression.py is given, each in its own
+# thread so that all of them are compressed at the same time, but the sample files are never compressed.
+def write_outputs(df, outputs, data_dir, sample_dir, formats=("csv","tsv"), chunk_size=10000, sample_size=100, stratify_by=None, char_limits=None, compression=None):
+    char_limits = {} if char_limits is None else char_limits
+    timings = {output["name"]:0.000 for output in outputs}
+    samplers = {output["name"]:RowSampler(sample_size, stratify_by) for output in outputs}
+    header = {}
+    for file_format in formats:
+        header[file_format] = _serialize_rows(pd.DataFrame([df.columns], columns=df.columns), SEPARATORS[file_format])[0]
+
+    handles = {}
+    try:
+        for output in outputs:
+            for file_format in formats:
+                path = "{}/{}.{}".format(data_dir, output["name"], file_format)
+                handles[(output["name"],file_format)] = open_output(path, compression)
+                handles[(output["name"],file_format)].write(header[file_format]+"\n")
+
+        for start in range(0, len(df), chunk_size):
+            chunk = df.iloc[start:start+chunk_size]
+            masks = {}
+            for output in outputs:
+                begin = time.perf_counter()
+                masks[output["name"]] = np.asarray(output["mask"](chunk), dtype=bool)
+                samplers[output["name"]].add(chunk[masks[output["name"]]])
+                timings[output["name"]] += time.perf_counter()-begin
+
+            for file_format in formats:
+                begin = time.perf_counter()
+                rows = _serialize_rows(chunk, SEPARATORS[file_format])
+                serializing_time = time.perf_counter()-begin
+                routed_counts = {name:mask.sum() for name,mask in masks.items()}
+                total_routed = max(1, sum(routed_counts.values()))
+                for output in outputs:
+                    begin = time.perf_counter()
+                    selected = rows[masks[output["name"]]]
+                    if len(selected) > 0:
+                        handles[(output["name"],file_format)].write("\n".join(selected)+"\n")
+                    timings[output["name"]] += time.perf_counter()-begin
+                    timings[output["name"]] += float(serializing_time*routed_counts[output["name"]]/total_routed)
+    finally:
+        for handle in handles.values():
+            handle.close()
+
+    for output in outputs:
+        begin = time.perf_counter()
+        sample_df = samplers[output["name"]].sample()
+        sample_df = df.head(0) if sample_df is None else sample_df
+        sample_df = truncate_fields(sample_df.copy(), char_limits)
+        sample_df = sample_df.drop(output.get("sample_drop", []), axis="columns")
+        for file_format in formats:
+            path = "{}/{}.{}".format(sample_dir, output["name"], file_format)
+            sample_df.to_csv(path, sep=SEPARATORS[file_format], index=False)
+        timings[output["name"]] += time.perf_counter()-begin
+    return(timings)
+
+
+
+
+# Writes the dataframe to a csv file, and writes the sample version of it with the same name in sample_dir, taken
+# from the rows as they're written instead of from the file afterwards. The sample has sample_size rows, either the
+# first ones or a sample stratified by the stratify_by columns that the dataframe has. The file is compressed as
+# it's written if a compression from utils/compression.py is given, but the sample file never is. The sample file
+# keeps the name of the file without any extension added for the compression.
+def write_csv(df, path, sample_dir, sample_size=100, stratify_by=None, compression=None, chunk_size=10000):
+    sampler = RowSampler(sample_size, stratify_by)
+    with open_output(path, compression) as f:
+        for start in range(0, max(1,len(df)), chunk_size):
+            chunk = df.iloc[start:start+chunk_size]
+            sampler.add(chunk)
+            chunk.to_csv(f, index=False, header=(start == 0))
+    sample_df = sampler.sample()
+    sample_df = df.head(0) if sample_df is None else sample_df
+    sample_df.to_csv(os.path.join(sample_dir, os.path.basename(path)), index=False)